@@ -1,6 +1,11 @@
+import asyncio
+import multiprocessing
+import os
 import subprocess
 import re
 import sys
+import tempfile
+import time
 
 def run_benchmark(url="http://127.0.0.1:8000/", requests=10000, concurrency=100):
     try:
@@ -37,6 +42,86 @@ def run_benchmark(url="http://127.0.0.1:8000/", requests=10000, concurrency=100)
         print("  Fedora: sudo dnf install wrk")
         print("  macOS: brew install wrk")
 
+# --- Unix domain socket vs TCP loopback (wrk only speaks TCP) ---
+def _serve(options):
+    from citra_framework.core import Citra
+    from citra_framework.components.response import Response
+
+    async def home(request):
+        return Response("ok")
+
+    app = Citra()
+    app.send("/", home)
+    app.serve(**options)
+
+
+async def _open(options):
+    if "unix_socket" in options:
+        return await asyncio.open_unix_connection(options["unix_socket"])
+    return await asyncio.open_connection(options["host"], options["port"])
+
+
+async def _client(options, requests):
+    reader, writer = await _open(options)
+    request = b"GET / HTTP/1.1\r\nHost: bench\r\n\r\n"
+
+    for _ in range(requests):
+        writer.write(request)
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = int(head.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+        await reader.readexactly(length)
+
+    writer.close()
+
+
+async def _load(options, requests, concurrency):
+    # --- wait for the server process to listen ---
+    for _ in range(100):
+        try:
+            _, writer = await _open(options)
+            writer.close()
+            break
+        except OSError:
+            await asyncio.sleep(0.05)
+
+    per_client = requests // concurrency
+    started = time.perf_counter()
+    await asyncio.gather(*(_client(options, per_client) for _ in range(concurrency)))
+    return per_client * concurrency / (time.perf_counter() - started)
+
+
+def run_socket_benchmark(requests=20000, concurrency=50):
+    """Compare requests/sec over a Unix domain socket and TCP loopback (keep-alive clients)."""
+
+    path = os.path.join(tempfile.mkdtemp(), "citra.sock")
+    transports = (
+        ("tcp loopback", {"host": "127.0.0.1", "port": 8765, "max_requests_per_connection": requests}),
+        ("unix socket", {"unix_socket": path, "max_requests_per_connection": requests}),
+    )
+    results = {}
+
+    for name, options in transports:
+        server = multiprocessing.Process(target=_serve, args=(options,), daemon=True)
+        server.start()
+
+        try:
+            results[name] = asyncio.run(_load(options, requests, concurrency))
+        finally:
+            server.terminate()
+            server.join()
+
+    print("\n=== Transport Benchmark ===")
+    for name, rps in results.items():
+        print(f"{name:>14}: {rps:,.0f} requests/sec")
+
+    tcp, uds = results["tcp loopback"], results["unix socket"]
+    print(f"{'difference':>14}: {(uds - tcp) / tcp:+.1%} over a Unix socket")
+    return results
+
+
 if __name__ == "__main__":
-    url = sys.argv[1] if len(sys.argv) > 1 else "http://127.0.0.1:8000/"
-    run_benchmark(url)
+    if len(sys.argv) > 1 and sys.argv[1] == "--sockets":
+        run_socket_benchmark()
+    else:
+        url = sys.argv[1] if len(sys.argv) > 1 else "http://127.0.0.1:8000/"
+        run_benchmark(url)
@@ -0,0 +1,269 @@
+from .logger import Logger
+import asyncio
+import inspect
+
+class BackgroundTasks:
+
+    '''
+    Background task runner for post-response work.
+
+    Handlers schedule follow-up work (audit inserts, cache warming,
+    notifications) with `after()`, the server enqueues it once the response
+    has been written, so the work no longer adds to user-visible latency.
+
+    Tasks are executed by a fixed number of worker coroutines reading from a
+    bounded queue, each task runs with an optional timeout and is retried
+    with exponential backoff. `drain()` waits for queued work at shutdown.
+
+    Both `async def` and plain `def` functions are accepted, plain functions
+    run in the default thread pool. A plain function that times out cannot
+    be stopped, its thread keeps running, so it is counted as failed and
+    never retried (a retry would run next to it).
+
+    `submit()` also works from plain `def` handlers, which run on the
+    thread pool: the task is handed to the event loop the runner was
+    started on with `call_soon_threadsafe`.
+
+    Attributes:
+        workers (int): number of worker coroutines.
+        max_queue (int): queue size limit, tasks beyond it are dropped.
+
+    Example:
+        async def submit_form(request):
+            core.database.insert('users', name=request.form['name'])
+            core.background.after(request, notify_admins, args=(request.form['name'],), retries=3)
+            return core.templates.forward('list_users')
+
+        core.background.stats()
+        # {'queued': 0, 'running': 1, 'completed': 120, 'failed': 0, ...}
+    '''
+
+    logger = Logger('Citra::Background')
+
+    def __init__(
+        self,
+        workers=4,
+        max_queue=1000,
+        timeout=None,
+        retries=0,
+        backoff=0.5,
+        shutdown_timeout=10.0
+    ):
+
+        '''
+        Initialize runner limits.
+
+        Args:
+            workers (int, optional): number of concurrent workers defaults to `4`.
+            max_queue (int, optional): queue size limit defaults to `1000`.
+            timeout (float, optional): default per-task timeout in seconds.
+            retries (int, optional): default number of retries after a failure.
+            backoff (float, optional): first retry delay in seconds, doubled on each retry.
+            shutdown_timeout (float, optional): seconds `drain()` waits for queued work.
+        '''
+
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.shutdown_timeout = shutdown_timeout
+
+        self._loop = None
+        self._queue = None
+        self._workers = []
+
+        # --- counters ---
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+
+    def after(
+        self,
+        request,
+        func,
+        args=(),
+        kwargs=None,
+        retries=None,
+        timeout=None
+    ):
+
+        '''
+        Schedule a task to run once the response of `request` has been written.
+
+        Args:
+            request (Request): current request.
+            func (callable): coroutine function or plain function.
+            args (tuple, optional): positional arguments.
+            kwargs (dict, optional): keyword arguments.
+            retries (int, optional): overrides the default retries.
+            timeout (float, optional): overrides the default timeout.
+        '''
+
+        request.background.append((func, args, kwargs or {}, retries, timeout))
+
+    def submit(
+        self,
+        func,
+        args=(),
+        kwargs=None,
+        retries=None,
+        timeout=None
+    ):
+
+        '''
+        Enqueue a task right away.
+
+        Args:
+            func (callable): coroutine function or plain function.
+            args (tuple, optional): positional arguments.
+            kwargs (dict, optional): keyword arguments.
+            retries (int, optional): overrides the default retries.
+            timeout (float, optional): overrides the default timeout.
+
+        Returns:
+            bool: `False` when the queue is full and the task was dropped, from
+                another thread `True` once the task is handed to the event loop.
+        '''
+
+        return self.enqueue((func, args, kwargs or {}, retries, timeout))
+
+    def start(self):
+
+        ''' Start the workers on the running event loop, called by the server at startup. '''
+
+        self._start()
+
+    def enqueue(self, task):
+
+        ''' Put a task tuple on the queue, starting the workers on first use. '''
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return self._enqueue_threadsafe(task)
+
+        self._start()
+
+        try:
+            self._queue.put_nowait(task)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            self.logger.warning(f'Background queue full, dropped task {getattr(task[0], "__name__", task[0])}.')
+            return False
+
+    def _enqueue_threadsafe(self, task):
+
+        ''' Hand a task submitted outside the event loop (e.g., a thread pool handler) to the loop. '''
+
+        loop = self._loop
+
+        if loop is None or loop.is_closed():
+            self.dropped += 1
+            self.logger.warning(f'Background runner is not started, dropped task {getattr(task[0], "__name__", task[0])}.')
+            return False
+
+        loop.call_soon_threadsafe(self.enqueue, task)
+        return True
+
+    def _start(self):
+
+        ''' Create the queue and workers inside the running event loop. '''
+
+        loop = asyncio.get_running_loop()
+
+        if self._workers and self._loop is loop:
+            return
+
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._workers = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _worker(self):
+
+        ''' Execute queued tasks until cancelled. '''
+
+        while True:
+            task = await self._queue.get()
+            self.running += 1
+
+            try:
+                await self._run(*task)
+            finally:
+                self.running -= 1
+                self._queue.task_done()
+
+    async def _run(self, func, args, kwargs, retries, timeout):
+
+        ''' Run one task with timeout and retries. '''
+
+        retries = self.retries if retries is None else retries
+        timeout = self.timeout if timeout is None else timeout
+        coroutine = inspect.iscoroutinefunction(func)
+
+        for attempt in range(retries + 1):
+            try:
+                if coroutine:
+                    call = func(*args, **kwargs)
+                else:
+                    call = asyncio.to_thread(func, *args, **kwargs)
+
+                await asyncio.wait_for(call, timeout)
+                self.completed += 1
+                return
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # --- a timed out thread keeps running, retrying would run the function twice at once ---
+                abandoned = not coroutine and isinstance(e, asyncio.TimeoutError)
+
+                if attempt < retries and not abandoned:
+                    self.retried += 1
+                    await asyncio.sleep(self.backoff * 2 ** attempt)
+                    continue
+
+                self.failed += 1
+                self.logger.error(f'Background task {getattr(func, "__name__", func)} failed: {e!r}')
+                return
+
+    async def drain(self, timeout=None):
+
+        '''
+        Wait for queued and running tasks, then stop the workers.
+
+        Args:
+            timeout (float, optional): seconds to wait defaults to `shutdown_timeout`.
+        '''
+
+        if not self._workers:
+            return
+
+        timeout = self.shutdown_timeout if timeout is None else timeout
+
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            self.logger.warning(f'Background drain timed out with {self._queue.qsize()} task(s) queued.')
+
+        for worker in self._workers:
+            worker.cancel()
+
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self):
+
+        ''' Return task counters as a dictionary. '''
+
+        return {
+            'queued': self._queue.qsize() if self._queue else 0,
+            'running': self.running,
+            'completed': self.completed,
+            'failed': self.failed,
+            'retried': self.retried,
+            'dropped': self.dropped
+        }
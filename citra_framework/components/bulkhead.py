@@ -0,0 +1,145 @@
+from collections import deque
+import asyncio
+import time
+
+class Bulkhead:
+
+    '''
+    Per-route concurrency bulkhead.
+
+    Limits how many requests of a route run at once and keeps a bounded
+    queue of waiting requests, so one slow route (e.g., a DB-heavy listing)
+    cannot take every slot of the event loop and starve fast routes like
+    health checks. A request that cannot get a slot within `queue_timeout`,
+    or finds the queue full, is rejected by the router with 503.
+
+    Slots are handed over directly from a finishing request to the oldest
+    waiter (FIFO), so waiting requests are served in arrival order.
+
+    Attributes:
+        name (str): route name, used in reports.
+        max_concurrency (int): requests allowed to run at once.
+        active (int): requests currently running.
+
+    Example:
+        core.send('/users', list_users, max_concurrency=8, queue_timeout=2.0)
+
+        # --- or share one bulkhead between several routes ---
+        database_routes = Bulkhead(16, queue_timeout=1.0, name='database')
+        core.send('/users', list_users, bulkhead=database_routes)
+        core.send('/report', report, bulkhead=database_routes)
+    '''
+
+    def __init__(
+        self,
+        max_concurrency,
+        queue_timeout=None,
+        max_queue=None,
+        name=None
+    ):
+
+        '''
+        Initialize bulkhead limits.
+
+        Args:
+            max_concurrency (int): requests allowed to run at once.
+            queue_timeout (float, optional): seconds a request may wait for a slot, `None` waits forever.
+            max_queue (int, optional): maximum waiting requests, `None` is unbounded.
+            name (str, optional): name used in reports.
+        '''
+
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+
+        self.active = 0
+        self._waiters = deque()
+
+        # --- counters ---
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._waited = 0
+
+    async def acquire(self):
+
+        '''
+        Wait for a slot.
+
+        Returns:
+            bool: `True` when a slot was acquired, the caller must then call `release()`.
+        '''
+
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+
+        if self.max_queue is not None and len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+        started = time.monotonic()
+
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+            acquired = True
+        except asyncio.TimeoutError:
+            # --- the slot may have been handed over right at the deadline ---
+            acquired = waiter.done() and not waiter.cancelled()
+            if not acquired:
+                self.timed_out += 1
+        except asyncio.CancelledError:
+            # --- pass on a slot handed over to a request that went away ---
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self._record_wait(time.monotonic() - started)
+
+        if acquired:
+            self.admitted += 1
+
+        return acquired
+
+    def release(self):
+
+        ''' Release a slot, handing it to the oldest waiter if any. '''
+
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+
+        self.active -= 1
+
+    def _record_wait(self, seconds):
+        self._waited += 1
+        self.total_wait += seconds
+        self.max_wait = max(self.max_wait, seconds)
+
+    def stats(self):
+
+        ''' Return queue depth and wait-time statistics as a dictionary. '''
+
+        return {
+            'active': self.active,
+            'max_concurrency': self.max_concurrency,
+            'queued': len(self._waiters),
+            'max_queue_depth': self.max_queue_depth,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+            'avg_wait': self.total_wait / self._waited if self._waited else 0.0,
+            'max_wait': self.max_wait
+        }
@@ -0,0 +1,190 @@
+from collections import OrderedDict
+import sys
+import time
+import urllib.parse
+
+class LRUCache:
+
+    '''
+    Memory-bounded LRU cache with optional per-entry TTL.
+
+    Entries are kept in an `OrderedDict` so lookups, inserts and evictions
+    are all O(1). The cache is bounded both by number of entries and by the
+    total size of the stored values, the least recently used entry is evicted
+    first when either bound is exceeded.
+
+    Attributes:
+        max_bytes (int): upper bound for the total size of stored values.
+        max_entries (int): upper bound for the number of entries.
+        size (int): current total size of stored values.
+
+    Example:
+        cache = LRUCache(max_bytes=1024 * 1024)
+
+        cache.set('users', rows, ttl=30)
+        rows = cache.get('users')
+    '''
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entries=10000):
+
+        '''
+        Initialize cache bounds.
+
+        Args:
+            max_bytes (int, optional): maximum total size in bytes defaults to `64MB`.
+            max_entries (int, optional): maximum number of entries defaults to `10000`.
+        '''
+
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.size = 0
+
+        # --- key -> (value, size, expires_at) ---
+        self._entries = OrderedDict()
+
+        # --- counters ---
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+
+        '''
+        Return a cached value and mark it as recently used.
+
+        Args:
+            key (hashable): cache key.
+            default (any, optional): value returned on miss or expiry.
+        '''
+
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return default
+
+        value, size, expires_at = entry
+
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None, size=None):
+
+        '''
+        Store a value in the cache.
+
+        Args:
+            key (hashable): cache key.
+            value (any): value to store.
+            ttl (float, optional): seconds before the entry expires, `None` never expires.
+            size (int, optional): size accounted for the value, computed when omitted.
+        '''
+
+        if size is None:
+            size = len(value) if isinstance(value, (bytes, bytearray, str)) else sys.getsizeof(value)
+
+        # --- values larger than the whole cache are never stored ---
+        if size > self.max_bytes:
+            self.delete(key)
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._entries[key] = (value, size, expires_at)
+        self.size += size
+
+        while self.size > self.max_bytes or len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def delete(self, key):
+
+        '''
+        Remove an entry if present.
+
+        Args:
+            key (hashable): cache key.
+        '''
+
+        if key in self._entries:
+            self._remove(key)
+
+    def keys(self):
+
+        ''' Return a snapshot of the stored keys (oldest first). '''
+
+        return list(self._entries)
+
+    def clear(self):
+
+        ''' Remove every entry. '''
+
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self):
+
+        ''' Return cache counters as a dictionary. '''
+
+        return {
+            'entries': len(self._entries),
+            'bytes': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+    def _remove(self, key):
+
+        ''' Drop an entry and release its accounted size. '''
+
+        _, size, _ = self._entries.pop(key)
+        self.size -= size
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def request_key(request, vary=()):
+
+    '''
+    Build a cache key for a request.
+
+    The key is composed of the method, the path without query string,
+    the query parameters sorted by name and the values of the given
+    `vary` headers, so `/users?b=2&a=1` and `/users?a=1&b=2` share an entry.
+
+    Args:
+        request (Request): incoming request.
+        vary (iterable[str], optional): header names that select a variant.
+
+    Returns:
+        str: cache key.
+    '''
+
+    path, _, query_string = request.path.partition('?')
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(query_string, keep_blank_values=True)))
+    variant = '\x1f'.join(request.headers.get(name.lower(), '') for name in vary)
+
+    return f'{request.method}\x00{path}\x00{query}\x00{variant}'
+
+
+def key_path(key):
+
+    '''
+    Return the path component of a key built by `request_key`.
+
+    Args:
+        key (str): cache key.
+    '''
+
+    return key.split('\x00', 2)[1]
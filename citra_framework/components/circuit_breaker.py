@@ -0,0 +1,291 @@
+from collections import deque
+import threading
+import time
+
+class CircuitOpenError(Exception):
+
+    '''
+    Raised instead of calling a dependency while its circuit is open.
+
+    Attributes:
+        name (str): circuit name.
+        retry_after (float): seconds until the next recovery attempt.
+    '''
+
+    def __init__(self, name, retry_after):
+        super().__init__(f'Circuit {name} is open, retry in {retry_after:.1f}s.')
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+
+    '''
+    Closed / open / half-open circuit breaker.
+
+    The outcome of the last `window` calls is kept while the circuit is
+    closed. Once at least `min_calls` are recorded and the share of failed
+    calls reaches `failure_rate`, or the share of calls slower than
+    `slow_call` seconds reaches `slow_rate`, the circuit opens and every
+    call fails immediately with `CircuitOpenError` instead of waiting on a
+    dependency that is down.
+
+    After `open_for` seconds the circuit goes half-open and lets
+    `half_open_calls` trial calls through: if they all succeed it closes,
+    the first failure opens it again. A call that ends without an outcome
+    gives its slot back with `release()`, and trial calls still unanswered
+    `open_for` seconds after the last one was admitted are given up, so a
+    lost trial cannot keep the circuit half-open for good. When a `probe` callable is given,
+    recovery is tested by a background thread calling it every `open_for`
+    seconds instead, so no request is spent as a trial until the probe
+    succeeds.
+
+    Attributes:
+        name (str): circuit name, used in errors and logs.
+        state (str): `'closed'`, `'open'` or `'half_open'`.
+
+    Example:
+        breaker = CircuitBreaker(failure_rate=0.5, slow_call=0.5, open_for=5)
+
+        breaker.before()
+        started = time.monotonic()
+        try:
+            rows = fetch()
+        except Exception:
+            breaker.failure(time.monotonic() - started)
+            raise
+        breaker.success(time.monotonic() - started)
+    '''
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self,
+        failure_rate=0.5,
+        slow_call=None,
+        slow_rate=0.8,
+        window=20,
+        min_calls=5,
+        open_for=5.0,
+        half_open_calls=3,
+        probe=None,
+        name='circuit',
+        logger=None
+    ):
+
+        '''
+        Initialize breaker thresholds.
+
+        Args:
+            failure_rate (float, optional): share of failed calls that opens the circuit.
+            slow_call (float, optional): seconds after which a successful call counts as slow, `None` disables.
+            slow_rate (float, optional): share of slow calls that opens the circuit.
+            window (int, optional): number of recent calls considered.
+            min_calls (int, optional): calls needed in the window before the rates are evaluated.
+            open_for (float, optional): seconds the circuit stays open before recovery is tried.
+            half_open_calls (int, optional): successful trial calls needed to close again.
+            probe (callable, optional): recovery check run in a background thread, raising on failure.
+            name (str, optional): circuit name.
+            logger (Logger, optional): logger for state changes.
+        '''
+
+        self.failure_rate = failure_rate
+        self.slow_call = slow_call
+        self.slow_rate = slow_rate
+        self.min_calls = min_calls
+        self.open_for = open_for
+        self.half_open_calls = half_open_calls
+        self.probe = probe
+        self.name = name
+        self.logger = logger
+
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+
+        # --- (failed, slow) outcomes of the last `window` calls ---
+        self._calls = deque(maxlen=window)
+        self._trials = 0
+        self._trial_successes = 0
+        self._trial_at = 0.0
+        self._lock = threading.Lock()
+        self._prober = None
+        self._stopped = threading.Event()
+
+        # --- counters ---
+        self.rejected = 0
+        self.trips = 0
+        self.probes = 0
+        self.probe_failures = 0
+
+    def before(self):
+
+        '''
+        Admit a call or fail fast.
+
+        Raises:
+            CircuitOpenError: when the circuit is open, or half-open with every trial slot taken.
+        '''
+
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+
+            now = time.monotonic()
+
+            if self.state == self.OPEN:
+                if self.probe is None and now - self.opened_at >= self.open_for:
+                    self._half_open()
+                else:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, max(0.0, self.opened_at + self.open_for - now))
+
+            # --- trials admitted too long ago without an outcome are given up ---
+            if self._trials >= self.half_open_calls and now - self._trial_at >= self.open_for:
+                self._trials = self._trial_successes
+
+            if self._trials >= self.half_open_calls:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, max(0.0, self._trial_at + self.open_for - now))
+
+            self._trials += 1
+            self._trial_at = now
+
+    def release(self):
+
+        '''
+        Give back the slot of an admitted call that ended without an outcome
+        (e.g., a deadline expired before the dependency was called).
+        '''
+
+        with self._lock:
+            if self.state == self.HALF_OPEN and self._trials > self._trial_successes:
+                self._trials -= 1
+
+    def success(self, seconds=0.0):
+
+        '''
+        Record a successful call.
+
+        Args:
+            seconds (float, optional): call duration.
+        '''
+
+        slow = self.slow_call is not None and seconds >= self.slow_call
+
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                if slow:
+                    self._trip('slow trial call')
+                    return
+
+                self._trial_successes += 1
+                if self._trial_successes >= self.half_open_calls:
+                    self._close()
+            elif self.state == self.CLOSED:
+                self._calls.append((False, slow))
+                self._evaluate()
+
+    def failure(self, seconds=0.0):
+
+        '''
+        Record a failed call.
+
+        Args:
+            seconds (float, optional): call duration.
+        '''
+
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trip('failed trial call')
+            elif self.state == self.CLOSED:
+                self._calls.append((True, False))
+                self._evaluate()
+
+    def trip(self, reason='forced'):
+
+        ''' Open the circuit now (e.g., when the dependency is known to be down). '''
+
+        with self._lock:
+            self._trip(reason)
+
+    def _evaluate(self):
+        calls = len(self._calls)
+
+        if calls < self.min_calls:
+            return
+
+        failed = sum(1 for failed, _ in self._calls if failed)
+        slow = sum(1 for _, slow in self._calls if slow)
+
+        if failed / calls >= self.failure_rate:
+            self._trip(f'{failed}/{calls} calls failed')
+        elif self.slow_call is not None and slow / calls >= self.slow_rate:
+            self._trip(f'{slow}/{calls} calls slower than {self.slow_call}s')
+
+    def _trip(self, reason):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        self._calls.clear()
+
+        if self.logger:
+            self.logger.warning(f'Circuit {self.name} opened ({reason}), failing fast for {self.open_for}s.')
+
+        if self.probe is not None and (self._prober is None or not self._prober.is_alive()):
+            self._prober = threading.Thread(target=self._probe_loop, name=f'citra-probe-{self.name}', daemon=True)
+            self._prober.start()
+
+    def _half_open(self):
+        self.state = self.HALF_OPEN
+        self._trials = 0
+        self._trial_successes = 0
+
+    def _close(self):
+        self.state = self.CLOSED
+        self._calls.clear()
+
+        if self.logger:
+            self.logger.info(f'Circuit {self.name} closed.')
+
+    def _probe_loop(self):
+
+        ''' Run the probe every `open_for` seconds until it succeeds. '''
+
+        while not self._stopped.wait(self.open_for):
+            self.probes += 1
+
+            try:
+                self.probe()
+            except Exception as e:
+                self.probe_failures += 1
+                if self.logger:
+                    self.logger.warning(f'Circuit {self.name} probe failed. Error: {e}')
+                continue
+
+            with self._lock:
+                if self.state == self.OPEN:
+                    self._half_open()
+            return
+
+    def close(self):
+
+        ''' Stop the background probe. '''
+
+        self._stopped.set()
+
+    def stats(self):
+
+        ''' Return the state and counters as a dictionary. '''
+
+        with self._lock:
+            return {
+                'state': self.state,
+                'window_calls': len(self._calls),
+                'window_failures': sum(1 for failed, _ in self._calls if failed),
+                'rejected': self.rejected,
+                'trips': self.trips,
+                'probes': self.probes,
+                'probe_failures': self.probe_failures
+            }
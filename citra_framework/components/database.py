@@ -1,5 +1,34 @@
 from .logger import Logger
+from .cache import LRUCache
+from .write_buffer import WriteBehindBuffer
+from .loader import Loader
+from .replicas import ReplicaPool
+from .circuit_breaker import CircuitBreaker
+from .query_advisor import QueryAdvisor
+from .requests import Request
+from . import results
+from . import deadline
+from contextlib import contextmanager
 import mysql.connector as mysql
+import contextvars
+import pickle
+import threading
+import time
+
+# --- set by `Database.use_primary()`, reads in this context skip the replicas ---
+_primary_only = contextvars.ContextVar('citra_primary_only', default=False)
+
+# --- the server is unreachable (lost connection, refused, gone away), not a bad statement ---
+CONNECTION_ERRORS = (mysql.InterfaceError, mysql.OperationalError)
+
+# --- ER_QUERY_TIMEOUT, statement aborted by `MAX_EXECUTION_TIME` ---
+QUERY_TIMEOUT = 3024
+
+def _unavailable(error):
+    
+    '''`True` when an error means the server is down or too slow, `False` for an error of the statement itself.'''
+    
+    return isinstance(error, CONNECTION_ERRORS) or getattr(error, 'errno', None) == QUERY_TIMEOUT
 
 class Database:
     
@@ -19,7 +48,12 @@ class Database:
         hostname='localhost',
         username='root',
         password='',
-        database=''
+        database='',
+        cache=None,
+        replicas=None,
+        replica_strategy='round_robin',
+        read_your_writes=1.0,
+        replica_retry=30.0
     ):
         
         '''
@@ -30,28 +64,70 @@ class Database:
             username (str): database username (root).
             password (str): database password (common is blank).
             database (str): database name.
+            cache (object, optional): query cache backend (e.g., `SharedMemoryCache`) defaults to `LRUCache`.
+            replicas (list[dict], optional): read replicas, each with `hostname` and optionally
+                `username`, `password`, `database` (defaulting to the primary's).
+            replica_strategy (str, optional): `'round_robin'` (default) or `'least_loaded'`.
+            read_your_writes (float, optional): seconds a request reads from the primary after writing defaults to `1.0`.
+            replica_retry (float, optional): seconds a failed replica stays out of rotation defaults to `30`.
             
         Example:
             db = Database(
                 hostname='localhost',
                 username='root',
                 password='',
-                database='citra_db'
+                database='citra_db',
+                replicas=[{'hostname': 'replica-1'}, {'hostname': 'replica-2'}]
             )
         '''
         
         # database conenction attributes.
         self.connection = None
         self.cursor = None
+        self._plain_cursor = None
+        
+        # serializes statements on the primary connection and its reconnect by the breaker probe.
+        self._lock = threading.RLock()
+        
+        # query cache, used by `query(..., cache_ttl=N)` only.
+        self.cache = cache if cache is not None else LRUCache(max_bytes=16 * 1024 * 1024)
+        
+        # write-behind buffer, see `enable_write_behind()`.
+        self.write_buffer = None
+        
+        # batching key loaders, see `loader()`.
+        self._loaders = {}
+        
+        # primary circuit breaker, see `enable_circuit_breaker()`.
+        self.breaker = None
+        
+        # EXPLAIN advisor, see `enable_query_advisor()`.
+        self.advisor = None
+        
+        # read replicas, `None` when every query goes to the primary.
+        self.replicas = None
+        self.read_your_writes = read_your_writes
+        
+        if replicas:
+            defaults = {'username': username, 'password': password, 'database': database}
+            self.replicas = ReplicaPool(
+                self._connect,
+                [{**defaults, **replica} for replica in replicas],
+                strategy=replica_strategy,
+                retry_after=replica_retry,
+                logger=self.logger
+            )
+        
+        self._primary = {
+            'hostname': hostname,
+            'username': username,
+            'password': password,
+            'database': database
+        }
         
         # version 0.1.1
         try:
-            self.connection = mysql.connect(
-                host=hostname,
-                user=username,
-                password=password,
-                database=database
-            )
+            self.connection = self._connect(self._primary)
         
             self.cursor = self.connection.cursor(dictionary=True)
             self.logger.info(f'MySQL connected successfully to {database} at {hostname}')
@@ -63,40 +139,408 @@ class Database:
             
         except mysql.Error as e:
             self.logger.error(f'MySQL error: {e}')
+    
+    @staticmethod
+    def _connect(config):
+        
+        '''Open a MySQL connection from a `hostname`/`username`/`password`/`database` mapping.'''
+        
+        return mysql.connect(
+            host=config.get('hostname', 'localhost'),
+            user=config.get('username', 'root'),
+            password=config.get('password', ''),
+            database=config.get('database', '')
+        )
             
     # ---- Main SQL Execution function ----
-    def execute(self, query, parameters=()):
+    def execute(self, query, parameters=(), raise_errors=False):
+        
+        '''
+        Execute a SQL query with optional parameters.
         
-        '''Execute a SQL query with optional parameters.'''
+        Args:
+            query (str): sql statement.
+            parameters (tuple, optional): values for the placeholders.
+            raise_errors (bool, optional): raise errors of the statement itself (constraint,
+                bad value) instead of returning `None`, connection errors still return `None`.
+        '''
         
         # version 0.1.1
         if not self.cursor:
             self.logger.warning('Cannot execute query. No Database connection.')
             return None
         
-        try:   
-            self.cursor.execute(query, parameters)
-            self.connection.commit()
-            return self.cursor
-        except mysql.Error as e:
-            self.logger.error(f'MySQL Error: {e}')
+        # --- no new work once the request deadline has passed ---
+        deadline.check()
+        
+        # --- fail fast while the primary is known to be down ---
+        if self.breaker:
+            self.breaker.before()
+        
+        ok, seconds = None, 0.0
+        
+        try:
+            # --- the current request reads its own writes from the primary for a while ---
+            request = Request.current()
+            if request is not None:
+                request._last_write = time.monotonic()
+            
+            with self._lock:
+                started = time.monotonic()
+                
+                try:   
+                    self.cursor.execute(query, parameters)
+                    self.connection.commit()
+                except mysql.Error as e:
+                    self.logger.error(f'MySQL Error: {e}')
+                    ok = not _unavailable(e)
+                    if raise_errors and ok:
+                        raise
+                    return None
+                finally:
+                    seconds = time.monotonic() - started
+                
+                ok = True
+                
+                if self.advisor:
+                    self.advisor.observe(query, parameters, seconds)
+                
+                return self.cursor
+        finally:
+            # --- every exit reports to the breaker, one without an outcome gives its trial slot back ---
+            self._record(ok, seconds)
+    
+    def enable_circuit_breaker(self, **options):
+        
+        '''
+        Fail fast with `CircuitOpenError` while the primary is down or slow.
+        
+        Failed and slow statements on the primary are tracked by a
+        `CircuitBreaker`. Once it opens, `execute()` and primary reads raise
+        `CircuitOpenError` immediately (the router answers 503) instead of
+        each request paying the connect or timeout cost, and a background
+        probe reconnects and runs `SELECT 1` until the primary answers again.
+        Reads that a healthy replica can serve are not affected.
+        
+        Args:
+            **options: `CircuitBreaker` thresholds (`failure_rate`, `slow_call`, `open_for`, ...).
+            
+        Example:
+            db.enable_circuit_breaker(failure_rate=0.5, slow_call=0.5, open_for=5)
+        '''
+        
+        if self.breaker:
+            self.breaker.close()
+        
+        self.breaker = CircuitBreaker(
+            probe=self._probe,
+            name=f'mysql:{self._primary["hostname"]}',
+            logger=self.logger,
+            **options
+        )
+        
+        # --- no connection at startup, let the probe establish it ---
+        if self.connection is None:
+            self.breaker.trip('no connection')
+    
+    def enable_query_advisor(self, max_statements=1000):
+        
+        '''
+        Time every statement and EXPLAIN each distinct one once (debug mode).
+        
+        Full scans, filesorts and temporary tables are logged with a
+        candidate index, `self.advisor.report()` lists the statements with
+        the highest total time.
+        
+        Args:
+            max_statements (int, optional): distinct statements tracked defaults to `1000`.
+            
+        Example:
+            db.enable_query_advisor()
+            db.select('users', where='age > %s', where_values=(18,))
+            db.advisor.report(limit=5)
+        '''
+        
+        self.advisor = QueryAdvisor(self, max_statements=max_statements, logger=self.logger)
+    
+    def _probe(self):
+        
+        '''Reconnect to the primary if needed and check it answers `SELECT 1`.'''
+        
+        # --- runs on the probe thread, the connection is only swapped while no statement uses it ---
+        connection = self._connect(self._primary) if self.connection is None else None
+        
+        with self._lock:
+            if connection is not None:
+                self.connection, self._plain_cursor = connection, None
+                self.cursor = connection.cursor(dictionary=True)
+            else:
+                self.connection.ping(reconnect=True, attempts=1, delay=0)
+            
+            cursor = self.connection.cursor()
+            cursor.execute('SELECT 1')
+            cursor.fetchall()
+    
+    def _record(self, ok, seconds):
+        
+        '''
+        Report the outcome of a primary statement to the circuit breaker.
+        
+        Callers pass `ok=True` for statement errors (syntax, duplicate key),
+        the server answered, only connection errors and timeouts are failures.
+        `ok=None` means the statement never got an answer, its slot is released.
+        '''
+        
+        if self.breaker:
+            if ok is None:
+                self.breaker.release()
+            elif ok:
+                self.breaker.success(seconds)
+            else:
+                self.breaker.failure(seconds)
+    
+    def enable_write_behind(self, max_rows=500, flush_interval=0.05, max_buffered=10000):
+        
+        '''
+        Buffer `insert()` calls and write them as batched multi-row inserts.
+        
+        Args:
+            max_rows (int, optional): rows per batched statement defaults to `500`.
+            flush_interval (float, optional): maximum seconds a row stays buffered defaults to `0.05`.
+            max_buffered (int, optional): buffered rows before inserts flush inline defaults to `10000`.
+            
+        Example:
+            db.enable_write_behind(max_rows=200)
+            db.insert('events', kind='login', user_id=1)
+            
+            # --- at shutdown ---
+            db.flush()
+        '''
+        
+        self.write_buffer = WriteBehindBuffer(
+            self,
+            max_rows=max_rows,
+            flush_interval=flush_interval,
+            max_buffered=max_buffered
+        )
+        
+    def flush(self):
+        
+        '''Write every row held by the write-behind buffer.'''
+        
+        if self.write_buffer:
+            self.write_buffer.flush()
+    
+    def loader(self, table_name, key='id'):
+        
+        '''
+        Return the batching loader of a table column.
+        
+        Concurrent `await loader.load(value)` calls made in the same event-loop
+        tick are resolved by a single `WHERE key IN (...)` query.
+        
+        Args:
+            table_name (str): name of the table.
+            key (str, optional): column to match defaults to `'id'`.
+            
+        Example:
+            user = await db.loader('users').load(12)
+        '''
+        
+        if (table_name, key) not in self._loaders:
+            self._loaders[(table_name, key)] = Loader(self, table_name, key)
+        
+        return self._loaders[(table_name, key)]
+    
+    def query(self, query, parameters=(), cache_ttl=None, format='dict'):
+        
+        '''
+        Execute a SELECT query and fetchall results.
+        
+        Args:
+            query (str): sql statement.
+            parameters (tuple, optional): values for the placeholders.
+            cache_ttl (float, optional): keep the rows in `self.cache` for this many seconds.
+            format (str, optional): result shape, `'dict'`, `'tuple'`, `'row'` or `'columns'` (see `results`).
+        '''
+        
+        if format not in results.FORMATS:
+            raise ValueError(f'Unknown result format: {format}')
+        
+        if cache_ttl:
+            cache_key = f'query:{format}:{query}:{parameters!r}'
+            payload = self.cache.get(cache_key)
+            
+            # --- every hit unpickles its own rows, a caller editing them cannot change what others get ---
+            if payload is not None:
+                description, rows = pickle.loads(payload)
+                return rows if format == 'dict' else results.shape(format, description, rows)
+        
+        deadline.check()
+        
+        replica = self._read_replica(query)
+        fetched = None
+        began = time.monotonic()
+        
+        if replica is not None:
+            try:
+                fetched = self._replica_fetch(replica, query, parameters, format)
+            except mysql.Error as e:
+                self.logger.error(f'MySQL Error: {e}')
+                return {} if format == 'columns' else []
+        
+        if fetched is None:
+            if self.breaker:
+                self.breaker.before()
+            
+            ok, seconds = None, 0.0
+            
+            try:
+                # version 0.1.1, replicas still serve reads while the primary is unreachable
+                if not self.cursor:
+                    self.logger.warning('Cannot execute query. No Database connection.')
+                    return {} if format == 'columns' else []
+                
+                with self._lock:
+                    # --- non-dict formats read plain tuples, no per-row dictionary is built ---
+                    cursor = self.cursor if format == 'dict' else self._tuple_cursor()
+                    started = time.monotonic()
+                    
+                    try:
+                        cursor.execute(self._with_time_budget(query), parameters)
+                        fetched = cursor.description, cursor.fetchall()
+                    except mysql.Error as e:
+                        self.logger.error(f'MySQL Error: {e}')
+                        ok = not _unavailable(e)
+                        return {} if format == 'columns' else []
+                    finally:
+                        seconds = time.monotonic() - started
+                    
+                    ok = True
+            finally:
+                self._record(ok, seconds)
+        
+        description, rows = fetched
+        
+        if self.advisor:
+            self.advisor.observe(query, parameters, time.monotonic() - began)
+        
+        # --- cached pickled, the cache bounds the real size of the rows (`row` namedtuples are shaped on each hit) ---
+        if cache_ttl:
+            self.cache.set(cache_key, pickle.dumps(fetched, protocol=pickle.HIGHEST_PROTOCOL), ttl=cache_ttl)
+        
+        if format != 'dict':
+            rows = results.shape(format, description, rows)
+        
+        return rows
+    
+    @contextmanager
+    def use_primary(self):
+        
+        '''
+        Send every read made inside the block to the primary.
+        
+        Example:
+            with db.use_primary():
+                balance = db.select('accounts', where='id=%s', where_values=(1,))
+        '''
+        
+        token = _primary_only.set(True)
+        try:
+            yield self
+        finally:
+            _primary_only.reset(token)
+    
+    def _read_replica(self, query):
+        
+        '''
+        Return the replica that should serve `query`, `None` for the primary.
+        
+        Only plain SELECTs go to replicas, locking reads, open transactions,
+        `use_primary()` blocks and requests inside their read-your-writes
+        window stay on the primary.
+        '''
+        
+        if self.replicas is None or _primary_only.get():
+            return None
+        
+        statement = query.lstrip().upper()
+        if not statement.startswith('SELECT') or 'FOR UPDATE' in statement or 'LOCK IN SHARE MODE' in statement:
+            return None
+        
+        if getattr(self.connection, 'in_transaction', False):
             return None
+        
+        request = Request.current()
+        last_write = getattr(request, '_last_write', None)
+        if last_write is not None and time.monotonic() - last_write < self.read_your_writes:
+            return None
+        
+        return self.replicas.choose()
     
-    def query(self, query, parameters=()):
+    def _replica_fetch(self, replica, query, parameters, format):
         
-        '''Execute a SELECT query and fetchall results.'''
+        '''
+        Run a read on a replica.
         
-        # version 0.1.1
-        if not self.cursor:
-            self.logger.warning('Cannot execute query. No Database connection.')
-            return []
+        Only connection failures take the replica out of rotation, an error
+        of the statement itself (syntax, missing table) would fail on every
+        server and is raised to the caller.
+        
+        Returns:
+            tuple | None: `(description, rows)`, `None` when the replica failed and was marked down.
+            
+        Raises:
+            mysql.Error: the statement failed on a reachable replica.
+        '''
+        
+        replica.in_flight += 1
         
         try:
-            self.cursor.execute(query, parameters)
-            return self.cursor.fetchall()
-        except mysql.Error as e:
-            self.logger.error(f'MySQL Error: {e}')
-            return []
+            with replica.lock:
+                # --- another thread marked it down while this one waited ---
+                if replica.connection is None:
+                    return None
+                
+                cursor = replica.cursor if format == 'dict' else replica.tuple_cursor()
+                started = time.monotonic()
+                cursor.execute(self._with_time_budget(query), parameters)
+                fetched = cursor.description, cursor.fetchall()
+        except CONNECTION_ERRORS as e:
+            self.replicas.mark_down(replica, e)
+            return None
+        finally:
+            replica.in_flight -= 1
+        
+        replica.record(time.monotonic() - started)
+        return fetched
+    
+    def _tuple_cursor(self):
+        
+        '''Return the plain (tuple) cursor, created on first use.'''
+        
+        if self._plain_cursor is None:
+            self._plain_cursor = self.connection.cursor()
+        
+        return self._plain_cursor
+    
+    def _with_time_budget(self, query):
+        
+        '''
+        Bound a SELECT by the remaining request deadline.
+        
+        Adds the MySQL `MAX_EXECUTION_TIME` optimizer hint, so the server
+        aborts the statement instead of holding the connection past the
+        point where the response is no longer wanted.
+        '''
+        
+        budget = deadline.remaining()
+        
+        if budget is None or not query.lstrip()[:6].upper() == 'SELECT':
+            return query
+        
+        statement = query.lstrip()
+        return f'SELECT /*+ MAX_EXECUTION_TIME({max(1, int(budget * 1000))}) */{statement[6:]}'
     
     # ---- Helper Functions for queries ----
     def create_table(self, table_name, **columns):
@@ -149,13 +593,17 @@ class Database:
             self.logger.warning(f'Cannot INSERT into table ({table_name}). No Database connection.')
             return
         
+        if self.write_buffer:
+            self.write_buffer.add(table_name, data)
+            return
+        
         column = ', '.join(data.keys())
         placeholder = ', '.join(['%s'] * len(data))
         values = tuple(data.values())
         sql_query = f'INSERT INTO {table_name} ({column}) VALUES ({placeholder})'
         self.execute(sql_query, values)
     
-    def select(self, table_name, where=None, where_values=None):
+    def select(self, table_name, where=None, where_values=None, cache_ttl=None, columns=None, format='dict'):
         
         '''
         Fetch data records from a table.
@@ -163,6 +611,10 @@ class Database:
         Args:
             table_name (str): name of the table.
             where (str): sql query condition.
+            where_values (tuple, optional): values for the `WHERE` condition placeholders.
+            cache_ttl (float, optional): seconds the rows are kept in the query cache.
+            columns (iterable[str], optional): columns to select instead of `*`.
+            format (str, optional): result shape, `'dict'`, `'tuple'`, `'row'` or `'columns'`.
             
         Returns:
             list[dict]: rows as tuples retrieved from the table.
@@ -172,18 +624,14 @@ class Database:
             active_user = db.select('users', where='age > %s', age=18)
         '''
         
-        # version 0.1.1
-        if not self.cursor:
-            self.logger.warning(f'Cannot SELECT from table ({table_name}). No Database connection.')
-            return []
-        
-        sql_query = f'SELECT * FROM {table_name}'
+        projection = ', '.join(columns) if columns else '*'
+        sql_query = f'SELECT {projection} FROM {table_name}'
         parameters = where_values or ()
         
         if where:
             sql_query += f' WHERE {where}'
             parameters = where_values or ()
-        return self.query(sql_query, parameters)
+        return self.query(sql_query, parameters, cache_ttl=cache_ttl, format=format)
     
     def update(self, table_name, where, where_values, **data):
         
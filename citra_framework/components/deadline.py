@@ -0,0 +1,84 @@
+'''
+Request deadlines for `Citra` framework.
+
+The router stores the absolute deadline of the current request in a
+`contextvars.ContextVar`, so handlers and components called from them
+(e.g., `Database`) can check the remaining time budget without passing it
+around explicitly.
+
+Example:
+    from citra_framework.components import deadline
+
+    async def report(request):
+        budget = deadline.remaining()   # `None` when the route has no deadline
+
+        if budget is not None and budget < 0.5:
+            return Response('Try again later.', 503)
+        ...
+'''
+
+from contextvars import ContextVar
+import time
+
+_deadline = ContextVar('citra_deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+
+    '''
+    Raised when work is attempted after the request deadline has passed.
+    '''
+
+
+def start(seconds):
+
+    '''
+    Set the deadline of the current context.
+
+    Args:
+        seconds (float): time budget from now.
+
+    Returns:
+        Token: token to restore the previous deadline with `reset()`.
+    '''
+
+    return _deadline.set(time.monotonic() + seconds)
+
+
+def reset(token):
+
+    '''
+    Restore the deadline that was active before `start()`.
+
+    Args:
+        token (Token): token returned by `start()`.
+    '''
+
+    _deadline.reset(token)
+
+
+def remaining():
+
+    '''
+    Return the remaining time budget of the current request.
+
+    Returns:
+        float | None: seconds left (never negative), `None` when no deadline is set.
+    '''
+
+    deadline = _deadline.get()
+
+    if deadline is None:
+        return None
+
+    return max(0.0, deadline - time.monotonic())
+
+
+def check():
+
+    '''
+    Raise `DeadlineExceeded` if the current request deadline has passed.
+    '''
+
+    if remaining() == 0.0:
+        raise DeadlineExceeded('Request deadline exceeded.')
@@ -185,3 +185,24 @@ class UnauthorizedError(BaseErrorPage):
         ''' Represents an HTTP 401 Unauthorized error page. '''
         
         super().__init__(401, 'Unauthorized Access', details, debug)
+
+class TooManyRequestsError(BaseErrorPage):
+    def __init__(self, details=None, debug=False):
+        
+        ''' Represents an HTTP 429 Too Many Requests error page. '''
+        
+        super().__init__(429, 'Too Many Requests', details, debug)
+
+class ServiceUnavailableError(BaseErrorPage):
+    def __init__(self, details=None, debug=False):
+        
+        ''' Represents an HTTP 503 Service Unavailable error page. '''
+        
+        super().__init__(503, 'Service Unavailable', details, debug)
+
+class GatewayTimeoutError(BaseErrorPage):
+    def __init__(self, details=None, debug=False):
+        
+        ''' Represents an HTTP 504 Gateway Timeout error page. '''
+        
+        super().__init__(504, 'Gateway Timeout', details, debug)
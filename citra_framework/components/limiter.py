@@ -0,0 +1,123 @@
+import time
+
+class AdaptiveLimiter:
+
+    '''
+    Adaptive concurrency limiter for load shedding.
+
+    Tracks the number of in-flight requests and the latency of completed
+    ones and adjusts the allowed concurrency with AIMD (additive increase,
+    multiplicative decrease):
+
+        - a request finishing under `target_latency` while the limit is in
+          use grows the limit by `1 / limit` (about +1 per full window).
+        - a request finishing over `target_latency` shrinks the limit by
+          `backoff`, at most once per `target_latency` interval.
+
+    Requests above the current limit are rejected immediately so the server
+    answers some requests fast with 503 instead of timing out all of them.
+
+    Attributes:
+        limit (float): current concurrency limit.
+        in_flight (int): requests currently admitted.
+
+    Example:
+        limiter = AdaptiveLimiter(target_latency=0.05)
+        core.serve(limiter=limiter)
+
+        limiter.stats()
+        # {'limit': 42, 'in_flight': 7, 'admitted': 1200, 'rejected': 35, ...}
+    '''
+
+    def __init__(
+        self,
+        initial_limit=64,
+        min_limit=4,
+        max_limit=1024,
+        target_latency=0.1,
+        backoff=0.9,
+        retry_after=1
+    ):
+
+        '''
+        Initialize limiter bounds.
+
+        Args:
+            initial_limit (int, optional): starting concurrency limit defaults to `64`.
+            min_limit (int, optional): lower bound of the limit defaults to `4`.
+            max_limit (int, optional): upper bound of the limit defaults to `1024`.
+            target_latency (float, optional): latency in seconds considered healthy defaults to `0.1`.
+            backoff (float, optional): multiplicative decrease factor defaults to `0.9`.
+            retry_after (int, optional): `Retry-After` seconds sent with rejections defaults to `1`.
+        '''
+
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.retry_after = retry_after
+
+        self.in_flight = 0
+        self._last_decrease = 0.0
+
+        # --- counters ---
+        self.admitted = 0
+        self.rejected = 0
+        self.latency = 0.0
+
+    def try_acquire(self):
+
+        '''
+        Admit a request if the current limit allows it.
+
+        Returns:
+            bool: `True` when admitted, the caller must then call `release()`.
+        '''
+
+        if self.in_flight >= int(self.limit):
+            self.rejected += 1
+            return False
+
+        self.in_flight += 1
+        self.admitted += 1
+        return True
+
+    def release(self, latency=None):
+
+        '''
+        Record a finished request and adapt the limit.
+
+        Args:
+            latency (float, optional): seconds the request took, `None` frees
+                the slot of a request that never ran (e.g., its body was not received).
+        '''
+
+        self.in_flight -= 1
+
+        if latency is None:
+            return
+
+        # --- exponentially weighted latency, for reporting ---
+        self.latency = latency if not self.latency else self.latency * 0.9 + latency * 0.1
+
+        if latency > self.target_latency:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.target_latency:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+
+        elif self.in_flight + 1 >= self.limit / 2:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def stats(self):
+
+        ''' Return the current limit and counters as a dictionary. '''
+
+        return {
+            'limit': int(self.limit),
+            'in_flight': self.in_flight,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'latency': self.latency
+        }
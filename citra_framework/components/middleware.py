@@ -10,6 +10,18 @@ class BaseMiddleware:
         ''' Must be overriden by child middleware. '''
         
         raise NotImplementedError('Middleware must be implement process_request() function.')
+    
+    def admit(self, request):
+        
+        '''
+        Optional check run for every request before routing work is done.
+        
+        Called for unknown paths too and before a route's bulkhead is
+        acquired (`request.route` is set when a route matched), it must not
+        block. Return a response to answer the request right away.
+        '''
+        
+        return None
 
 class Middleware:
     
@@ -41,6 +53,27 @@ class Middleware:
         '''
         
         self.middlewares.append(func)
+    
+    def admit(self, request):
+        
+        '''
+        Run the `admit()` checks of the registered middlewares.
+        
+        Args:
+            request (Request): current request.
+            
+        Returns:
+            Response | None: the first rejection, `None` when every middleware admits the request.
+        '''
+        
+        for middleware in self.middlewares:
+            admit = getattr(middleware, 'admit', None)
+            response = admit(request) if admit is not None else None
+            
+            if response is not None:
+                return response
+        
+        return None
         
     def _wrap(self, middleware, handler):
         async def wrapper(request):
@@ -1,15 +1,252 @@
 from citra_framework.components.middleware import BaseMiddleware
 from citra_framework.components.error_pages.error import UnauthorizedError
+from collections import OrderedDict
+import base64
+import hashlib
+import hmac
+import json
+import time
 
 def protected_route(handler):
-    
+
     handler.is_protected = True
     return handler
 
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+class InvalidTokenError(Exception):
+
+    ''' Raised for a malformed, forged or expired token. '''
+
 class AuthenticationMiddleware(BaseMiddleware):
-    
+
     '''
-    Middleware for handling simple  request authentication.
+    Middleware for bearer token authentication.
     Attaches request.user (None if unauthenticated).
+
+    Tokens are HS256 JSON Web Tokens sent as `Authorization: Bearer <token>`.
+    The signature is checked with `hmac.compare_digest` and the `exp`, `nbf`,
+    `iss` and `aud` claims are validated. Verified tokens are kept in an
+    `OrderedDict` LRU bounded by `cache_size` until they expire, so a client
+    sending the same token again costs one dictionary lookup instead of a
+    hash computation.
+
+    Handlers decorated with `protected_route` (or routes sent with
+    `protected=True`) answer `401 Unauthorized` without a valid token, other
+    routes still get `request.user` when a valid token is sent.
+
+    Args:
+        secret (str | bytes): HMAC signing key shared with the token issuer.
+        issuer (str, optional): required `iss` claim.
+        audience (str, optional): required `aud` claim.
+        leeway (float, optional): seconds of clock skew allowed for `exp` and `nbf` (default: `0`).
+        cache_size (int, optional): maximum number of cached verified tokens (default: `10000`).
+        cache_ttl (float, optional): seconds a token without `exp` stays cached (default: `300`).
+
+    Example:
+        auth = AuthenticationMiddleware(secret=os.environ['CITRA_SECRET'])
+        core.middleware.add(auth)
+
+        @protected_route
+        async def profile(request):
+            return Response.Json({'user': request.user['sub']})
+
+        core.send('/profile', profile)
+        token = auth.issue({'sub': 'ana'}, expires_in=3600)
     '''
-    pass
\ No newline at end of file
+
+    def __init__(
+        self,
+        secret,
+        issuer=None,
+        audience=None,
+        leeway=0,
+        cache_size=10000,
+        cache_ttl=300
+    ):
+        if not secret:
+            raise ValueError('A token secret is required.')
+
+        self.key = secret.encode() if isinstance(secret, str) else secret
+        self.issuer = issuer
+        self.audience = audience
+        self.leeway = leeway
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+
+        # --- token -> (claims, cached_until) ---
+        self._verified = OrderedDict()
+
+        # --- counters ---
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    async def process_request(self, request, handler):
+
+        '''
+        Verify the bearer token and reject unauthenticated requests to protected routes.
+
+        Args:
+            request (Request): incoming HTTP request object.
+            handler (callable): the route handler to process the request.
+        '''
+
+        route_config = getattr(request, 'route', None) or {}
+        protected = route_config.get('protected') or getattr(getattr(request, 'handler', None), 'is_protected', False)
+
+        request.user = None
+        scheme, _, token = request.headers.get('authorization', '').partition(' ')
+
+        if scheme.lower() == 'bearer' and token:
+            try:
+                request.user = self.verify(token.strip())
+            except InvalidTokenError as e:
+                if protected:
+                    return self._reject(str(e), 'invalid_token')
+
+        if protected and request.user is None:
+            return self._reject('Missing bearer token.')
+
+        return await handler(request)
+
+    def verify(self, token):
+
+        '''
+        Return the claims of a valid token.
+
+        Args:
+            token (str): compact `header.payload.signature` token.
+
+        Raises:
+            InvalidTokenError: malformed, forged or expired token.
+        '''
+
+        now = time.time()
+        entry = self._verified.get(token)
+
+        if entry is not None:
+            claims, cached_until = entry
+
+            if cached_until > now:
+                self._verified.move_to_end(token)
+                self.hits += 1
+                return claims
+
+            self._verified.pop(token, None)
+
+        self.misses += 1
+
+        try:
+            claims = self._decode(token, now)
+        except InvalidTokenError:
+            self.rejected += 1
+            raise
+
+        # --- cache until the token expires, a token not valid yet is checked again ---
+        if 'nbf' not in claims or claims['nbf'] <= now:
+            cached_until = claims['exp'] + self.leeway if 'exp' in claims else now + self.cache_ttl
+            self._verified[token] = (claims, cached_until)
+
+            if len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+
+        return claims
+
+    def _decode(self, token, now):
+
+        ''' Check the signature and claims of a token, the uncached path. '''
+
+        parts = token.split('.')
+
+        if len(parts) != 3:
+            raise InvalidTokenError('Malformed token.')
+
+        header, payload, signature = parts
+
+        try:
+            algorithm = json.loads(_b64decode(header)).get('alg')
+            given = _b64decode(signature)
+        except (ValueError, AttributeError):
+            raise InvalidTokenError('Malformed token.')
+
+        # --- only HS256 is accepted, never the algorithm a client asks for (e.g., `none`) ---
+        if algorithm != 'HS256':
+            raise InvalidTokenError('Unsupported token algorithm.')
+
+        expected = hmac.new(self.key, f'{header}.{payload}'.encode(), hashlib.sha256).digest()
+
+        if not hmac.compare_digest(expected, given):
+            raise InvalidTokenError('Invalid token signature.')
+
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            raise InvalidTokenError('Malformed token.')
+
+        if not isinstance(claims, dict):
+            raise InvalidTokenError('Malformed token.')
+
+        if 'exp' in claims and not isinstance(claims['exp'], (int, float)) or 'nbf' in claims and not isinstance(claims['nbf'], (int, float)):
+            raise InvalidTokenError('Malformed token claims.')
+
+        if 'exp' in claims and claims['exp'] + self.leeway <= now:
+            raise InvalidTokenError('Token expired.')
+
+        if 'nbf' in claims and claims['nbf'] - self.leeway > now:
+            raise InvalidTokenError('Token not valid yet.')
+
+        if self.issuer is not None and claims.get('iss') != self.issuer:
+            raise InvalidTokenError('Invalid token issuer.')
+
+        if self.audience is not None:
+            audience = claims.get('aud')
+            if self.audience != audience and self.audience not in (audience if isinstance(audience, list) else ()):
+                raise InvalidTokenError('Invalid token audience.')
+
+        return claims
+
+    def issue(self, claims, expires_in=None):
+
+        '''
+        Sign an HS256 token.
+
+        Args:
+            claims (dict): token claims (e.g., `{'sub': 'ana'}`).
+            expires_in (float, optional): seconds until the `exp` claim.
+        '''
+
+        claims = dict(claims)
+
+        if expires_in is not None:
+            claims.setdefault('iat', int(time.time()))
+            claims['exp'] = int(time.time() + expires_in)
+
+        header = _b64encode(json.dumps({'alg': 'HS256', 'typ': 'JWT'}, separators=(',', ':')).encode())
+        payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode())
+        signature = hmac.new(self.key, f'{header}.{payload}'.encode(), hashlib.sha256).digest()
+
+        return f'{header}.{payload}.{_b64encode(signature)}'
+
+    def _reject(self, details, error=None):
+
+        ''' Build the 401 response with `WWW-Authenticate`. '''
+
+        response = UnauthorizedError(details=details).display()
+        response.headers['WWW-Authenticate'] = f'Bearer error="{error}"' if error else 'Bearer'
+        return response
+
+    def stats(self):
+
+        ''' Return authentication counters as a dictionary. '''
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'rejected': self.rejected,
+            'cached': len(self._verified)
+        }
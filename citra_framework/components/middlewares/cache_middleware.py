@@ -0,0 +1,151 @@
+from citra_framework.components.middleware import BaseMiddleware
+from citra_framework.components.response import Response, StreamingResponse
+from citra_framework.components.cache import LRUCache, request_key, key_path
+import hashlib
+
+class CacheMiddleware(BaseMiddleware):
+
+    '''
+    Middleware for caching built responses in memory.
+
+    Successful responses of cacheable methods are stored as
+    `(status_code, headers, body_bytes, etag)` in a memory-bounded
+    `LRUCache`, so repeated hits skip the handler, the database query and
+    the template render. Every cached response carries an `ETag` and a
+    matching `If-None-Match` request is answered with `304 Not Modified`.
+
+    The time-to-live is configured per route through `send()`, routes without
+    a TTL (and without a default `ttl`) are never cached.
+
+    Args:
+        ttl (float, optional): default TTL in seconds for every route (default: `None`).
+        vary (list[str], optional): request headers that select a cache variant.
+        max_bytes (int, optional): memory bound of the cache (default: `64MB`).
+        max_entries (int, optional): entry bound of the cache (default: `10000`).
+        methods (tuple[str], optional): cacheable methods (default: GET, HEAD).
+        backend (object, optional): cache store to use instead of a new `LRUCache`.
+
+    Example:
+        cache = CacheMiddleware(vary=['Accept-Language'])
+        core.middleware.add(cache)
+
+        core.send('/users', list_users, cache_ttl=60)
+
+        async def submit_form(request):
+            core.database.insert('users', name=request.form['name'])
+            cache.invalidate('/users')
+            ...
+    '''
+
+    def __init__(
+        self,
+        ttl=None,
+        vary=None,
+        max_bytes=64 * 1024 * 1024,
+        max_entries=10000,
+        methods=('GET', 'HEAD'),
+        backend=None
+    ):
+        self.ttl = ttl
+        self.vary = tuple(vary or ())
+        self.methods = tuple(methods)
+        self.store = backend if backend is not None else LRUCache(max_bytes=max_bytes, max_entries=max_entries)
+
+    async def process_request(self, request, handler):
+
+        '''
+        Serve the request from cache or store the handler response.
+
+        Args:
+            request (Request): incoming HTTP request object.
+            handler (callable): the route handler to process the request.
+        '''
+
+        route_config = getattr(request, 'route', None) or {}
+        ttl = route_config.get('cache_ttl', self.ttl)
+
+        if not ttl or request.method not in self.methods:
+            return await handler(request)
+
+        key = request_key(request, self.vary)
+        entry = self.store.get(key)
+
+        if entry is None:
+            response = await handler(request)
+
+            if not self._is_cacheable(response):
+                return response
+
+            entry = self._freeze(response)
+            self.store.set(key, entry, ttl=ttl, size=len(entry[2]))
+
+        status_code, headers, body, etag = entry
+
+        if self._etag_matches(request, etag):
+            return Response(b'', 304, {'ETag': etag})
+
+        return Response(body, status_code, dict(headers))
+
+    def invalidate(self, path=None, prefix=False):
+
+        '''
+        Drop cached responses so the next request re-runs the handler.
+
+        Args:
+            path (str, optional): path to invalidate, all entries when omitted.
+            prefix (bool, optional): treat `path` as a prefix (e.g., `/users` drops `/users/12`).
+        '''
+
+        if path is None:
+            self.store.clear()
+            return
+
+        for key in self.store.keys():
+            cached_path = key_path(key)
+            if cached_path == path or (prefix and cached_path.startswith(path)):
+                self.store.delete(key)
+
+    def _is_cacheable(self, response):
+
+        ''' Only complete, successful and non-personalized responses are stored. '''
+
+        if not isinstance(response, Response) or response.status_code != 200:
+            return False
+
+        if isinstance(response, StreamingResponse):
+            return False
+
+        if 'Set-Cookie' in response.headers or response.cookies:
+            return False
+
+        return 'no-store' not in response.headers.get('Cache-Control', '')
+
+    def _freeze(self, response):
+
+        ''' Encode the response body once and compute its ETag. '''
+
+        body = bytes(response.encode_body())
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+        headers = dict(response.headers)
+        headers['ETag'] = etag
+
+        if self.vary:
+            headers['Vary'] = ', '.join(self.vary)
+
+        return (response.status_code, headers, body, etag)
+
+    def _etag_matches(self, request, etag):
+
+        ''' Compare `If-None-Match` against the cached ETag (weak comparison). '''
+
+        header = request.headers.get('if-none-match')
+
+        if not header:
+            return False
+
+        if header.strip() == '*':
+            return True
+
+        candidates = (tag.strip().removeprefix('W/') for tag in header.split(','))
+        return etag in candidates
@@ -45,7 +45,7 @@ class CorsMiddleware(BaseMiddleware):
         allow_methods = route_config.get('methods', self.allow_methods) if route_config else self.allow_methods
         allow_headers = route_config.get('headers', self.allow_headers) if route_config else self.allow_headers
 
-        response = handler(request)
+        response = await handler(request)
         
         # --- make it always response ---
         if not isinstance(response, Response):
@@ -0,0 +1,186 @@
+from citra_framework.components.middleware import BaseMiddleware
+from citra_framework.components.error_pages.error import TooManyRequestsError
+from collections import OrderedDict
+import math
+import time
+
+class RateLimitMiddleware(BaseMiddleware):
+
+    '''
+    Middleware for token-bucket rate limiting.
+
+    Every client key owns a bucket holding up to `burst` tokens that refills
+    at `rate` tokens per second, each request takes one token and a request
+    finding an empty bucket is answered with `429 Too Many Requests` and a
+    `Retry-After` header.
+
+    Buckets live in an `OrderedDict` bounded by `max_keys`: a hit moves its
+    bucket to the end and the least recently seen (idle) bucket is evicted
+    first, so updates are O(1) and memory stays flat even when an attacker
+    rotates through millions of keys.
+
+    A global limit applies to every request, routes can add their own limit
+    through `send()` with `rate_limit=(rate, burst)` or disable limiting with
+    `rate_limit=False`. The limits are checked in `admit()`, before the
+    route's bulkhead is acquired, and the global limit also covers requests
+    to unknown paths, so flooding URLs that do not exist is limited too.
+
+    Args:
+        rate (float, optional): global tokens per second, `None` disables the global limit.
+        burst (int, optional): global bucket capacity (default: `rate`).
+        header (str, optional): request header used as key (e.g., `X-Api-Key`), falls back to client IP.
+        key_func (callable, optional): custom `key(request)`, overrides `header`.
+        max_keys (int, optional): maximum number of tracked buckets (default: `100000`).
+
+    Example:
+        core.middleware.add(RateLimitMiddleware(rate=20, burst=40))
+
+        core.send('/login', login, method='POST', rate_limit=(1, 5))
+        core.send('/health', health, rate_limit=False)
+    '''
+
+    def __init__(
+        self,
+        rate=None,
+        burst=None,
+        header=None,
+        key_func=None,
+        max_keys=100000
+    ):
+        self.rate = rate
+        self.burst = burst or rate
+        self.header = header.lower() if header else None
+        self.key_func = key_func
+        self.max_keys = max_keys
+
+        # --- key -> [tokens, last_refill] ---
+        self._buckets = OrderedDict()
+
+        # --- counters ---
+        self.allowed = 0
+        self.limited = 0
+        self.evictions = 0
+
+    async def process_request(self, request, handler):
+
+        '''
+        Requests reaching the chain were already admitted by `admit()`.
+
+        Args:
+            request (Request): incoming HTTP request object.
+            handler (callable): the route handler to process the request.
+        '''
+
+        return await handler(request)
+
+    def admit(self, request):
+
+        '''
+        Take a token from the global and route buckets or reject the request.
+
+        Args:
+            request (Request): incoming HTTP request, `request.route` is unset for unknown paths.
+
+        Returns:
+            Response | None: the 429 response, `None` when the request is allowed.
+        '''
+
+        route_config = getattr(request, 'route', None) or {}
+        route_limit = route_config.get('rate_limit')
+
+        if route_limit is False:
+            return None
+
+        client = self._client_key(request)
+        now = time.monotonic()
+
+        if self.rate:
+            wait = self._take(('*', client), self.rate, self.burst, now)
+            if wait:
+                return self._reject(wait)
+
+        if route_limit:
+            rate, burst = route_limit
+            wait = self._take((id(route_config), client), rate, burst, now)
+            if wait:
+                # --- a request the route turns away does not spend global capacity ---
+                if self.rate:
+                    self._refund(('*', client), self.burst)
+                return self._reject(wait)
+
+        self.allowed += 1
+        return None
+
+    def _client_key(self, request):
+
+        ''' Resolve the bucket key of a request. '''
+
+        if self.key_func:
+            return self.key_func(request)
+
+        if self.header:
+            value = request.headers.get(self.header)
+            if value:
+                return value
+
+        return getattr(request, 'client', None)
+
+    def _take(self, key, rate, burst, now):
+
+        '''
+        Take one token from a bucket.
+
+        Returns:
+            float: `0` when allowed, otherwise seconds until a token is available.
+        '''
+
+        bucket = self._buckets.get(key)
+
+        if bucket is None:
+            bucket = [burst, now]
+            self._buckets[key] = bucket
+
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0
+
+        return (1 - bucket[0]) / rate
+
+    def _refund(self, key, burst):
+
+        ''' Give back the token taken from a bucket. '''
+
+        bucket = self._buckets.get(key)
+
+        if bucket is not None:
+            bucket[0] = min(burst, bucket[0] + 1)
+
+    def _reject(self, wait):
+
+        ''' Build the 429 response with `Retry-After`. '''
+
+        self.limited += 1
+        retry_after = max(1, math.ceil(wait))
+
+        response = TooManyRequestsError(details=f'Rate limit exceeded. Retry after {retry_after}s.').display()
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+
+    def stats(self):
+
+        ''' Return rate limiting counters as a dictionary. '''
+
+        return {
+            'keys': len(self._buckets),
+            'allowed': self.allowed,
+            'limited': self.limited,
+            'evictions': self.evictions
+        }
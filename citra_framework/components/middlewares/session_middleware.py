@@ -0,0 +1,99 @@
+from citra_framework.components.middleware import BaseMiddleware
+from citra_framework.components.response import Response
+from citra_framework.components.sessions import Session, CookieSessionBackend
+
+class SessionMiddleware(BaseMiddleware):
+
+    '''
+    Middleware attaching a per-client `request.session`.
+
+    Sessions are stored in an HMAC-SHA256 signed cookie by default, so they
+    need no shared state between workers. The cookie is verified and decoded
+    only when the handler touches `request.session`, and a `Set-Cookie` header
+    is only sent when the session was modified, untouched sessions cost
+    nothing and their responses stay cacheable.
+
+    Pass `store=MemorySessionStore()` to keep the data server-side in a
+    bounded LRU and send only a signed session id.
+
+    Args:
+        secret (str | bytes): signing key, keep it out of the source code.
+        cookie_name (str, optional): session cookie name (default: `citra_session`).
+        max_age (int, optional): session lifetime in seconds (default: 14 days).
+        store (MemorySessionStore, optional): server-side store instead of cookie sessions.
+        path (str, optional): cookie `Path` (default: `/`).
+        secure (bool, optional): send the cookie over HTTPS only.
+        http_only (bool, optional): hide the cookie from JavaScript (default: `True`).
+        same_site (str, optional): cookie `SameSite` policy (default: `Lax`).
+
+    Example:
+        core.middleware.add(SessionMiddleware(secret=os.environ['CITRA_SECRET'], secure=True))
+
+        async def cart(request):
+            request.session['items'] = request.session.get('items', 0) + 1
+            return Response.Json({'items': request.session['items']})
+    '''
+
+    def __init__(
+        self,
+        secret,
+        cookie_name='citra_session',
+        max_age=14 * 24 * 3600,
+        store=None,
+        path='/',
+        secure=False,
+        http_only=True,
+        same_site='Lax'
+    ):
+        self.cookie_name = cookie_name
+        self.max_age = max_age
+        self.path = path
+        self.secure = secure
+        self.http_only = http_only
+        self.same_site = same_site
+
+        if store is None:
+            self.backend = CookieSessionBackend(secret, max_age)
+        else:
+            store.bind(secret, max_age)
+            self.backend = store
+
+    async def process_request(self, request, handler):
+
+        '''
+        Attach the session, then persist it if the handler modified it.
+
+        Args:
+            request (Request): incoming HTTP request object.
+            handler (callable): the route handler to process the request.
+        '''
+
+        cookie = request.cookies.get(self.cookie_name)
+        request.session = Session(lambda: self.backend.load(cookie))
+
+        response = await handler(request)
+
+        if not request.session.modified:
+            return response
+
+        # --- make it always response ---
+        if not isinstance(response, Response):
+            response = Response(response)
+
+        value = self.backend.save(cookie, request.session)
+
+        if value == '' and not cookie:
+            return response
+
+        # --- an empty value expires the cookie ---
+        response.set_cookie(
+            self.cookie_name,
+            value,
+            max_age=self.max_age if value else 0,
+            path=self.path,
+            secure=self.secure,
+            http_only=self.http_only,
+            same_site=self.same_site
+        )
+
+        return response
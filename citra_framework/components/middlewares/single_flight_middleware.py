@@ -0,0 +1,138 @@
+from citra_framework.components.middleware import BaseMiddleware
+from citra_framework.components.response import Response, StreamingResponse
+from citra_framework.components.cache import request_key
+import asyncio
+
+class SingleFlightMiddleware(BaseMiddleware):
+
+    '''
+    Middleware for coalescing identical concurrent requests.
+
+    When several requests with the same key arrive while a handler for
+    that key is still running, only the first one executes the handler,
+    the others await its result and receive a copy of the same response.
+    This keeps a cold cache or an expired page from sending hundreds of
+    identical queries to the database at once.
+
+    Coalescing is opt-in per route through `send()`, the option is either
+    `True` (use the middleware key function) or a callable `key(request)`.
+
+    Args:
+        key_func (callable, optional): builds the coalescing key (default: method, path and sorted query).
+        timeout (float, optional): seconds a follower waits before running the handler itself.
+        methods (tuple[str], optional): methods that may be coalesced (default: GET, HEAD).
+
+    Example:
+        flight = SingleFlightMiddleware(timeout=5)
+        core.middleware.add(flight)
+
+        core.send('/users', list_users, single_flight=True)
+        core.send('/report', report, single_flight=lambda request: request.query.get('month'))
+    '''
+
+    def __init__(
+        self,
+        key_func=None,
+        timeout=None,
+        methods=('GET', 'HEAD')
+    ):
+        self.key_func = key_func or request_key
+        self.timeout = timeout
+        self.methods = tuple(methods)
+
+        # --- key -> future of the running handler ---
+        self._inflight = {}
+
+        # --- counters ---
+        self.executions = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    async def process_request(self, request, handler):
+
+        '''
+        Run the handler once per key and share its response.
+
+        Args:
+            request (Request): incoming HTTP request object.
+            handler (callable): the route handler to process the request.
+        '''
+
+        route_config = getattr(request, 'route', None) or {}
+        option = route_config.get('single_flight')
+
+        if not option or request.method not in self.methods:
+            return await handler(request)
+
+        key_func = option if callable(option) else self.key_func
+        key = key_func(request)
+        leader = self._inflight.get(key)
+
+        if leader is not None:
+            try:
+                response = await asyncio.wait_for(asyncio.shield(leader), self.timeout)
+
+                # --- a stream can be consumed once, this request runs the handler too ---
+                if isinstance(response, StreamingResponse):
+                    return await handler(request)
+
+                self.coalesced += 1
+                return self._copy(response)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+            except asyncio.CancelledError:
+                # --- the leader was cancelled, not this request ---
+                if not leader.cancelled():
+                    raise
+
+            return await handler(request)
+
+        return await self._lead(key, request, handler)
+
+    async def _lead(self, key, request, handler):
+
+        ''' Execute the handler and publish its outcome to waiting followers. '''
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.executions += 1
+
+        try:
+            response = await handler(request)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+
+            # --- mark retrieved so a lone leader does not log a warning ---
+            future.exception()
+            raise
+        else:
+            future.set_result(response)
+            return response
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def _copy(self, response):
+
+        ''' Give each follower its own response object (headers are mutated downstream). '''
+
+        if isinstance(response, Response):
+            copy = Response(response.body, response.status_code, dict(response.headers))
+            copy.cookies = list(response.cookies)
+            return copy
+
+        return response
+
+    def stats(self):
+
+        ''' Return coalescing counters as a dictionary. '''
+
+        return {
+            'executions': self.executions,
+            'coalesced': self.coalesced,
+            'timeouts': self.timeouts,
+            'in_flight': len(self._inflight)
+        }
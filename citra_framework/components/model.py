@@ -0,0 +1,255 @@
+'''
+Lightweight model layer on top of `Database`.
+
+Models declare their table and fields, instances are `__slots__` objects
+instead of per-row dictionaries, queries select only the declared columns
+and relations are loaded with one batched `IN (...)` query per relation
+instead of one query per row.
+
+Example:
+    class Post(Model):
+        table = 'posts'
+        fields = ('id', 'user_id', 'title')
+
+    class User(Model):
+        table = 'users'
+        fields = ('id', 'name', 'age')
+        posts = Relation(Post, foreign_key='user_id')
+
+    class Comment(Model):
+        table = 'comments'
+        fields = ('id', 'post_id', 'body')
+        post = Relation(Post, foreign_key='post_id', many=False)
+
+    # --- 2 queries: users, then all of their posts ---
+    users = User.select(core.database, include=('posts',))
+
+    for user in users:
+        print(user.name, [post.title for post in user.posts])
+'''
+
+class Relation:
+
+    '''
+    Declares a relation between two models.
+
+    Args:
+        model (type[Model]): related model.
+        foreign_key (str): column holding the reference.
+        many (bool, optional): `True` (default) when `model.foreign_key` references
+            this model (one-to-many), `False` when `self.foreign_key` references
+            `model` (many-to-one).
+    '''
+
+    def __init__(self, model, foreign_key, many=True):
+        self.model = model
+        self.foreign_key = foreign_key
+        self.many = many
+        self.name = None
+
+    def load(self, database, instances):
+
+        '''
+        Attach related rows to every instance with a single `IN (...)` query.
+
+        Args:
+            database (Database): database to query.
+            instances (list[Model]): instances to fill.
+        '''
+
+        if not instances:
+            return
+
+        if self.many:
+            owner_key = type(instances[0]).primary_key
+            match_column = self.foreign_key
+            keys = {getattr(instance, owner_key) for instance in instances}
+        else:
+            owner_key = self.foreign_key
+            match_column = self.model.primary_key
+            keys = {getattr(instance, owner_key) for instance in instances}
+
+        keys.discard(None)
+        related = self.model.select(
+            database,
+            where=f'{match_column} IN ({", ".join(["%s"] * len(keys))})',
+            where_values=tuple(keys)
+        ) if keys else []
+
+        if self.many:
+            groups = {}
+            for row in related:
+                groups.setdefault(getattr(row, match_column), []).append(row)
+
+            for instance in instances:
+                setattr(instance, self.name, groups.get(getattr(instance, owner_key), []))
+        else:
+            index = {getattr(row, match_column): row for row in related}
+
+            for instance in instances:
+                setattr(instance, self.name, index.get(getattr(instance, owner_key)))
+
+
+class ModelMeta(type):
+
+    '''
+    Builds `__slots__` from the declared `fields` and relations.
+    '''
+
+    def __new__(mcs, name, bases, namespace):
+        relations = {}
+
+        for base in bases:
+            relations.update(getattr(base, '_relations', {}))
+
+        for attribute, value in list(namespace.items()):
+            if isinstance(value, Relation):
+                value.name = attribute
+                relations[attribute] = value
+                del namespace[attribute]
+
+        inherited = set()
+        for base in bases:
+            for klass in base.__mro__:
+                inherited.update(getattr(klass, '__slots__', ()))
+
+        fields = tuple(namespace.get('fields', ()))
+        namespace['__slots__'] = tuple(
+            slot for slot in fields + tuple(relations) if slot not in inherited
+        )
+        namespace['_relations'] = relations
+
+        return super().__new__(mcs, name, bases, namespace)
+
+
+class Model(metaclass=ModelMeta):
+
+    '''
+    Base class for models.
+
+    Attributes:
+        table (str): table name.
+        fields (tuple[str]): selected columns, also the instance slots.
+        primary_key (str): primary key column (default: `'id'`).
+    '''
+
+    table = None
+    fields = ()
+    primary_key = 'id'
+
+    def __init__(self, **values):
+        for field in self.fields:
+            setattr(self, field, values.get(field))
+
+        for name, relation in self._relations.items():
+            setattr(self, name, [] if relation.many else None)
+
+    @classmethod
+    def from_row(cls, row):
+
+        '''
+        Build an instance from a row mapping.
+
+        Args:
+            row (dict): row returned by `Database.select`.
+        '''
+
+        instance = cls.__new__(cls)
+
+        for field in cls.fields:
+            setattr(instance, field, row.get(field))
+
+        for name, relation in cls._relations.items():
+            setattr(instance, name, [] if relation.many else None)
+
+        return instance
+
+    @classmethod
+    def from_values(cls, values):
+
+        '''
+        Build an instance from a tuple in `fields` order.
+
+        Args:
+            values (tuple): column values.
+        '''
+
+        instance = cls.__new__(cls)
+
+        for field, value in zip(cls.fields, values):
+            setattr(instance, field, value)
+
+        for name, relation in cls._relations.items():
+            setattr(instance, name, [] if relation.many else None)
+
+        return instance
+
+    @classmethod
+    def select(
+        cls,
+        database,
+        where=None,
+        where_values=None,
+        include=()
+    ):
+
+        '''
+        Fetch instances, selecting only the declared fields.
+
+        Args:
+            database (Database): database to query.
+            where (str, optional): sql `WHERE` condition string.
+            where_values (tuple, optional): values for the `WHERE` condition placeholders.
+            include (iterable[str], optional): relations to load eagerly.
+
+        Returns:
+            list[Model]: fetched instances.
+        '''
+
+        # --- tuple rows follow `fields` order, no dictionary is built per row ---
+        rows = database.select(cls.table, where=where, where_values=where_values, columns=cls.fields, format='tuple')
+        instances = [cls.from_values(values) for values in rows]
+
+        for name in include:
+            if name not in cls._relations:
+                raise KeyError(f'{cls.__name__} has no relation {name}')
+            cls._relations[name].load(database, instances)
+
+        return instances
+
+    @classmethod
+    def get(cls, database, key, include=()):
+
+        '''
+        Fetch one instance by primary key.
+
+        Args:
+            database (Database): database to query.
+            key (any): primary key value.
+            include (iterable[str], optional): relations to load eagerly.
+
+        Returns:
+            Model | None: instance, `None` when not found.
+        '''
+
+        instances = cls.select(database, where=f'{cls.primary_key}=%s', where_values=(key,), include=include)
+        return instances[0] if instances else None
+
+    def to_dict(self):
+
+        ''' Return the field values as a dictionary. '''
+
+        return {field: getattr(self, field) for field in self.fields}
+
+    def __getitem__(self, name):
+
+        ''' Allow `row['name']` access so Zest templates work with models and dicts alike. '''
+
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def __repr__(self):
+        values = ', '.join(f'{field}={getattr(self, field)!r}' for field in self.fields)
+        return f'{type(self).__name__}({values})'
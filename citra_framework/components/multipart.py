@@ -0,0 +1,391 @@
+'''
+Streaming `multipart/form-data` parser for `Citra` framework.
+
+The server feeds the request body to `MultipartParser` chunk by chunk as it
+arrives from the socket, the body is never held in memory as a whole.
+Plain fields are collected into `request.form` (bounded by
+`max_field_size`), file parts are written to a `SpooledTemporaryFile` that
+stays in memory up to `spool_size` and rolls over to disk after that, so
+memory per upload stays constant whatever the file size.
+
+Example:
+    async def upload(request):
+        avatar = request.files['avatar']
+        header = await avatar.read(8)
+        await avatar.seek(0)
+        ...
+        return Response(f'{avatar.filename}: {avatar.size} bytes')
+
+    core.send('/upload', upload, method='POST')
+'''
+
+from email.message import Message
+from tempfile import SpooledTemporaryFile
+import asyncio
+
+
+class MultipartError(Exception):
+
+    '''
+    Raised for a malformed or oversized multipart body.
+
+    Attributes:
+        status (int): HTTP status to answer with, `400` or `413`.
+    '''
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def header_option(value, option):
+
+    '''
+    Return an option of a header value (e.g., `boundary` of `Content-Type`).
+
+    Args:
+        value (str): header value.
+        option (str): option name.
+    '''
+
+    message = Message()
+    message['content-type'] = value
+    return message.get_param(option, header='content-type')
+
+
+class UploadFile:
+
+    '''
+    An uploaded file part.
+
+    Attributes:
+        name (str): form field name.
+        filename (str): client-side file name.
+        content_type (str): part `Content-Type`.
+        size (int): bytes received.
+        file (SpooledTemporaryFile): underlying file, positioned at the start.
+    '''
+
+    def __init__(self, name, filename, content_type, spool_size):
+        self.name = name
+        self.filename = filename
+        self.content_type = content_type
+        self.size = 0
+        self.file = SpooledTemporaryFile(max_size=spool_size)
+
+    @property
+    def in_memory(self):
+
+        ''' `True` while the part has not rolled over to disk. '''
+
+        return not getattr(self.file, '_rolled', True)
+
+    def write(self, data):
+        self.size += len(data)
+        self.file.write(data)
+
+    async def read(self, size=-1):
+
+        '''
+        Read from the file, off the event loop once it lives on disk.
+
+        Args:
+            size (int, optional): bytes to read, `-1` reads the rest.
+        '''
+
+        if self.in_memory:
+            return self.file.read(size)
+
+        return await asyncio.to_thread(self.file.read, size)
+
+    async def seek(self, offset, whence=0):
+        if self.in_memory:
+            return self.file.seek(offset, whence)
+
+        return await asyncio.to_thread(self.file.seek, offset, whence)
+
+    def close(self):
+        self.file.close()
+
+    def __repr__(self):
+        return f'UploadFile(name={self.name!r}, filename={self.filename!r}, size={self.size})'
+
+
+class MultipartParser:
+
+    '''
+    Incremental `multipart/form-data` parser.
+
+    Attributes:
+        form (dict): plain fields, repeated names collect into a list.
+        files (dict): `UploadFile` parts, repeated names collect into a list.
+
+    Example:
+        parser = MultipartParser(header_option(content_type, 'boundary'))
+        for chunk in chunks:
+            parser.feed(chunk)
+        parser.finish()
+    '''
+
+    PREAMBLE, HEADERS, BODY, DONE = range(4)
+
+    def __init__(
+        self,
+        boundary,
+        max_part_size=100 * 1024 * 1024,
+        max_total_size=100 * 1024 * 1024,
+        max_field_size=64 * 1024,
+        max_parts=1000,
+        max_header_size=16 * 1024,
+        spool_size=1024 * 1024
+    ):
+
+        '''
+        Initialize the parser.
+
+        Args:
+            boundary (str): boundary from the request `Content-Type`.
+            max_part_size (int, optional): size limit of one file part defaults to `100MB`.
+            max_total_size (int, optional): size limit of the whole body defaults to `100MB`.
+            max_field_size (int, optional): size limit of one plain field defaults to `64KB`.
+            max_parts (int, optional): maximum number of parts defaults to `1000`.
+            max_header_size (int, optional): size limit of one part head defaults to `16KB`.
+            spool_size (int, optional): bytes a file part keeps in memory before rolling to disk defaults to `1MB`.
+        '''
+
+        if not boundary:
+            raise MultipartError('Missing multipart boundary.')
+
+        self.delimiter = b'--' + boundary.encode('latin-1')
+        self.separator = b'\r\n' + self.delimiter
+        self.max_part_size = max_part_size
+        self.max_total_size = max_total_size
+        self.max_field_size = max_field_size
+        self.max_parts = max_parts
+        self.max_header_size = max_header_size
+        self.spool_size = spool_size
+
+        self.form = {}
+        self.files = {}
+
+        self.state = self.PREAMBLE
+        self.received = 0
+        self.parts = 0
+        self._buffer = bytearray()
+        self._part = None
+        self._field = None
+
+    def feed(self, data):
+
+        '''
+        Parse the next chunk of the body.
+
+        Args:
+            data (bytes): body bytes in arrival order.
+
+        Raises:
+            MultipartError: malformed body or a size limit exceeded.
+        '''
+
+        self.received += len(data)
+
+        if self.received > self.max_total_size:
+            raise MultipartError('Multipart body too large.', 413)
+
+        self._buffer += data
+
+        while self.state != self.DONE:
+            if self.state == self.PREAMBLE:
+                found = self._buffer.find(self.delimiter)
+
+                if found < 0:
+                    # --- keep only what may be the start of the delimiter ---
+                    del self._buffer[:max(0, len(self._buffer) - len(self.delimiter))]
+                    return
+
+                if len(self._buffer) < found + len(self.delimiter) + 2:
+                    return
+
+                if not self._after_delimiter(found + len(self.delimiter)):
+                    return
+
+            elif self.state == self.HEADERS:
+                end = self._buffer.find(b'\r\n\r\n')
+
+                if end < 0:
+                    if len(self._buffer) > self.max_header_size:
+                        raise MultipartError('Multipart part headers too large.')
+                    return
+
+                self._start_part(bytes(self._buffer[:end]))
+                del self._buffer[:end + 4]
+                self.state = self.BODY
+
+            elif self.state == self.BODY:
+                found = self._buffer.find(self.separator)
+
+                if found < 0:
+                    # --- the separator may straddle two chunks, hold back its length ---
+                    keep = len(self.separator) - 1
+                    if len(self._buffer) > keep:
+                        self._write(self._buffer[:-keep])
+                        del self._buffer[:-keep]
+                    return
+
+                if len(self._buffer) < found + len(self.separator) + 2:
+                    return
+
+                self._write(self._buffer[:found])
+                self._end_part()
+
+                if not self._after_delimiter(found + len(self.separator)):
+                    return
+
+    def _after_delimiter(self, position):
+
+        ''' Consume a delimiter and the line ending after it. '''
+
+        marker = bytes(self._buffer[position:position + 2])
+
+        if marker == b'--':
+            self.state = self.DONE
+            self._buffer.clear()
+            return False
+
+        if marker != b'\r\n':
+            raise MultipartError('Malformed multipart delimiter.')
+
+        del self._buffer[:position + 2]
+        self.state = self.HEADERS
+        return True
+
+    def _start_part(self, raw):
+        self.parts += 1
+
+        if self.parts > self.max_parts:
+            raise MultipartError('Too many multipart parts.', 413)
+
+        headers = Message()
+        for line in raw.decode('utf-8', 'replace').split('\r\n'):
+            name, _, value = line.partition(':')
+            if name:
+                headers[name.strip()] = value.strip()
+
+        name = headers.get_param('name', header='content-disposition')
+        filename = headers.get_param('filename', header='content-disposition')
+
+        if name is None:
+            raise MultipartError('Multipart part without a name.')
+
+        if filename is None:
+            self._field = (name, bytearray())
+        else:
+            self._part = UploadFile(name, filename, headers.get('content-type', 'application/octet-stream'), self.spool_size)
+
+    def _write(self, data):
+        if not data:
+            return
+
+        if self._part is not None:
+            if self._part.size + len(data) > self.max_part_size:
+                raise MultipartError(f'File {self._part.filename} too large.', 413)
+            self._part.write(data)
+        elif self._field is not None:
+            if len(self._field[1]) + len(data) > self.max_field_size:
+                raise MultipartError(f'Field {self._field[0]} too large.', 413)
+            self._field[1].extend(data)
+
+    def _end_part(self):
+        if self._part is not None:
+            self._part.file.seek(0)
+            self._collect(self.files, self._part.name, self._part)
+            self._part = None
+        elif self._field is not None:
+            name, value = self._field
+            self._collect(self.form, name, value.decode('utf-8', 'replace'))
+            self._field = None
+
+    @staticmethod
+    def _collect(target, name, value):
+        if name not in target:
+            target[name] = value
+        elif isinstance(target[name], list):
+            target[name].append(value)
+        else:
+            target[name] = [target[name], value]
+
+    def finish(self):
+
+        '''
+        Check the body ended with the closing delimiter.
+
+        Raises:
+            MultipartError: the body was truncated.
+        '''
+
+        if self.state != self.DONE:
+            raise MultipartError('Truncated multipart body.')
+
+    def close(self):
+
+        ''' Close every file part, including one left half-written. '''
+
+        if self._part is not None:
+            self._part.close()
+            self._part = None
+
+        close_files(self.files)
+
+
+def close_files(files):
+
+    '''
+    Close the `UploadFile` objects of a `request.files` dictionary.
+
+    Args:
+        files (dict): field name mapped to an `UploadFile` or a list of them.
+    '''
+
+    for value in files.values():
+        for upload in value if isinstance(value, list) else (value,):
+            upload.close()
+
+
+async def read_multipart(reader, length, content_type, chunk_size=64 * 1024, **limits):
+
+    '''
+    Stream a multipart body from `reader` into a parser.
+
+    Args:
+        reader (StreamReader): client stream reader, positioned at the body.
+        length (int): `Content-Length` of the body.
+        content_type (str): request `Content-Type` carrying the boundary.
+        chunk_size (int, optional): bytes read per step defaults to `64KB`.
+        **limits: `MultipartParser` limits.
+
+    Returns:
+        tuple: `(form, files)`.
+
+    Raises:
+        MultipartError: malformed or oversized body.
+    '''
+
+    parser = MultipartParser(header_option(content_type, 'boundary'), **limits)
+    remaining = length
+
+    try:
+        while remaining:
+            chunk = await reader.read(min(chunk_size, remaining))
+
+            if not chunk:
+                raise asyncio.IncompleteReadError(b'', remaining)
+
+            remaining -= len(chunk)
+            parser.feed(chunk)
+
+        parser.finish()
+    except BaseException:
+        parser.close()
+        raise
+
+    return parser.form, parser.files
@@ -0,0 +1,252 @@
+'''
+EXPLAIN-based query advisor for `Database` (debug mode).
+
+Every statement is normalized (literals and placeholders become `?`,
+`IN (...)` lists collapse) and timed. The first time a normalized SELECT,
+UPDATE or DELETE is seen it is run once through `EXPLAIN` and the plan is
+cached, so the advisor costs one extra round trip per distinct statement,
+not per call. Plans with a full table scan, a filesort or a temporary table
+are flagged and logged with a candidate index built from the `WHERE` and
+`ORDER BY` columns.
+
+Example:
+    core = Citra(enable_db=True, debug=True)   # advisor enabled in debug mode
+
+    for entry in core.database.advisor.report(limit=5):
+        print(entry['total_time'], entry['statement'], entry['flags'], entry['suggestion'])
+'''
+
+import re
+import threading
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|%\(\w+\)s')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_HINT = re.compile(r'/\*\+.*?\*/\s*')
+_SPACES = re.compile(r'\s+')
+
+_TABLE = re.compile(r'\b(?:FROM|UPDATE|INTO)\s+`?(\w+)`?', re.IGNORECASE)
+_WHERE = re.compile(r'\bWHERE\b(.*?)(?:\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|\bFOR\s+UPDATE\b|$)', re.IGNORECASE | re.DOTALL)
+_ORDER = re.compile(r'\bORDER\s+BY\b(.*?)(?:\bLIMIT\b|\bFOR\s+UPDATE\b|$)', re.IGNORECASE | re.DOTALL)
+_CONDITION = re.compile(r'`?(\w+)`?\s*(=|<=>|<>|!=|<=|>=|<|>|\bIN\b|\bLIKE\b|\bBETWEEN\b|\bIS\b)', re.IGNORECASE)
+
+_EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE')
+_KEYWORDS = {'AND', 'OR', 'NOT', 'NULL'}
+
+
+def normalize(query):
+
+    '''
+    Return the normalized form of a statement.
+
+    Args:
+        query (str): sql statement.
+
+    Example:
+        normalize("SELECT * FROM users WHERE id IN (1, 2, 3) AND name = 'ana'")
+        # 'SELECT * FROM users WHERE id IN (?) AND name = ?'
+    '''
+
+    statement = _HINT.sub('', query)
+    statement = _STRING.sub('?', statement)
+    statement = _PLACEHOLDER.sub('?', statement)
+    statement = _NUMBER.sub('?', statement)
+    statement = _IN_LIST.sub('IN (?)', statement)
+    return _SPACES.sub(' ', statement).strip()
+
+
+def suggest_index(query):
+
+    '''
+    Build a candidate index from the `WHERE` and `ORDER BY` columns.
+
+    Equality columns come first, then the `ORDER BY` columns, then the first
+    range column, the usual order for a composite B-tree index.
+
+    Args:
+        query (str): sql statement.
+
+    Returns:
+        str | None: `CREATE INDEX` statement, `None` when no column qualifies.
+    '''
+
+    table = _TABLE.search(query)
+    if not table:
+        return None
+
+    equality, ranges, order = [], [], []
+    where = _WHERE.search(query)
+
+    if where:
+        for column, operator in _CONDITION.findall(where.group(1)):
+            if column.upper() in _KEYWORDS:
+                continue
+            target = equality if operator.upper() in ('=', '<=>', 'IN', 'IS') else ranges
+            if column not in equality and column not in ranges:
+                target.append(column)
+
+    sort = _ORDER.search(query)
+
+    if sort:
+        for part in sort.group(1).split(','):
+            words = part.split()
+            if words and re.fullmatch(r'`?\w+`?', words[0]):
+                column = words[0].strip('`')
+                if column not in equality and column not in order:
+                    order.append(column)
+
+    columns = equality + order + [column for column in ranges[:1] if column not in order]
+
+    if not columns:
+        return None
+
+    name = f'idx_{table.group(1)}_{"_".join(columns)}'
+    return f'CREATE INDEX {name} ON {table.group(1)} ({", ".join(columns)})'
+
+
+class QueryAdvisor:
+
+    '''
+    Collects statement timings and cached `EXPLAIN` plans.
+
+    Attributes:
+        database (Database): database whose connection runs `EXPLAIN`.
+        statements (dict): normalized statement -> collected entry.
+        max_statements (int): distinct statements tracked.
+    '''
+
+    def __init__(self, database, max_statements=1000, logger=None):
+
+        '''
+        Initialize the advisor.
+
+        Args:
+            database (Database): database to explain statements on.
+            max_statements (int, optional): distinct statements tracked, later ones are ignored.
+            logger (Logger, optional): logger for flagged plans.
+        '''
+
+        self.database = database
+        self.max_statements = max_statements
+        self.logger = logger
+        self.statements = {}
+        self.explains = 0
+        self._lock = threading.Lock()
+
+    def observe(self, query, parameters=(), seconds=0.0):
+
+        '''
+        Record one execution, explaining the statement the first time it is seen.
+
+        Args:
+            query (str): executed sql statement.
+            parameters (tuple, optional): placeholder values, reused for `EXPLAIN`.
+            seconds (float, optional): execution time.
+        '''
+
+        key = normalize(query)
+
+        with self._lock:
+            entry = self.statements.get(key)
+
+            if entry is None:
+                if len(self.statements) >= self.max_statements:
+                    return
+
+                entry = self.statements[key] = {
+                    'statement': key,
+                    'count': 0,
+                    'total_time': 0.0,
+                    'max_time': 0.0,
+                    'plan': None,
+                    'flags': [],
+                    'suggestion': None
+                }
+                first = True
+            else:
+                first = False
+
+            entry['count'] += 1
+            entry['total_time'] += seconds
+            entry['max_time'] = max(entry['max_time'], seconds)
+
+        if first and key.split(' ', 1)[0].upper() in _EXPLAINABLE:
+            self._explain(entry, query, parameters)
+
+    def _explain(self, entry, query, parameters):
+
+        ''' Run `EXPLAIN` once and flag the plan. '''
+
+        connection = self.database.connection
+
+        if connection is None:
+            return
+
+        # --- own cursor, the caller may still read `lastrowid` or `rowcount` from its one ---
+        # --- the primary connection is shared by handler threads, statements on it never overlap ---
+        try:
+            with self.database._lock:
+                cursor = connection.cursor(dictionary=True)
+                cursor.execute(f'EXPLAIN {_HINT.sub("", query)}', parameters)
+                plan = cursor.fetchall()
+        except Exception as e:
+            if self.logger:
+                self.logger.warning(f'Query advisor could not EXPLAIN {entry["statement"]}. Error: {e}')
+            return
+
+        self.explains += 1
+        flags = []
+
+        for step in plan:
+            extra = step.get('Extra') or ''
+            table = step.get('table')
+
+            if step.get('type') == 'ALL':
+                flags.append(f'full scan on {table} ({step.get("rows")} rows)')
+            if 'Using filesort' in extra:
+                flags.append(f'filesort on {table}')
+            if 'Using temporary' in extra:
+                flags.append(f'temporary table on {table}')
+
+        entry['plan'] = plan
+        entry['flags'] = flags
+
+        if flags:
+            entry['suggestion'] = suggest_index(query)
+
+            if self.logger:
+                hint = f' Candidate: {entry["suggestion"]}' if entry['suggestion'] else ''
+                self.logger.warning(f'Query advisor: {"; ".join(flags)} in {entry["statement"]}.{hint}')
+
+    def report(self, limit=10, flagged_only=False):
+
+        '''
+        Return the statements with the highest total time.
+
+        Args:
+            limit (int, optional): number of statements defaults to `10`.
+            flagged_only (bool, optional): only statements with a flagged plan.
+
+        Returns:
+            list[dict]: entries with `statement`, `count`, `total_time`, `avg_time`,
+                `max_time`, `flags` and `suggestion`, worst first.
+        '''
+
+        with self._lock:
+            entries = [dict(entry) for entry in self.statements.values() if entry['flags'] or not flagged_only]
+
+        entries.sort(key=lambda entry: entry['total_time'], reverse=True)
+
+        for entry in entries:
+            entry['avg_time'] = entry['total_time'] / entry['count']
+            del entry['plan']
+
+        return entries[:limit]
+
+    def reset(self):
+
+        ''' Forget every collected statement and plan. '''
+
+        with self._lock:
+            self.statements.clear()
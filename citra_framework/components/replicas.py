@@ -0,0 +1,170 @@
+import itertools
+import threading
+import time
+
+class Replica:
+
+    '''
+    One read replica of a `Database`.
+
+    Attributes:
+        name (str): `host:database` label used in logs and stats.
+        config (dict): connection details (`hostname`, `username`, `password`, `database`).
+        connection: active connection, `None` while the replica is down.
+        in_flight (int): queries currently running on this replica.
+        latency (float): exponentially weighted query latency in seconds.
+        lock (Lock): serializes statements on the connection, shared by handler threads.
+    '''
+
+    def __init__(self, config):
+        self.config = config
+        self.name = f'{config.get("hostname", "localhost")}:{config.get("database", "")}'
+        self.connection = None
+        self.cursor = None
+        self._plain_cursor = None
+        self.lock = threading.Lock()
+
+        self.in_flight = 0
+        self.latency = 0.0
+        self.down_until = 0.0
+
+        # --- counters ---
+        self.queries = 0
+        self.failures = 0
+
+    def tuple_cursor(self):
+
+        ''' Return the plain (tuple) cursor, created on first use. '''
+
+        if self._plain_cursor is None:
+            self._plain_cursor = self.connection.cursor()
+
+        return self._plain_cursor
+
+    def record(self, seconds):
+
+        ''' Record the latency of a finished query. '''
+
+        self.queries += 1
+        self.latency = seconds if not self.latency else self.latency * 0.8 + seconds * 0.2
+
+
+class ReplicaPool:
+
+    '''
+    Chooses a healthy replica for each read.
+
+    Replicas that fail to connect or fail a query are marked down for
+    `retry_after` seconds, then reconnected lazily on the next read.
+
+    Strategies:
+        - `'round_robin'`: rotate over the healthy replicas.
+        - `'least_loaded'`: fewest in-flight queries, then lowest latency.
+
+    Attributes:
+        replicas (list[Replica]): configured replicas.
+    '''
+
+    STRATEGIES = ('round_robin', 'least_loaded')
+
+    def __init__(
+        self,
+        connect,
+        configs,
+        strategy='round_robin',
+        retry_after=30.0,
+        logger=None
+    ):
+
+        '''
+        Initialize the pool.
+
+        Args:
+            connect (callable): `connect(config)` returning a connection, raising on failure.
+            configs (list[dict]): replica connection details.
+            strategy (str, optional): `'round_robin'` or `'least_loaded'`.
+            retry_after (float, optional): seconds a failed replica stays down.
+            logger (Logger, optional): logger for state changes.
+        '''
+
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f'Unknown replica strategy: {strategy}')
+
+        self.connect = connect
+        self.strategy = strategy
+        self.retry_after = retry_after
+        self.logger = logger
+        self.replicas = [Replica(config) for config in configs]
+        self._rotation = itertools.count()
+
+    def choose(self):
+
+        '''
+        Return a healthy replica, or `None` when every replica is down.
+        '''
+
+        now = time.monotonic()
+        healthy = [replica for replica in self.replicas if self._available(replica, now)]
+
+        if not healthy:
+            return None
+
+        if self.strategy == 'least_loaded':
+            return min(healthy, key=lambda replica: (replica.in_flight, replica.latency))
+
+        return healthy[next(self._rotation) % len(healthy)]
+
+    def _available(self, replica, now):
+
+        ''' Check a replica, reconnecting it once its down period is over. '''
+
+        if replica.down_until > now:
+            return False
+
+        if replica.connection is not None:
+            return True
+
+        try:
+            replica.connection = self.connect(replica.config)
+            replica.cursor = replica.connection.cursor(dictionary=True)
+            replica._plain_cursor = None
+            return True
+        except Exception as e:
+            self.mark_down(replica, e)
+            return False
+
+    def mark_down(self, replica, error=None):
+
+        '''
+        Take a replica out of rotation for `retry_after` seconds.
+
+        Args:
+            replica (Replica): failed replica.
+            error (Exception, optional): cause, for the log.
+        '''
+
+        replica.failures += 1
+        replica.down_until = time.monotonic() + self.retry_after
+        replica.connection = None
+        replica.cursor = None
+        replica._plain_cursor = None
+
+        if self.logger:
+            self.logger.warning(f'Replica {replica.name} marked down for {self.retry_after}s. Error: {error}')
+
+    def stats(self):
+
+        ''' Return per-replica state and counters. '''
+
+        now = time.monotonic()
+
+        return {
+            replica.name: {
+                'up': replica.down_until <= now,
+                'in_flight': replica.in_flight,
+                'latency': replica.latency,
+                'queries': replica.queries,
+                'failures': replica.failures
+            }
+            for replica in self.replicas
+        }
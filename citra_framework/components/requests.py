@@ -1,6 +1,9 @@
+from contextvars import ContextVar
 import json
 import urllib.parse 
 
+_current_request = ContextVar('citra_request', default=None)
+
 class Request:
     
     '''
@@ -12,7 +15,12 @@ class Request:
         - request.headers -> dictionary of headers.
         - request.json -> parsed `JSON` body.
         - request.form -> dictionary of `POST` data.
+        - request.files -> dictionary of `UploadFile` parts of a multipart body.
         - request.query -> dict of query parameters `(?x=1)`.
+        - request.client -> client IP address.
+        - request.cookies -> dictionary of request cookies.
+        - request.session -> `Session` set by `SessionMiddleware` (`None` without it).
+        - request.user -> token claims set by `AuthenticationMiddleware` (`None` if unauthenticated).
     '''   
     
     def __init__(
@@ -42,12 +50,80 @@ class Request:
         # --- parsed data ---
         self.json = None 
         self.form = {}
+        self.files = {}
         self.query = self._parse_query() 
         
+        # --- peer address, set by the server ---
+        self.client = None
+        
+        # --- tasks run after the response is written ---
+        self.background = []
+        
+        # --- set by `AuthenticationMiddleware` ---
+        self.user = None
+        
+        # --- set by `SessionMiddleware` ---
+        self.session = None
+        self._cookies = None
+        
+        # --- set by the router once a route is matched ---
+        self.cors = None
+        self.route = {}
+        self.handler = None
+        
         if self.body and 'application/x-www-form-urlencoded' in headers.get('content-type', ''):
             parsed = urllib.parse.parse_qs(self.body.decode())
             self.form = {key: value[0] if len(value) == 1 else value for key, value in parsed.items()}
     
+    @staticmethod
+    def current():
+        
+        '''
+        Return the request being dispatched in the current context.
+        
+        Returns:
+            Request | None: current request, `None` outside of a handler.
+        '''
+        
+        return _current_request.get()
+    
+    @property
+    def cookies(self):
+        
+        '''
+        Cookies of the `Cookie` header, parsed on first access.
+        '''
+        
+        if self._cookies is None:
+            self._cookies = {}
+            
+            for pair in self.headers.get('cookie', '').split(';'):
+                name, separator, value = pair.partition('=')
+                name = name.strip()
+                
+                if separator and name and name not in self._cookies:
+                    self._cookies[name] = value.strip().strip('"')
+        
+        return self._cookies
+    
+    def snapshot(self):
+        
+        '''
+        Return a picklable copy for handlers run on a process pool.
+        
+        Only plain data is kept: method, path, headers, body, `json`, `form`,
+        `query`, `client` and `user`. Uploaded files, the session, route
+        options and attributes added by middlewares stay in this process.
+        '''
+        
+        copy = Request(self.method, self.path, dict(self.headers), self.body)
+        copy.json = self.json
+        copy.form = self.form
+        copy.query = self.query
+        copy.client = self.client
+        copy.user = self.user
+        return copy
+    
     def _parse_query(self):
         
         '''
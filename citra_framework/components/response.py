@@ -1,4 +1,5 @@
 import json 
+import inspect
 
 class Response:
     
@@ -7,16 +8,24 @@ class Response:
     '''
     
     STATUS_REASONS = {
+        101: "Switching Protocols",
         200: "OK",
         201: "Created",
         204: "No Content",
         301: "Moved Permanently",
         302: "Found",
+        304: "Not Modified",
         400: "Bad Request",
         401: "Unauthorized",
         403: "Forbidden",
         404: "Not Found",
+        408: "Request Timeout",
+        413: "Payload Too Large",
+        429: "Too Many Requests",
+        431: "Request Header Fields Too Large",
         500: "Internal Server Error",
+        503: "Service Unavailable",
+        504: "Gateway Timeout",
     }
     
     def __init__(
@@ -33,10 +42,58 @@ class Response:
             body (str | bytes): response body.
             status_code (int): HTTP status code defaults to `200`.
             headers (dict): response headers.
+            cookies (list[str]): `Set-Cookie` values, one header line each (see `set_cookie()`).
         '''
         self.body = body
         self.status_code = status_code
         self.headers = headers or {}
+        self.cookies = []
+    
+    def set_cookie(
+        self,
+        name,
+        value,
+        max_age=None,
+        path='/',
+        secure=False,
+        http_only=True,
+        same_site='Lax'
+    ):
+        
+        '''
+        Add a cookie, every cookie is sent as its own `Set-Cookie` header.
+        
+        Args:
+            name (str): cookie name.
+            value (str): cookie value, `''` with `max_age=0` deletes the cookie.
+            max_age (int, optional): lifetime in seconds, `None` for a browser-session cookie.
+            path (str, optional): cookie `Path` defaults to `/`.
+            secure (bool, optional): send over HTTPS only.
+            http_only (bool, optional): hide from JavaScript defaults to `True`.
+            same_site (str, optional): `SameSite` policy defaults to `Lax`.
+        '''
+        
+        parts = [f'{name}={value}', f'Path={path}']
+        
+        if max_age is not None:
+            parts.append(f'Max-Age={max_age}')
+        if http_only:
+            parts.append('HttpOnly')
+        if secure:
+            parts.append('Secure')
+        if same_site:
+            parts.append(f'SameSite={same_site}')
+        
+        self.cookies.append('; '.join(parts))
+    
+    def header_lines(self):
+        
+        '''
+        Serialize the headers, then one `Set-Cookie` line per cookie.
+        '''
+        
+        headers = ''.join(f'{key}: {value}\r\n' for key, value in self.headers.items())
+        return headers + ''.join(f'Set-Cookie: {cookie}\r\n' for cookie in self.cookies)
     
     def build(self):
         
@@ -45,6 +102,29 @@ class Response:
         '''
         
         
+        body_bytes = self.encode_body()
+        self.headers['Content-Length'] = str(len(body_bytes))
+        
+        reason = self.STATUS_REASONS.get(self.status_code, 'Unknown')
+        status_line = f'HTTP/1.1 {self.status_code} {reason}\r\n'
+        
+        # --- build headers ---
+        headers = self.header_lines()
+        
+        #response = (
+        #    f'HTTP/1.1 {self.status_code} OK\r\n'
+        #    f'Content-Length: {len(body_bytes)}\r\n'
+        #    f'{headers}\r\n'
+        #).encode() + body_bytes
+        
+        return (status_line + headers + '\r\n').encode() + body_bytes
+    
+    def encode_body(self):
+        
+        '''
+        Encode the response body as bytes and set the default `Content-Type`.
+        '''
+        
         # --- Detects if the content is string bytes or dictionary. ---
         if isinstance(self.body, dict):
             body_bytes = json.dumps(self.body).encode()
@@ -59,33 +139,169 @@ class Response:
         else:
             body_bytes = str(self.body).encode()
         
-        self.headers['Content-Length'] = str(len(body_bytes))
+        return body_bytes
+    
+    # --- Optional JSON format text ---
+    @staticmethod
+    def Json(data, status_code=200):
+        
+        '''
+        Returning a json-formatted response.
+        
+        Args:
+            data (dict): data to serialize as JSON.
+            status_code (int, optional): HTTP status code defaults to `200`.
+        '''
+        
+        content = json.dumps(data)
+        return Response(content, status_code, {'Content-Type': 'application/json; charset=utf-8'})
+
+
+class StreamingResponse(Response):
+    
+    '''
+    HTTP response whose body is produced by an iterator.
+    
+    The server writes the head, then every chunk as soon as it is produced,
+    awaiting `writer.drain()` after each one, so a slow client throttles the
+    producer instead of the body piling up in memory. The body is sent with
+    `Transfer-Encoding: chunked`, or as is when `content_length` is known (or
+    with `chunked=False`, up to the connection close).
+    
+    Sync iterators are consumed on the event loop, keep each step cheap (or
+    use an async generator for work that waits on I/O).
+    
+    Example:
+        async def export(request):
+            async def rows():
+                yield 'id,name\n'
+                for user in core.database.select('users'):
+                    yield f'{user["id"]},{user["name"]}\n'
+            
+            return StreamingResponse(rows(), headers={'Content-Type': 'text/csv'})
+    '''
+    
+    def __init__(
+        self,
+        content,
+        status_code=200,
+        headers=None,
+        content_length=None,
+        chunked=True
+    ):
+        
+        '''
+        Streaming HTTP response.
+        
+        Attributes:
+            content (iterable | async iterable): chunks as `str` or `bytes`.
+            status_code (int): HTTP status code defaults to `200`.
+            headers (dict): response headers.
+            content_length (int, optional): total body size, sent instead of chunked encoding.
+            chunked (bool, optional): `False` sends the chunks unframed and ends the body by
+                closing the connection (e.g., event streams that never finish).
+        '''
+        
+        super().__init__(None, status_code, headers)
+        self.content = content
+        self.content_length = content_length
+        self.chunked = chunked and content_length is None
+        self.headers.setdefault('Content-Type', 'text/plain; charset=utf-8')
+    
+    def build(self):
+        
+        '''
+        Build the status line and headers, the body is sent by `write_to()`.
+        '''
+        
+        if self.chunked:
+            self.headers['Transfer-Encoding'] = 'chunked'
+            self.headers.pop('Content-Length', None)
+        elif self.content_length is not None:
+            self.headers['Content-Length'] = str(self.content_length)
+        else:
+            self.headers['Connection'] = 'close'
         
         reason = self.STATUS_REASONS.get(self.status_code, 'Unknown')
         status_line = f'HTTP/1.1 {self.status_code} {reason}\r\n'
+        headers = self.header_lines()
         
-        # --- build headers ---
-        headers = ''.join(f'{key}: {value}\r\n' for key, value in self.headers.items())
+        return (status_line + headers + '\r\n').encode()
+    
+    async def chunks(self):
         
-        #response = (
-        #    f'HTTP/1.1 {self.status_code} OK\r\n'
-        #    f'Content-Length: {len(body_bytes)}\r\n'
-        #    f'{headers}\r\n'
-        #).encode() + body_bytes
+        '''
+        Yield the body chunks as bytes, from a sync or async iterator.
+        '''
         
-        return (status_line + headers + '\r\n').encode() + body_bytes
+        if hasattr(self.content, '__aiter__'):
+            async for chunk in self.content:
+                yield chunk.encode() if isinstance(chunk, str) else bytes(chunk)
+        else:
+            for chunk in self.content:
+                yield chunk.encode() if isinstance(chunk, str) else bytes(chunk)
+    
+    async def write_to(self, writer):
+        
+        '''
+        Write the whole response, draining after every chunk.
+        
+        Args:
+            writer (StreamWriter): client stream writer.
+        '''
+        
+        chunked = self.chunked
+        writer.write(self.build())
+        
+        try:
+            async for chunk in self.chunks():
+                if not chunk:
+                    continue
+                
+                if chunked:
+                    writer.write(b'%x\r\n%b\r\n' % (len(chunk), chunk))
+                else:
+                    writer.write(chunk)
+                
+                await writer.drain()
+            
+            if chunked:
+                writer.write(b'0\r\n\r\n')
+                await writer.drain()
+        finally:
+            # --- stop the producer when the client went away mid-stream ---
+            close = getattr(self.content, 'aclose', None) or getattr(self.content, 'close', None)
+            
+            if close is not None:
+                result = close()
+                if inspect.isawaitable(result):
+                    await result
     
-    # --- Optional JSON format text ---
     @staticmethod
-    def Json(data, status_code=200):
+    def Json(data, status_code=200, chunk_size=16384):
         
         '''
-        Returning a json-formatted response.
+        Stream `data` as JSON, encoded incrementally with `JSONEncoder.iterencode`.
         
         Args:
-            data (dict): data to serialize as JSON.
+            data (any): JSON-serializable data (e.g., a large list of rows).
             status_code (int, optional): HTTP status code defaults to `200`.
+            chunk_size (int, optional): bytes collected per chunk defaults to `16384`.
         '''
         
-        content = json.dumps(data)
-        return Response(content, status_code, {'Content-Type': 'application/json; charset=utf-8'})
\ No newline at end of file
+        def encode():
+            pending, size = [], 0
+            
+            # --- iterencode yields many small pieces, send them in chunk_size batches ---
+            for piece in json.JSONEncoder().iterencode(data):
+                pending.append(piece)
+                size += len(piece)
+                
+                if size >= chunk_size:
+                    yield ''.join(pending)
+                    pending, size = [], 0
+            
+            if pending:
+                yield ''.join(pending)
+        
+        return StreamingResponse(encode(), status_code, {'Content-Type': 'application/json; charset=utf-8'})
@@ -0,0 +1,109 @@
+'''
+Compact result formats for `Database.query` and `Database.select`.
+
+Formats:
+    - `'dict'`: one dictionary per row (default, from the dictionary cursor).
+    - `'tuple'`: one plain tuple per row, in column order.
+    - `'row'`: one namedtuple per row, fields by attribute or index, no per-row dict.
+    - `'columns'`: one sequence per column, integer and float columns are
+      packed into `array.array`, other columns stay lists.
+
+Example:
+    totals = db.query('SELECT day, amount FROM sales', format='columns')
+    sum(totals['amount'])
+'''
+
+from collections import namedtuple
+import array
+
+FORMATS = ('dict', 'tuple', 'row', 'columns')
+
+_row_types = {}
+
+
+def column_names(description):
+
+    '''
+    Return the column names of a cursor description.
+
+    Args:
+        description (list[tuple]): DB-API `cursor.description`.
+    '''
+
+    return tuple(column[0] for column in description or ())
+
+
+def row_type(names):
+
+    '''
+    Return the (cached) namedtuple class for a set of column names.
+
+    Args:
+        names (tuple[str]): column names.
+    '''
+
+    if names not in _row_types:
+        _row_types[names] = namedtuple('Row', names, rename=True)
+
+    return _row_types[names]
+
+
+def to_columns(names, rows):
+
+    '''
+    Transpose tuple rows into columns.
+
+    Args:
+        names (tuple[str]): column names.
+        rows (list[tuple]): rows in column order.
+
+    Returns:
+        dict: column name mapped to an `array.array` or `list`.
+    '''
+
+    columns = {}
+
+    for position, name in enumerate(names):
+        values = [row[position] for row in rows]
+        columns[name] = _pack(values)
+
+    return columns
+
+
+def shape(format, description, rows):
+
+    '''
+    Convert tuple rows fetched from a plain cursor into `format`.
+
+    Args:
+        format (str): `'tuple'`, `'row'` or `'columns'`.
+        description (list[tuple]): DB-API `cursor.description`.
+        rows (list[tuple]): fetched rows.
+    '''
+
+    if format == 'tuple':
+        return rows
+
+    names = column_names(description)
+
+    if format == 'row':
+        make = row_type(names)._make
+        return [make(row) for row in rows]
+
+    return to_columns(names, rows)
+
+
+def _pack(values):
+
+    ''' Pack a homogeneous numeric column into an `array.array`. '''
+
+    if values and all(type(value) is int for value in values):
+        try:
+            return array.array('q', values)
+        except OverflowError:
+            return values
+
+    if values and all(type(value) is float for value in values):
+        return array.array('d', values)
+
+    return values
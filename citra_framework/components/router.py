@@ -1,5 +1,15 @@
 from citra_framework.components.response import Response 
-from citra_framework.components.error_pages.error import NotFoundError
+from citra_framework.components.requests import _current_request
+from citra_framework.components.error_pages.error import NotFoundError, ServiceUnavailableError, GatewayTimeoutError
+from citra_framework.components.bulkhead import Bulkhead
+from citra_framework.components.circuit_breaker import CircuitOpenError
+from citra_framework.components import deadline
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import asyncio
+import contextvars
+import functools
+import inspect
+import math
 import re 
 
 class Router:
@@ -46,11 +56,27 @@ class Router:
         response =  await router.dispatch(request, app)
     '''
     
-    def __init__(self):
+    def __init__(
+        self,
+        timeout=None,
+        max_workers=None,
+        process_workers=None
+    ):
         
         '''
         Initialize routes.
         
+        Plain `def` handlers are run on a bounded thread pool so blocking code
+        does not freeze the event loop, routes registered with
+        `executor='process'` run on a process pool instead. `Database` calls
+        from several handler threads are safe: statements on one connection
+        are serialized by its lock, so they run one at a time per connection.
+        
+        Args:
+            timeout (float, optional): global request deadline in seconds, `None` disables it.
+            max_workers (int, optional): thread pool size for sync handlers (default: `ThreadPoolExecutor` default).
+            process_workers (int, optional): process pool size for `executor='process'` routes (default: CPU count).
+        
         Attributes:
             routes (list[tuple]): a list of registered route as tuples of (regex_pattern, handler, method).
             named_routes (dict): a dictionary mapping route names to its registered paths for reverse lookups.
@@ -58,6 +84,13 @@ class Router:
         
         self.routes = []
         self.named_routes = {}
+        self.timeout = timeout
+        
+        # --- executors for sync handlers, created on first use ---
+        self.max_workers = max_workers
+        self.process_workers = process_workers
+        self._thread_pool = None
+        self._process_pool = None
     
     def send(
         self,
@@ -65,7 +98,8 @@ class Router:
         handler,
         method='GET',
         name=None,
-        cors=None
+        cors=None,
+        **options
     ):
         
         '''
@@ -73,20 +107,96 @@ class Router:
         
         Args:
             path (str): URL path `/` `/users`.
-            handler (coroutine): function to handle a request.
+            handler (coroutine | callable): function to handle a request, `async def` or plain `def`.
             method (str): HTTP method `(GET, POST, etc..)`.
             name (str, optional): route name for reverse lookup.
+            cors (dict, optional): per-route CORS configuration.
+            **options: per-route settings read by middlewares through `request.route`.
+            
+        Route Options:
+            cache_ttl (float): seconds a response is kept by `CacheMiddleware`.
+            single_flight (bool | callable): coalesce concurrent requests in `SingleFlightMiddleware`.
+            rate_limit (tuple | bool): `(rate, burst)` for `RateLimitMiddleware`, `False` to exempt.
+            max_concurrency (int): requests of this route allowed to run at once.
+            queue_timeout (float): seconds a request waits for a slot before a 503.
+            max_queue (int): requests allowed to wait for a slot.
+            bulkhead (Bulkhead): an existing bulkhead, shared between routes.
+            timeout (float): request deadline in seconds, overrides the global timeout.
+            executor (str): `'thread'` (default for `def` handlers) or `'process'` for CPU-heavy sync handlers.
         '''
         
         pattern = re.sub(r'<(\w+)>', r'(?P<\1>[^/]+)', path)
         regex = re.compile(f'^{pattern}$')
-        self.routes.append((regex, handler, method, cors))
-        
         
         # --- if no route name is given, default to handler name ---
         route_name = name or handler.__name__
         self.named_routes[route_name] = path
         
+        if options.get('max_concurrency') and 'bulkhead' not in options:
+            options['bulkhead'] = Bulkhead(
+                options['max_concurrency'],
+                queue_timeout=options.get('queue_timeout'),
+                max_queue=options.get('max_queue'),
+                name=route_name
+            )
+        
+        self.routes.append((regex, self._adapt(handler, options), method, cors, options))
+        
+    def _adapt(self, handler, options):
+        
+        '''
+        Inspect a handler once and return a coroutine function calling it.
+        
+        Coroutine functions are returned unchanged, sync functions are wrapped
+        to run on the thread pool (or the process pool for `executor='process'`).
+        '''
+        
+        if inspect.iscoroutinefunction(handler):
+            return handler
+        
+        use_processes = options.get('executor') == 'process'
+        
+        @functools.wraps(handler)
+        async def run_in_executor(request, **kwargs):
+            loop = asyncio.get_running_loop()
+            
+            if use_processes:
+                # --- only plain request data crosses the process boundary ---
+                request = request.snapshot()
+                call = functools.partial(handler, request, **kwargs)
+                return await loop.run_in_executor(self._executor('process'), call)
+            
+            # --- the worker thread sees the request context (e.g., deadline) ---
+            context = contextvars.copy_context()
+            call = functools.partial(context.run, handler, request, **kwargs)
+            return await loop.run_in_executor(self._executor('thread'), call)
+        
+        return run_in_executor
+    
+    def _executor(self, kind):
+        
+        ''' Return (creating on first use) the thread or process pool. '''
+        
+        if kind == 'process':
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers)
+            return self._process_pool
+        
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='citra-handler')
+        return self._thread_pool
+    
+    def close(self):
+        
+        ''' Shut down the handler executors. '''
+        
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        
+        self._thread_pool = None
+        self._process_pool = None
+    
     def url_route(self, name, **kwargs):
         
         '''
@@ -109,6 +219,23 @@ class Router:
         
         return path
     
+    def bulkhead_stats(self):
+        
+        '''
+        Report queue depth and wait times of every route bulkhead.
+        
+        Returns:
+            dict: bulkhead name mapped to its statistics.
+        '''
+        
+        bulkheads = {}
+        for _, handler, _, _, options in self.routes:
+            bulkhead = options.get('bulkhead')
+            if bulkhead is not None:
+                bulkheads[bulkhead.name or handler.__name__] = bulkhead.stats()
+        
+        return bulkheads
+    
     async def dispatch(self, request, app):
         
         '''
@@ -119,14 +246,91 @@ class Router:
             app (Citra): app instance.
         '''
         
-        for regex, handler, method, cors in self.routes:
+        path = request.path.split('?', 1)[0]
+        matched = None
+        
+        for regex, handler, method, cors, options in self.routes:
             if request.method == method:
-                match = regex.match(request.path)
+                match = regex.match(path)
                 if match:
-                    kwargs = match.groupdict()
+                    matched = match, handler, cors, options
                     request.cors = cors
-                    if cors:
-                        request.headers['Access-Control-Allow-Origin'] = '*'
-                    return await handler(request, **kwargs)
+                    request.route = options
+                    request.handler = handler
+                    break
+        
+        # --- admission checks (e.g., rate limits) see every request, unknown paths included, before any bulkhead ---
+        rejected = app.middleware.admit(request)
+        
+        if rejected is not None:
+            return rejected
+        
+        if matched is None:
+            return NotFoundError(details=f'Method: {request.method} Request Path: {request.path} not found.', debug=app.debug).display()
+        
+        match, handler, cors, options = matched
+        kwargs = match.groupdict()
+        
+        if cors:
+            request.headers['Access-Control-Allow-Origin'] = '*'
+        
+        request_token = _current_request.set(request)
+        timeout = options.get('timeout', self.timeout)
+        
+        try:
+            if not timeout:
+                return await self._run_route(request, app, handler, kwargs, options)
+            
+            # --- the handler task inherits the deadline through its context ---
+            token = deadline.start(timeout)
+            
+            try:
+                return await asyncio.wait_for(self._run_route(request, app, handler, kwargs, options), timeout)
+            except (asyncio.TimeoutError, deadline.DeadlineExceeded):
+                return GatewayTimeoutError(details=f'Route {path} exceeded its {timeout}s deadline.', debug=app.debug).display()
+            finally:
+                deadline.reset(token)
+        finally:
+            _current_request.reset(request_token)
+    
+    async def _run_route(self, request, app, handler, kwargs, options):
+        
+        '''
+        Run a matched route through its bulkhead and the middleware chain.
+        
+        Args:
+            request (Request): parsed HTTP request.
+            app (Citra): app instance.
+            handler (coroutine): matched route handler.
+            kwargs (dict): dynamic URL segments.
+            options (dict): route options.
+        '''
+        
+        async def endpoint(request):
+            return await handler(request, **kwargs)
+        
+        bulkhead = options.get('bulkhead')
+        
+        if bulkhead is None:
+            return await self._run_middleware(request, app, endpoint)
+        
+        if not await bulkhead.acquire():
+            response = ServiceUnavailableError(details=f'Route {request.path} is at capacity.', debug=app.debug).display()
+            response.headers['Retry-After'] = '1'
+            return response
+        
+        try:
+            return await self._run_middleware(request, app, endpoint)
+        finally:
+            bulkhead.release()
+    
+    async def _run_middleware(self, request, app, endpoint):
+        
+        '''Run the middleware chain, answering 503 while a dependency's circuit is open.'''
         
-        return NotFoundError(details=f'Method: {request.method} Request Path: {request.path} not found.', debug=app.debug).display()
\ No newline at end of file
+        try:
+            return await app.middleware.run(request, endpoint)
+        except CircuitOpenError as e:
+            response = ServiceUnavailableError(details=str(e), debug=app.debug).display()
+            response.headers['Retry-After'] = str(max(1, math.ceil(e.retry_after)))
+            return response
\ No newline at end of file
@@ -1,8 +1,24 @@
 from citra_framework.components.requests import Request
-from citra_framework.components.response import Response
+from citra_framework.components.response import Response, StreamingResponse
+from citra_framework.components.circuit_breaker import CircuitOpenError
+from citra_framework.components.multipart import MultipartError, read_multipart, close_files
+from citra_framework.components import websocket
 import asyncio 
+import os
+import signal
+import socket
+import stat
+import subprocess
+import sys
+import time
 from colorama import Fore, Style
 
+# --- environment variable carrying the listening socket to a restarted process ---
+LISTEN_FD_ENV = 'CITRA_LISTEN_FD'
+
+# --- pipe the restarted process writes to once it is accepting ---
+READY_FD_ENV = 'CITRA_READY_FD'
+
 class Server:
     
     '''
@@ -22,6 +38,43 @@ class Server:
         app (Citra): the `citra` application instance.
         host (str): host address to bind (default `'127.0.0.1'`).
         port (int): port number to bind (default `8000`)
+        connections (int): number of currently open client connections.
+        
+    Limits:
+        - `max_connections`: the accept loop waits for a free slot before
+          accepting, so excess clients queue in the kernel backlog instead of
+          consuming file descriptors and memory.
+        - `header_timeout`: time allowed to receive the full request head
+          (protects against slowloris clients).
+        - `body_timeout`: time allowed to receive the request body.
+        - `keep_alive_timeout`: idle time allowed between requests on a
+          keep-alive connection.
+        - `max_requests_per_connection`: the connection is closed after this
+          many responses.
+        - `max_header_size` / `max_body_size`: size limits of the request head and body.
+        - `max_upload_size`: size limit of a `multipart/form-data` body, which is
+          streamed into `request.form` / `request.files` instead of being buffered
+          (file parts stay in memory up to `upload_spool_size`, then go to disk).
+        - `limiter`: optional `AdaptiveLimiter`, requests above its current
+          concurrency limit are shed with 503 once their head is read, before
+          the body or upload is received or parsed.
+        
+    Listening:
+        - `host` / `port`: TCP socket (default).
+        - `unix_socket`: path of a Unix domain socket, for a reverse proxy on
+          the same machine (no TCP/IP stack, no port to manage).
+        - `fd`: an already listening socket inherited from the parent process
+          (systemd socket activation passes it as fd `3`, or a supervisor handoff).
+        
+    Shutdown and restart:
+        - SIGTERM / SIGINT (CTRL+C): stop accepting, close idle keep-alive
+          connections, answer the next response of busy ones with
+          `Connection: close` and give in-flight handlers `drain_timeout`
+          seconds before they are cancelled. A second signal stops at once.
+        - SIGHUP: start a new server process that inherits the listening
+          socket (through `CITRA_LISTEN_FD`) and drain this one once the new
+          process reports ready. Pending connections wait in the shared
+          backlog, none are refused.
         
     Example:
         from citra_framework.components.server import Server
@@ -43,7 +96,25 @@ class Server:
         self,
         app,
         host='127.0.0.1',
-        port=8000
+        port=8000,
+        max_connections=1024,
+        header_timeout=10.0,
+        body_timeout=30.0,
+        keep_alive_timeout=5.0,
+        max_requests_per_connection=1000,
+        max_header_size=64 * 1024,
+        max_body_size=10 * 1024 * 1024,
+        backlog=128,
+        limiter=None,
+        max_upload_size=100 * 1024 * 1024,
+        max_part_size=None,
+        upload_spool_size=1024 * 1024,
+        unix_socket=None,
+        unix_socket_mode=None,
+        fd=None,
+        drain_timeout=10.0,
+        restart_command=None,
+        restart_timeout=30.0
     ):
         
         '''
@@ -53,11 +124,243 @@ class Server:
             app (Citra): the `Citra` application.
             host (str, optional): host address.
             port (int, optional): port number default to `8000`.
+            max_connections (int, optional): concurrent connections limit defaults to `1024`.
+            header_timeout (float, optional): seconds to receive the request head defaults to `10`.
+            body_timeout (float, optional): seconds to receive the request body defaults to `30`.
+            keep_alive_timeout (float, optional): idle seconds between keep-alive requests defaults to `5`.
+            max_requests_per_connection (int, optional): requests served per connection defaults to `1000`.
+            max_header_size (int, optional): request head size limit defaults to `64KB`.
+            max_body_size (int, optional): request body size limit defaults to `10MB`.
+            backlog (int, optional): listen backlog of the server socket defaults to `128`.
+            limiter (AdaptiveLimiter, optional): adaptive load shedding around dispatch.
+            max_upload_size (int, optional): multipart body size limit defaults to `100MB`.
+            max_part_size (int, optional): size limit of one uploaded file defaults to `max_upload_size`.
+            upload_spool_size (int, optional): bytes of a file part kept in memory defaults to `1MB`.
+            unix_socket (str, optional): listen on this Unix socket path instead of `host:port`.
+            unix_socket_mode (int, optional): permissions of the Unix socket file (e.g., `0o660`).
+            fd (int, optional): listen on this inherited socket file descriptor instead of `host:port`.
+            drain_timeout (float, optional): seconds in-flight requests get to finish at shutdown defaults to `10`.
+            restart_command (list[str], optional): command started on SIGHUP defaults to this process' command line.
+            restart_timeout (float, optional): seconds the new process gets to report ready defaults to `30`.
         '''
         
         self.app = app
         self.host = host
         self.port = port
+        
+        # --- connection limits ---
+        self.max_connections = max_connections
+        self.header_timeout = header_timeout
+        self.body_timeout = body_timeout
+        self.keep_alive_timeout = keep_alive_timeout
+        self.max_requests_per_connection = max_requests_per_connection
+        self.max_header_size = max_header_size
+        self.max_body_size = max_body_size
+        self.backlog = backlog
+        self.limiter = limiter
+        self.max_upload_size = max_upload_size
+        self.max_part_size = max_part_size or max_upload_size
+        self.upload_spool_size = upload_spool_size
+        
+        # --- listening socket ---
+        self.unix_socket = unix_socket
+        self.unix_socket_mode = unix_socket_mode
+        self.fd = fd
+        
+        # --- a listening socket handed over by the previous process (SIGHUP) ---
+        if fd is None and os.environ.get(LISTEN_FD_ENV):
+            self.fd = int(os.environ.pop(LISTEN_FD_ENV))
+        
+        self._ready_fd = int(os.environ.pop(READY_FD_ENV)) if os.environ.get(READY_FD_ENV) else None
+        
+        # --- shutdown ---
+        self.drain_timeout = drain_timeout
+        self.restart_command = restart_command
+        self.restart_timeout = restart_timeout
+        self.draining = False
+        self._restarting = False
+        self._accepting = None
+        self._listener = None
+        self._handed_off = False
+        self._connection_tasks = set()
+        self._idle = set()
+        self._websockets = set()
+        self._streams = set()
+        
+        # --- counters ---
+        self.connections = 0
+        self.accepted = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.shed = 0
+        
+        self._slots = None
+    
+    def stats(self):
+        
+        ''' Return connection counters as a dictionary. '''
+        
+        return {
+            'open_connections': self.connections,
+            'max_connections': self.max_connections,
+            'accepted': self.accepted,
+            'timeouts': self.timeouts,
+            'rejected': self.rejected,
+            'shed': self.shed,
+            'limiter': self.limiter.stats() if self.limiter else None
+        }
+    
+    async def read_request(self, reader, idle_timeout):
+        
+        '''
+        Read one HTTP request head and body within the configured limits.
+        
+        With a limiter, the request is admitted (or shed) as soon as its head
+        is read, before any body or upload is consumed. An admitted request
+        holds its slot until `handle_client` releases it, the slot is given
+        back here when no request comes out of the body.
+        
+        Args:
+            reader (StreamReader): async stream reader.
+            idle_timeout (float): seconds to wait for the first byte.
+            
+        Returns:
+            bytes | Request | Response | None: raw request, a parsed request (multipart bodies
+                are streamed into it), an error response or `None` when the client left.
+        '''
+        
+        if self.draining:
+            return None
+        
+        # --- idle connections are closed right away when draining starts ---
+        task = asyncio.current_task()
+        self._idle.add(task)
+        
+        try:
+            first = await asyncio.wait_for(reader.readexactly(1), idle_timeout)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            return None
+        finally:
+            self._idle.discard(task)
+        
+        try:
+            head = first + await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.header_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return Response('Request Timeout', 408)
+        except asyncio.LimitOverrunError:
+            self.rejected += 1
+            return Response('Request Header Fields Too Large', 431)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None
+        
+        length = None
+        content_type = b''
+        for line in head.split(b'\r\n')[1:]:
+            name, _, value = line.partition(b':')
+            name = name.strip().lower()
+            if name == b'content-length':
+                value = value.strip()
+                
+                # --- digits only (no sign, no spaces), repeated headers must agree ---
+                if not value.isdigit() or length is not None and length != int(value):
+                    self.rejected += 1
+                    return Response('Bad Request', 400)
+                
+                length = int(value)
+            elif name == b'content-type':
+                content_type = value.strip()
+        
+        # --- an overloaded server sheds before reading or parsing the body ---
+        if self.limiter and not self.limiter.try_acquire():
+            self.shed += 1
+            return self._shed_response()
+        
+        admitted = False
+        
+        try:
+            data = await self.read_body(reader, head, length or 0, content_type)
+            admitted = isinstance(data, (bytes, Request))
+            return data
+        finally:
+            if self.limiter and not admitted:
+                self.limiter.release()
+    
+    async def read_body(self, reader, head, length, content_type):
+        
+        '''
+        Read the body of a request whose head was read.
+        
+        Args:
+            reader (StreamReader): async stream reader, positioned at the body.
+            head (bytes): raw request head.
+            length (int): body `Content-Length`.
+            content_type (bytes): raw `Content-Type` value.
+            
+        Returns:
+            bytes | Request | Response | None: see `read_request`.
+        '''
+        
+        if length and content_type.lower().startswith(b'multipart/form-data'):
+            return await self.read_upload(reader, head, length)
+        
+        if length > self.max_body_size:
+            self.rejected += 1
+            return Response('Payload Too Large', 413)
+        
+        if not length:
+            return head
+        
+        try:
+            return head + await asyncio.wait_for(reader.readexactly(length), self.body_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return Response('Request Timeout', 408)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None
+    
+    async def read_upload(self, reader, head, length):
+        
+        '''
+        Stream a multipart body into the parsed request.
+        
+        Args:
+            reader (StreamReader): async stream reader, positioned at the body.
+            head (bytes): raw request head.
+            length (int): body `Content-Length`.
+            
+        Returns:
+            Request | Response | None: request with `form` and `files` set, an error response or `None`.
+        '''
+        
+        if length > self.max_upload_size:
+            self.rejected += 1
+            return Response('Payload Too Large', 413)
+        
+        request = Request.parse(head)
+        
+        try:
+            request.form, request.files = await asyncio.wait_for(
+                read_multipart(
+                    reader,
+                    length,
+                    request.headers.get('content-type', ''),
+                    max_part_size=self.max_part_size,
+                    max_total_size=self.max_upload_size,
+                    spool_size=self.upload_spool_size
+                ),
+                self.body_timeout
+            )
+        except MultipartError as e:
+            self.rejected += 1
+            return Response(str(e), e.status)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return Response('Request Timeout', 408)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None
+        
+        return request
     
     async def handle_client(self, reader, writer):
         
@@ -69,35 +372,105 @@ class Server:
             writer (StreamWriter): async stream writer.
             
         Flow:
-            - Read request from client.
+            - Read request from client (bounded by the header/body timeouts).
             - Parse into request object.
             - Dispatch to router for response.
             - Write back response to client.
+            - Close after `max_requests_per_connection` or keep-alive idle timeout.
             - Handle errors with 500 response code.
         '''
         
+        peer = writer.get_extra_info('peername')
+        client = peer[0] if isinstance(peer, tuple) else None
+        served = 0
+        
         try:
             
             while True:
-                data = await reader.read(1024)
+                data = await self.read_request(reader, self.keep_alive_timeout if served else self.header_timeout)
                 
-                if not data:
+                if data is None:
                     return
-
-                request = Request.parse(data)
-                response = await self.app.router.dispatch(request, self.app)
-                
-                if isinstance(response, str):
-                    response = Response(response, status_code=500)
-                
-                response.headers.setdefault('Connection', 'keep-alive')
-                
-                self.app.logger.info(f'{request.method} {request.path} {response.status_code}')
-                writer.write(response.build())
-                await writer.drain()
                 
-                if request.headers.get('Connection', '').lower() == 'close':
-                    break
+                if isinstance(data, Response):
+                    data.headers['Connection'] = 'close'
+                    writer.write(data.build())
+                    await writer.drain()
+                    return
+
+                # --- spooled uploads are released whatever happens: handler error, failed write, cancel ---
+                try:
+                    started = time.monotonic()
+                    
+                    try:
+                        request = data if isinstance(data, Request) else Request.parse(data)
+                        request.client = client
+                    
+                        # --- upgrade requests only match routes registered with `websocket()` ---
+                        if request.headers.get('upgrade', '').lower() == 'websocket':
+                            error = websocket.handshake_error(request)
+                            request.method = 'WEBSOCKET'
+                        
+                            if error:
+                                response = Response(error, 400, {'Connection': 'close'})
+                                writer.write(response.build())
+                                await writer.drain()
+                                return
+                    
+                        response = await self.app.router.dispatch(request, self.app)
+                    finally:
+                        if self.limiter:
+                            self.limiter.release(time.monotonic() - started)
+                    
+                    if isinstance(response, websocket.WebSocketUpgrade):
+                        self.app.logger.info(f'WEBSOCKET {request.path} 101')
+                        await self.run_websocket(reader, writer, response)
+                        return
+                    
+                    served += 1
+                    
+                    if isinstance(response, str):
+                        response = Response(response, status_code=500)
+                    
+                    closing = (
+                        request.headers.get('connection', '').lower() == 'close'
+                        or served >= self.max_requests_per_connection
+                        or response.headers.get('Connection') == 'close'
+                        or isinstance(response, StreamingResponse) and not response.chunked and response.content_length is None
+                        or self.draining
+                    )
+                    
+                    response.headers['Connection'] = 'close' if closing else 'keep-alive'
+                    
+                    self.app.logger.info(f'{request.method} {request.path} {response.status_code}')
+                    
+                    if isinstance(response, StreamingResponse):
+                        # --- endless streams (e.g., events) are ended when draining ---
+                        endless = not response.chunked and response.content_length is None
+                        if endless:
+                            self._streams.add(asyncio.current_task())
+                    
+                        try:
+                            await response.write_to(writer)
+                        except Exception as e:
+                            # --- the head is already sent, an error page cannot follow ---
+                            self.app.logger.error(f'Stream of {request.path} failed: {e}')
+                            return
+                        finally:
+                            self._streams.discard(asyncio.current_task())
+                    else:
+                        writer.write(response.build())
+                        await writer.drain()
+                    
+                    # --- post-response work scheduled by the handler ---
+                    for task in request.background:
+                        self.app.background.enqueue(task)
+                    
+                    if closing:
+                        break
+                finally:
+                    if isinstance(data, Request) and data.files:
+                        close_files(data.files)
             
         except Exception as e:
             error_response = self.app.debugger.handle_exception(e)
@@ -126,6 +499,321 @@ class Server:
                     self.app.logger.error(f'Error during client shutdown: {e}')
             except Exception as e:
                 self.app.logger.error(f'Error during client cleanup: {e}')
+    
+    async def run_websocket(self, reader, writer, upgrade):
+        
+        '''
+        Complete the handshake and run a WebSocket handler until it returns.
+        
+        Args:
+            reader (StreamReader): async stream reader.
+            writer (StreamWriter): async stream writer.
+            upgrade (WebSocketUpgrade): response returned by the route.
+        '''
+        
+        writer.write(upgrade.build())
+        await writer.drain()
+        
+        ws = websocket.WebSocket(reader, writer, upgrade.request, **upgrade.limits)
+        ws.start()
+        self._websockets.add(ws)
+        
+        # --- a handler that returns ends the conversation normally, going away is only for shutdown ---
+        code = websocket.NORMAL_CLOSURE
+        
+        try:
+            await upgrade.handler(ws, **upgrade.kwargs)
+        except websocket.WebSocketClosed:
+            pass
+        except Exception as e:
+            self.app.logger.error(f'WebSocket handler of {upgrade.request.path} failed: {e}')
+            code = websocket.INTERNAL_ERROR
+        except asyncio.CancelledError:
+            code = websocket.GOING_AWAY
+            raise
+        finally:
+            self._websockets.discard(ws)
+            await ws.shutdown(code)
+    
+    def _shed_response(self):
+        
+        '''
+        Minimal 503 response for requests rejected by the limiter, the shed
+        client is disconnected and reconnects (or goes elsewhere) after `Retry-After`.
+        '''
+        
+        return Response('Service Unavailable', 503, {
+            'Retry-After': str(self.limiter.retry_after),
+            'Connection': 'close'
+        })
+    
+    async def accept(self, listener):
+        
+        '''
+        Accept connections while respecting `max_connections`.
+        
+        A connection slot is acquired *before* accepting, so when the server
+        is full new clients wait in the listen backlog (backpressure) instead
+        of being accepted and parked in memory.
+        
+        Args:
+            listener (socket.socket): non-blocking listening socket.
+        '''
+        
+        loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self.max_connections)
+        
+        while True:
+            await self._slots.acquire()
+            
+            try:
+                sock, _ = await loop.sock_accept(listener)
+            except OSError as e:
+                self._slots.release()
+                self.app.logger.error(f'Error accepting connection: {e}')
+                await asyncio.sleep(0.1)
+                continue
+            
+            self.accepted += 1
+            task = loop.create_task(self._connection(sock))
+            self._connection_tasks.add(task)
+            task.add_done_callback(self._connection_tasks.discard)
+    
+    async def _connection(self, sock):
+        
+        ''' Wrap an accepted socket into streams and serve it. '''
+        
+        loop = asyncio.get_running_loop()
+        self.connections += 1
+        
+        try:
+            if sock.family != socket.AF_UNIX:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            
+            reader = asyncio.StreamReader(limit=self.max_header_size, loop=loop)
+            protocol = asyncio.StreamReaderProtocol(reader, loop=loop)
+            transport, _ = await loop.connect_accepted_socket(lambda: protocol, sock)
+            writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+            await self.handle_client(reader, writer)
+        except Exception as e:
+            self.app.logger.error(f'Error during client setup: {e}')
+            sock.close()
+        finally:
+            self.connections -= 1
+            self._slots.release()
+    
+    def listen(self):
+        
+        '''
+        Create the non-blocking listening socket.
+        
+        Returns:
+            socket.socket: socket bound to the inherited fd, the Unix socket path or `host:port`.
+        '''
+        
+        if self.fd is not None:
+            # --- the family and type are read from the descriptor itself ---
+            listener = socket.socket(fileno=self.fd)
+            listener.listen(self.backlog)
+        
+        elif self.unix_socket:
+            # --- a file left by a previous run would make bind() fail ---
+            if os.path.exists(self.unix_socket) and stat.S_ISSOCK(os.stat(self.unix_socket).st_mode):
+                os.unlink(self.unix_socket)
+            
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(self.unix_socket)
+            
+            if self.unix_socket_mode is not None:
+                os.chmod(self.unix_socket, self.unix_socket_mode)
+            
+            listener.listen(self.backlog)
+        
+        else:
+            family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+            listener = socket.create_server((self.host, self.port), family=family, backlog=self.backlog)
+        
+        listener.setblocking(False)
+        return listener
+    
+    def address(self, listener):
+        
+        ''' Printable address of the listening socket. '''
+        
+        if listener.family == socket.AF_UNIX:
+            return f'http+unix://{listener.getsockname() or self.unix_socket}'
+        
+        host, port = listener.getsockname()[:2]
+        return f'http://[{host}]:{port}' if listener.family == socket.AF_INET6 else f'http://{host}:{port}'
+    
+    def shutdown(self):
+        
+        '''
+        Stop accepting connections and start draining (SIGTERM / SIGINT).
+        
+        A second call, e.g., CTRL+C pressed twice, cancels every connection at once.
+        '''
+        
+        if self.draining:
+            self.app.logger.warning('Forced shutdown, cancelling open connections.')
+            for task in list(self._connection_tasks):
+                task.cancel()
+            return
+        
+        self.app.logger.warning(f'Shutting down, draining connections for up to {self.drain_timeout}s...')
+        self.draining = True
+        
+        if self._accepting is not None:
+            self._accepting.cancel()
+    
+    def restart(self):
+        
+        '''
+        Start a handover of the listening socket to a new server process (SIGHUP).
+        '''
+        
+        if not self.draining and self._listener is not None and not self._restarting:
+            asyncio.get_running_loop().create_task(self.handoff())
+    
+    async def handoff(self):
+        
+        '''
+        Hand the listening socket to a new server process, then drain.
+        
+        The new process is started with the same command line and finds the
+        socket descriptor in `CITRA_LISTEN_FD`, it accepts from the same
+        kernel backlog while this process finishes its in-flight requests.
+        This process only starts draining once the new one reported ready
+        through the `CITRA_READY_FD` pipe, a new process that fails to start
+        (e.g., an import error) leaves this one serving.
+        
+        Returns:
+            bool: `True` when the socket was handed over.
+        '''
+        
+        if self.draining or self._listener is None or self._restarting:
+            return False
+        
+        self._restarting = True
+        fd = self._listener.fileno()
+        command = self.restart_command or [sys.executable] + sys.argv
+        ready_read, ready_write = os.pipe()
+        
+        try:
+            env = {**os.environ, LISTEN_FD_ENV: str(fd), READY_FD_ENV: str(ready_write)}
+            process = subprocess.Popen(command, env=env, pass_fds=(fd, ready_write))
+        except OSError as e:
+            os.close(ready_read)
+            self._restarting = False
+            self.app.logger.error(f'Restart failed, still serving. Error: {e}')
+            return False
+        finally:
+            os.close(ready_write)
+        
+        try:
+            ready = await self._wait_ready(process, ready_read)
+        finally:
+            os.close(ready_read)
+            self._restarting = False
+        
+        if not ready:
+            if process.poll() is None:
+                process.kill()
+            self.app.logger.error(f'Restarted process did not report ready (exit code {process.poll()}), still serving.')
+            return False
+        
+        self.app.logger.warning('Listening socket handed to a new process, draining this one.')
+        self._handed_off = True
+        self.shutdown()
+        return True
+    
+    async def _wait_ready(self, process, fd):
+        
+        ''' Wait for the ready byte of a restarted process, `False` if it exits or times out. '''
+        
+        os.set_blocking(fd, False)
+        deadline = time.monotonic() + self.restart_timeout
+        
+        while time.monotonic() < deadline:
+            try:
+                # --- end of file: the process closed the pipe without being ready ---
+                return bool(os.read(fd, 1))
+            except BlockingIOError:
+                pass
+            
+            if process.poll() is not None:
+                return False
+            
+            await asyncio.sleep(0.05)
+        
+        return False
+    
+    def _notify_ready(self):
+        
+        ''' Tell the process that started this one (SIGHUP) it can drain. '''
+        
+        if self._ready_fd is None:
+            return
+        
+        try:
+            os.write(self._ready_fd, b'1')
+        except OSError:
+            pass
+        finally:
+            os.close(self._ready_fd)
+            self._ready_fd = None
+    
+    async def drain(self):
+        
+        '''
+        Wait for open connections to finish, then cancel the rest.
+        
+        Idle keep-alive connections and endless streams are closed at once,
+        WebSockets receive a `1001 Going Away` close, busy connections get
+        `drain_timeout` seconds to finish their current response.
+        '''
+        
+        self.draining = True
+        
+        for task in list(self._idle) + list(self._streams):
+            task.cancel()
+        
+        # --- close frames go out together and share the drain budget, a stuck peer cannot hold shutdown ---
+        if self._websockets:
+            closes = asyncio.gather(*(ws.close(websocket.GOING_AWAY, 'server shutting down') for ws in list(self._websockets)), return_exceptions=True)
+            
+            try:
+                await asyncio.wait_for(closes, self.drain_timeout)
+            except asyncio.TimeoutError:
+                pass
+        
+        if not self._connection_tasks:
+            return
+        
+        _, pending = await asyncio.wait(set(self._connection_tasks), timeout=self.drain_timeout)
+        
+        if pending:
+            self.app.logger.warning(f'{len(pending)} connection(s) still busy after {self.drain_timeout}s, cancelling.')
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+    
+    def _install_signals(self, loop):
+        
+        ''' Route SIGTERM / SIGINT to `shutdown()` and SIGHUP to `restart()`. '''
+        
+        handlers = {signal.SIGTERM: self.shutdown, signal.SIGINT: self.shutdown}
+        
+        if hasattr(signal, 'SIGHUP'):
+            handlers[signal.SIGHUP] = self.restart
+        
+        for signum, handler in handlers.items():
+            try:
+                loop.add_signal_handler(signum, handler)
+            except (NotImplementedError, RuntimeError):
+                # --- e.g., Windows, CTRL+C still raises KeyboardInterrupt ---
+                pass
+    
     def serve(self):
         
         '''
@@ -145,14 +833,38 @@ class Server:
         '''
         
         async def main():
-            server = await asyncio.start_server(self.handle_client, self.host, self.port)
+            listener = self.listen()
             print(f'{Fore.RED}*** This is a development server. Do not use it in production development. ***{Style.RESET_ALL}')
-            self.app.logger.info(f'Citra running on {Fore.YELLOW}http://{self.host}:{self.port}{Style.RESET_ALL}')
-            self.app.logger.info(f'{Fore.WHITE}Press (CTRL+C) to terminate server.{Style.RESET_ALL}')
-            async with server:
-                await server.serve_forever()
+            self.app.logger.info(f'Citra running on {Fore.YELLOW}{self.address(listener)}{Style.RESET_ALL}')
+            self.app.logger.info(f'{Fore.WHITE}Press (CTRL+C) to terminate server, (kill -HUP {os.getpid()}) to restart it.{Style.RESET_ALL}')
+            self._install_signals(asyncio.get_running_loop())
+            self.app.background.start()
+            self._listener = listener
+            self._notify_ready()
+            
+            with listener:
+                try:
+                    self._accepting = asyncio.create_task(self.accept(listener))
+                    await asyncio.wait({self._accepting})
+                    await self.drain()
+                finally:
+                    await self.app.background.drain()
+                    
+                    if self.app.database:
+                        try:
+                            self.app.database.flush()
+                        except CircuitOpenError as e:
+                            self.app.logger.warning(f'Buffered rows were not written at shutdown. Error: {e}')
+                    
+                    if self.unix_socket and self.fd is None and not self._handed_off:
+                        try:
+                            os.unlink(self.unix_socket)
+                        except OSError:
+                            pass
                 
         try:
             asyncio.run(main())
         except KeyboardInterrupt:
-            self.app.logger.warning(f'Citra Server stopped by user {Fore.RED}(CTRL+C){Style.RESET_ALL}')
\ No newline at end of file
+            self.app.logger.warning(f'Citra Server stopped by user {Fore.RED}(CTRL+C){Style.RESET_ALL}')
+        finally:
+            self.app.router.close()
\ No newline at end of file
@@ -0,0 +1,306 @@
+'''
+Sessions for `Citra` framework.
+
+By default the whole session lives in a compact HMAC-signed cookie, so any
+worker or process can serve any request with no shared server-side state.
+The cookie is only verified and decoded when a handler touches
+`request.session`, and only signed again when the session was modified.
+`MemorySessionStore` keeps the data in a bounded in-process store instead
+and only puts a signed session id in the cookie.
+
+Example:
+    core.middleware.add(SessionMiddleware(secret=os.environ['CITRA_SECRET']))
+
+    async def login(request):
+        request.session['user_id'] = 12
+        core.templates.message('Welcome back!', 'success')
+        return core.templates.forward('dashboard')
+'''
+
+from collections import OrderedDict
+import base64
+import copy
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+import zlib
+
+# --- browsers drop cookies above 4096 bytes (name, value and attributes) ---
+MAX_COOKIE_SIZE = 4000
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+class Signer:
+
+    '''
+    HMAC-SHA256 signer for cookie values.
+
+    Args:
+        secret (str | bytes): signing key, keep it out of the source code.
+    '''
+
+    def __init__(self, secret):
+        if not secret:
+            raise ValueError('A session secret is required.')
+
+        self.key = secret.encode() if isinstance(secret, str) else secret
+
+    def sign(self, value):
+
+        ''' Return `value.signature`. '''
+
+        signature = hmac.new(self.key, value.encode(), hashlib.sha256).digest()
+        return f'{value}.{_b64encode(signature)}'
+
+    def unsign(self, signed):
+
+        '''
+        Return the value of a signed string, `None` when the signature does not match.
+
+        Args:
+            signed (str): `value.signature`.
+        '''
+
+        value, _, signature = signed.rpartition('.')
+
+        if not value:
+            return None
+
+        expected = hmac.new(self.key, value.encode(), hashlib.sha256).digest()
+
+        try:
+            given = _b64decode(signature)
+        except ValueError:
+            return None
+
+        return value if hmac.compare_digest(expected, given) else None
+
+
+class Session:
+
+    '''
+    Dictionary-like session, loaded on first access.
+
+    Attributes:
+        modified (bool): `True` once the data changed, the cookie is then re-issued.
+        new (bool): `True` when the request carried no valid session.
+    '''
+
+    def __init__(self, load):
+        self._load = load
+        self._data = None
+        self.modified = False
+        self.new = False
+
+    @property
+    def loaded(self):
+        return self._data is not None
+
+    @property
+    def data(self):
+        if self._data is None:
+            data = self._load()
+            self.new = data is None
+            self._data = data if data is not None else {}
+
+        return self._data
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self.modified = True
+
+    def __delitem__(self, key):
+        del self.data[key]
+        self.modified = True
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def pop(self, key, default=None):
+        if key in self.data:
+            self.modified = True
+        return self.data.pop(key, default)
+
+    def clear(self):
+        if self.data:
+            self.modified = True
+        self.data.clear()
+
+    def flash(self, message, category='info'):
+
+        '''
+        Store a flash message for the next render of this session.
+
+        Args:
+            message (str): the message to display.
+            category (str, optional): message category (e.g., info, error, warning, success).
+        '''
+
+        self.data.setdefault('_flashes', []).append({'message': message, 'category': category})
+        self.modified = True
+
+    def flashes(self, clear=True):
+
+        '''
+        Return the flash messages of this session.
+
+        Args:
+            clear (bool, optional): remove them from the session.
+        '''
+
+        messages = list(self.data.get('_flashes', ()))
+
+        if clear and messages:
+            del self['_flashes']
+
+        return messages
+
+
+class CookieSessionBackend:
+
+    '''
+    Keeps the session data itself in a signed cookie.
+
+    Cookie format: `<j|z><base64 json>.<issued>.<signature>`, where `z` marks
+    zlib-compressed json (used only when it is shorter).
+
+    Args:
+        secret (str | bytes): signing key.
+        max_age (float): seconds a signed session is accepted after it was issued.
+    '''
+
+    def __init__(self, secret, max_age):
+        self.signer = Signer(secret)
+        self.max_age = max_age
+
+    def load(self, cookie):
+        value = self.signer.unsign(cookie) if cookie else None
+
+        if value is None:
+            return None
+
+        payload, _, issued = value.rpartition('.')
+
+        try:
+            if time.time() - int(issued) > self.max_age:
+                return None
+
+            raw = _b64decode(payload[1:])
+            return json.loads(zlib.decompress(raw) if payload[0] == 'z' else raw)
+        except (ValueError, zlib.error):
+            return None
+
+    def save(self, cookie, session):
+
+        '''
+        Return the new cookie value, `''` to delete the cookie.
+        '''
+
+        if not session.data:
+            return ''
+
+        raw = json.dumps(session.data, separators=(',', ':')).encode()
+        compressed = zlib.compress(raw)
+        payload = 'z' + _b64encode(compressed) if len(compressed) < len(raw) else 'j' + _b64encode(raw)
+        value = self.signer.sign(f'{payload}.{int(time.time())}')
+
+        if len(value) > MAX_COOKIE_SIZE:
+            raise ValueError(f'Session of {len(value)} bytes does not fit in a cookie, use MemorySessionStore.')
+
+        return value
+
+
+class MemorySessionStore:
+
+    '''
+    Bounded in-process session store, the cookie only carries a signed id.
+
+    Least recently used sessions are evicted once `max_sessions` is reached.
+    Data is not shared between processes, pin clients to one worker or use
+    the default cookie sessions when running several.
+
+    Args:
+        max_sessions (int, optional): sessions kept in memory defaults to `10000`.
+    '''
+
+    def __init__(self, max_sessions=10000):
+        self.max_sessions = max_sessions
+        self.signer = None
+        self.max_age = None
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def bind(self, secret, max_age):
+
+        ''' Configure signing and expiry, called by `SessionMiddleware`. '''
+
+        self.signer = Signer(secret)
+        self.max_age = max_age
+
+    def load(self, cookie):
+        session_id = self.signer.unsign(cookie) if cookie else None
+
+        if session_id is None:
+            return None
+
+        with self._lock:
+            entry = self._sessions.get(session_id)
+
+            if entry is None:
+                return None
+
+            data, expires = entry
+
+            if expires <= time.monotonic():
+                del self._sessions[session_id]
+                return None
+
+            self._sessions.move_to_end(session_id)
+
+            # --- the request gets its own copy, nested values (e.g., flashes) included ---
+            return copy.deepcopy(data)
+
+    def save(self, cookie, session):
+        session_id = self.signer.unsign(cookie) if cookie else None
+
+        with self._lock:
+            if not session.data:
+                if session_id is not None:
+                    self._sessions.pop(session_id, None)
+                return ''
+
+            if session_id is None or session_id not in self._sessions:
+                session_id = secrets.token_urlsafe(24)
+
+            self._sessions[session_id] = (copy.deepcopy(session.data), time.monotonic() + self.max_age)
+            self._sessions.move_to_end(session_id)
+
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+        return self.signer.sign(session_id)
+
+    def __len__(self):
+        return len(self._sessions)
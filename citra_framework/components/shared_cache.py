@@ -0,0 +1,378 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import time
+
+class SharedMemoryCache:
+
+    '''
+    Fixed-size cache shared by every worker process on the same host.
+
+    The table lives in a memory-mapped file under `/dev/shm` (the same
+    backing store used by `multiprocessing.shared_memory` on Linux), so
+    pre-forked workers and independently started processes that open the
+    same `name` see the same entries without any external service.
+
+    Layout:
+        - the table is set-associative: a key hashes to one set of `ways` slots.
+        - each slot holds a 40 byte header, the UTF-8 key and the pickled value.
+        - every set is guarded by an `fcntl` byte-range lock, so writers on
+          different sets never contend.
+        - when a set is full a victim is chosen by `CLOCK` (reference bit) or
+          `LRU` (last access time) eviction.
+
+    It implements the same interface as `LRUCache` (`get`, `set`, `delete`,
+    `keys`, `clear`, `stats`) and can be passed wherever a cache backend is
+    accepted (`CacheMiddleware`, `Zest`, `Database`).
+
+    Attributes:
+        name (str): shared segment name.
+        slots (int): total number of slots.
+        slot_size (int): bytes per slot, bounds the size of one entry.
+        ways (int): slots per set.
+
+    Example:
+        cache = SharedMemoryCache('citra-app', slots=8192, slot_size=8192)
+
+        core.middleware.add(CacheMiddleware(backend=cache))
+        core.templates.cache = cache
+    '''
+
+    _MAGIC = b'CITRASC1'
+    _HEADER = struct.Struct('<8sIII')
+    _SLOT = struct.Struct('<BB6xQddII')
+    _HEADER_SIZE = 64
+
+    _FREE = 0
+    _USED = 1
+
+    def __init__(
+        self,
+        name='citra-cache',
+        slots=4096,
+        slot_size=4096,
+        ways=8,
+        eviction='clock',
+        directory=None
+    ):
+
+        '''
+        Open (or create) the shared cache segment.
+
+        Args:
+            name (str, optional): segment name, processes using the same name share entries.
+            slots (int, optional): number of slots defaults to `4096`.
+            slot_size (int, optional): size of one slot in bytes defaults to `4096`.
+            ways (int, optional): associativity of the table defaults to `8`.
+            eviction (str, optional): `'clock'` or `'lru'` defaults to `'clock'`.
+            directory (str, optional): directory of the backing file defaults to `/dev/shm`.
+        '''
+
+        if eviction not in ('clock', 'lru'):
+            raise ValueError(f'Unknown eviction policy: {eviction}')
+
+        if slot_size <= self._SLOT.size:
+            raise ValueError(f'slot_size must be larger than {self._SLOT.size} bytes.')
+
+        self.name = name
+        self.ways = max(1, min(ways, slots, 255))
+        self.sets = max(1, slots // self.ways)
+        self.slots = self.sets * self.ways
+        self.slot_size = slot_size
+        self.eviction = eviction
+
+        if directory is None:
+            directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+        self.path = os.path.join(directory, name)
+
+        # --- hands of the clock, one byte per set, right after the header ---
+        self._hands_offset = self._HEADER_SIZE
+        self._slots_offset = self._HEADER_SIZE + self.sets
+        self._length = self._slots_offset + self.slots * self.slot_size
+
+        # --- fcntl locks are per process, threads are serialized separately ---
+        self._thread_lock = threading.Lock()
+
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._initialize()
+        self._map = mmap.mmap(self._fd, self._length)
+
+        # --- per-process counters ---
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _initialize(self):
+
+        ''' Size and stamp the segment once, under a whole-file lock. '''
+
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)
+
+        try:
+            header = os.pread(self._fd, self._HEADER.size, 0)
+            expected = self._HEADER.pack(self._MAGIC, self.slots, self.slot_size, self.ways)
+
+            if header == expected and os.fstat(self._fd).st_size >= self._length:
+                return
+
+            if header[:8] == self._MAGIC:
+                raise ValueError(f'Shared cache {self.name} exists with a different geometry.')
+
+            os.ftruncate(self._fd, 0)
+            os.ftruncate(self._fd, self._length)
+            os.pwrite(self._fd, expected, 0)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    # ---- Locking ----
+    def _lock(self, index):
+
+        ''' Acquire the lock guarding one set. '''
+
+        self._thread_lock.acquire()
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self.ways * self.slot_size, self._slot_offset(index, 0))
+
+    def _unlock(self, index):
+
+        ''' Release the lock guarding one set. '''
+
+        fcntl.lockf(self._fd, fcntl.LOCK_UN, self.ways * self.slot_size, self._slot_offset(index, 0))
+        self._thread_lock.release()
+
+    # ---- Slot helpers ----
+    def _slot_offset(self, index, way):
+        return self._slots_offset + (index * self.ways + way) * self.slot_size
+
+    def _locate(self, key):
+
+        ''' Return `(key_bytes, key_hash, set_index)` for a key. '''
+
+        key_bytes = key.encode() if isinstance(key, str) else bytes(key)
+        key_hash = int.from_bytes(hashlib.blake2b(key_bytes, digest_size=8).digest(), 'little')
+        return key_bytes, key_hash, key_hash % self.sets
+
+    def _read_header(self, offset):
+        return self._SLOT.unpack_from(self._map, offset)
+
+    def _find(self, index, key_bytes, key_hash):
+
+        ''' Return the way holding `key_bytes` in a set, or `None`. '''
+
+        for way in range(self.ways):
+            offset = self._slot_offset(index, way)
+            state, _, slot_hash, _, _, key_len, _ = self._read_header(offset)
+
+            if state != self._USED or slot_hash != key_hash:
+                continue
+
+            start = offset + self._SLOT.size
+            if self._map[start:start + key_len] == key_bytes:
+                return way
+
+        return None
+
+    def _victim(self, index, now):
+
+        ''' Pick a free, expired or evictable way of a set. '''
+
+        oldest_way, oldest_access = 0, None
+
+        for way in range(self.ways):
+            state, _, _, expires_at, accessed_at, _, _ = self._read_header(self._slot_offset(index, way))
+
+            if state != self._USED or (expires_at and expires_at <= now):
+                return way, False
+
+            if oldest_access is None or accessed_at < oldest_access:
+                oldest_way, oldest_access = way, accessed_at
+
+        if self.eviction == 'lru':
+            return oldest_way, True
+
+        # --- CLOCK: clear reference bits until an unreferenced slot is found ---
+        hand = self._map[self._hands_offset + index] % self.ways
+
+        while True:
+            offset = self._slot_offset(index, hand)
+            if self._map[offset + 1]:
+                self._map[offset + 1] = 0
+                hand = (hand + 1) % self.ways
+                continue
+
+            self._map[self._hands_offset + index] = (hand + 1) % self.ways
+            return hand, True
+
+    # ---- Public interface ----
+    def get(self, key, default=None):
+
+        '''
+        Return a cached value.
+
+        Args:
+            key (str | bytes): cache key.
+            default (any, optional): value returned on miss or expiry.
+        '''
+
+        key_bytes, key_hash, index = self._locate(key)
+        now = time.time()
+
+        self._lock(index)
+        try:
+            way = self._find(index, key_bytes, key_hash)
+
+            if way is None:
+                payload = None
+            else:
+                offset = self._slot_offset(index, way)
+                _, _, _, expires_at, _, key_len, value_len = self._read_header(offset)
+
+                if expires_at and expires_at <= now:
+                    self._map[offset] = self._FREE
+                    payload = None
+                else:
+                    start = offset + self._SLOT.size + key_len
+                    payload = self._map[start:start + value_len]
+
+                    # --- reference bit and access time ---
+                    self._map[offset + 1] = 1
+                    struct.pack_into('<d', self._map, offset + 24, now)
+        finally:
+            self._unlock(index)
+
+        if payload is None:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return pickle.loads(payload)
+
+    def set(self, key, value, ttl=None, size=None):
+
+        '''
+        Store a value, evicting within its set when the set is full.
+
+        Entries that do not fit into one slot are not stored.
+
+        Args:
+            key (str | bytes): cache key.
+            value (any): picklable value.
+            ttl (float, optional): seconds before the entry expires.
+            size (int, optional): ignored, kept for `LRUCache` compatibility.
+        '''
+
+        key_bytes, key_hash, index = self._locate(key)
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+        if self._SLOT.size + len(key_bytes) + len(payload) > self.slot_size:
+            self.delete(key)
+            return
+
+        now = time.time()
+        expires_at = now + ttl if ttl else 0.0
+
+        self._lock(index)
+        try:
+            way = self._find(index, key_bytes, key_hash)
+
+            if way is None:
+                way, evicted = self._victim(index, now)
+                if evicted:
+                    self.evictions += 1
+
+            offset = self._slot_offset(index, way)
+            start = offset + self._SLOT.size
+            self._map[start:start + len(key_bytes)] = key_bytes
+            self._map[start + len(key_bytes):start + len(key_bytes) + len(payload)] = payload
+            self._SLOT.pack_into(self._map, offset, self._USED, 1, key_hash, expires_at, now, len(key_bytes), len(payload))
+        finally:
+            self._unlock(index)
+
+    def delete(self, key):
+
+        '''
+        Remove an entry if present.
+
+        Args:
+            key (str | bytes): cache key.
+        '''
+
+        key_bytes, key_hash, index = self._locate(key)
+
+        self._lock(index)
+        try:
+            way = self._find(index, key_bytes, key_hash)
+            if way is not None:
+                self._map[self._slot_offset(index, way)] = self._FREE
+        finally:
+            self._unlock(index)
+
+    def keys(self):
+
+        ''' Return a snapshot of the live keys across every set. '''
+
+        now = time.time()
+        keys = []
+
+        for index in range(self.sets):
+            self._lock(index)
+            try:
+                for way in range(self.ways):
+                    offset = self._slot_offset(index, way)
+                    state, _, _, expires_at, _, key_len, _ = self._read_header(offset)
+
+                    if state == self._USED and not (expires_at and expires_at <= now):
+                        start = offset + self._SLOT.size
+                        keys.append(self._map[start:start + key_len].decode('utf-8', 'replace'))
+            finally:
+                self._unlock(index)
+
+        return keys
+
+    def clear(self):
+
+        ''' Remove every entry. '''
+
+        for index in range(self.sets):
+            self._lock(index)
+            try:
+                for way in range(self.ways):
+                    self._map[self._slot_offset(index, way)] = self._FREE
+            finally:
+                self._unlock(index)
+
+    def stats(self):
+
+        ''' Return cache counters (per process) and the shared entry count. '''
+
+        return {
+            'entries': len(self.keys()),
+            'slots': self.slots,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+    def close(self):
+
+        ''' Unmap the segment in this process. '''
+
+        self._map.close()
+        os.close(self._fd)
+
+    def unlink(self):
+
+        ''' Remove the backing file, existing mappings stay valid until closed. '''
+
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __len__(self):
+        return len(self.keys())
@@ -0,0 +1,283 @@
+'''
+Server-Sent Events for `Citra` framework.
+
+`EventChannel` is a publish/subscribe channel for one-way live updates. Each
+published event is serialized once into a `bytes` block that is shared by
+every subscriber, the last `history` events are kept in a ring buffer so a
+reconnecting browser resumes from its `Last-Event-ID`, and a subscriber whose
+unsent backlog passes `max_buffer` bytes is dropped instead of growing
+without bound.
+
+Example:
+    prices = EventChannel(history=500)
+
+    async def live_prices(request):
+        return prices.subscribe(request)
+
+    core.send('/prices', live_prices)
+
+    # --- anywhere, also from a plain `def` handler thread ---
+    prices.publish({'symbol': 'CTR', 'price': 12.5}, event='price')
+'''
+
+from citra_framework.components.response import StreamingResponse
+from collections import deque
+import asyncio
+import itertools
+import json
+import threading
+
+
+def encode_event(data, event=None, id=None, retry=None):
+
+    '''
+    Serialize one event in the `text/event-stream` format.
+
+    Args:
+        data (str | dict | list): event data, dictionaries and lists are sent as JSON.
+        event (str, optional): event type.
+        id (str | int, optional): event id, echoed back as `Last-Event-ID` on reconnect.
+        retry (int, optional): client reconnection delay in milliseconds.
+    '''
+
+    if not isinstance(data, str):
+        data = json.dumps(data)
+
+    lines = []
+
+    if id is not None:
+        lines.append(f'id: {id}')
+    if event:
+        lines.append(f'event: {event}')
+    if retry is not None:
+        lines.append(f'retry: {retry}')
+
+    lines.extend(f'data: {line}' for line in data.split('\n'))
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+class EventStream(StreamingResponse):
+
+    '''
+    `text/event-stream` response of one subscriber.
+
+    The stream has no chunked framing, it is delimited by the connection
+    close, so the shared event bytes are written to the socket as they are.
+    '''
+
+    def __init__(self, content, headers=None, subscriber=None):
+        headers = {
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+            **(headers or {})
+        }
+        super().__init__(content, 200, headers, chunked=False)
+        self.subscriber = subscriber
+
+    async def write_to(self, writer):
+
+        ''' Write the stream, letting the channel abort the connection of a dropped subscriber. '''
+
+        if self.subscriber is not None:
+            self.subscriber.transport = writer.transport
+
+        await super().write_to(writer)
+
+
+class Subscriber:
+
+    '''
+    Pending events of one connected client.
+
+    Attributes:
+        buffered (int): bytes queued and not yet written.
+        dropped (bool): `True` once removed for being too slow.
+        last_id (int): id of the newest queued event, older ones are ignored.
+        transport (Transport): client connection, set once the stream is written.
+    '''
+
+    def __init__(self):
+        self.pending = deque()
+        self.buffered = 0
+        self.dropped = False
+        self.last_id = 0
+        self.transport = None
+        self.wakeup = asyncio.Event()
+
+    def push(self, event_id, payload):
+
+        # --- an event published during the history replay is already queued ---
+        if event_id <= self.last_id:
+            return
+
+        self.last_id = event_id
+        self.pending.append(payload)
+        self.buffered += len(payload)
+        self.wakeup.set()
+
+
+class EventChannel:
+
+    '''
+    Publish/subscribe channel streaming Server-Sent Events.
+
+    Attributes:
+        history (deque): `(id, bytes)` of the most recent events.
+        subscribers (set[Subscriber]): connected clients.
+    '''
+
+    def __init__(
+        self,
+        history=1000,
+        max_buffer=256 * 1024,
+        keep_alive=15.0,
+        retry=None
+    ):
+
+        '''
+        Initialize the channel.
+
+        Args:
+            history (int, optional): events kept for `Last-Event-ID` resume defaults to `1000`.
+            max_buffer (int, optional): unsent bytes after which a subscriber is dropped defaults to `256KB`.
+            keep_alive (float, optional): seconds of silence before a `: keep-alive` comment defaults to `15`.
+            retry (int, optional): reconnection delay in milliseconds advertised to clients.
+        '''
+
+        self.history = deque(maxlen=history)
+        self.max_buffer = max_buffer
+        self.keep_alive = keep_alive
+        self.retry = retry
+        self.subscribers = set()
+
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._loop = None
+
+        # --- counters ---
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, data, event=None):
+
+        '''
+        Serialize an event once and queue the same bytes for every subscriber.
+
+        Safe to call from the event loop or from another thread.
+
+        Args:
+            data (str | dict | list): event data.
+            event (str, optional): event type.
+
+        Returns:
+            int: id of the event.
+        '''
+
+        with self._lock:
+            event_id = next(self._ids)
+            payload = encode_event(data, event=event, id=event_id)
+            self.history.append((event_id, payload))
+            self.published += 1
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if self._loop is None or running is self._loop:
+            self._deliver(event_id, payload)
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._deliver, event_id, payload)
+
+        return event_id
+
+    def _deliver(self, event_id, payload):
+        for subscriber in list(self.subscribers):
+            if subscriber.buffered + len(payload) > self.max_buffer:
+                self._drop(subscriber)
+            else:
+                subscriber.push(event_id, payload)
+
+    def _drop(self, subscriber):
+
+        ''' Release the backlog of a slow subscriber and abort its connection. '''
+
+        subscriber.dropped = True
+        subscriber.pending.clear()
+        subscriber.buffered = 0
+        subscriber.wakeup.set()
+        self.subscribers.discard(subscriber)
+        self.dropped += 1
+
+        # --- its stream task may be blocked in drain() on a client that stopped reading ---
+        if subscriber.transport is not None:
+            subscriber.transport.abort()
+
+    def subscribe(self, request=None, headers=None):
+
+        '''
+        Return the event stream response of a new subscriber.
+
+        Args:
+            request (Request, optional): subscribing request, its `Last-Event-ID` header resumes the stream.
+            headers (dict, optional): extra response headers.
+        '''
+
+        last_id = None
+
+        if request is not None:
+            try:
+                last_id = int(request.headers.get('last-event-id', ''))
+            except ValueError:
+                last_id = None
+
+        subscriber = Subscriber()
+        return EventStream(self._stream(subscriber, last_id), headers, subscriber)
+
+    async def _stream(self, subscriber, last_id):
+
+        ''' Yield replayed then live event bytes for one subscriber. '''
+
+        self._loop = asyncio.get_running_loop()
+
+        with self._lock:
+            if last_id is not None:
+                for event_id, payload in self.history:
+                    if event_id > last_id:
+                        subscriber.push(event_id, payload)
+
+            self.subscribers.add(subscriber)
+
+        try:
+            # --- open the stream right away, proxies and browsers see it is alive ---
+            yield f'retry: {self.retry}\n\n'.encode() if self.retry is not None else b': connected\n\n'
+
+            while not subscriber.dropped:
+                if not subscriber.pending:
+                    subscriber.wakeup.clear()
+
+                    try:
+                        await asyncio.wait_for(subscriber.wakeup.wait(), self.keep_alive)
+                    except asyncio.TimeoutError:
+                        yield b': keep-alive\n\n'
+                        continue
+
+                while subscriber.pending and not subscriber.dropped:
+                    payload = subscriber.pending.popleft()
+                    subscriber.buffered -= len(payload)
+                    yield payload
+        finally:
+            self.subscribers.discard(subscriber)
+
+    def stats(self):
+
+        ''' Return channel counters as a dictionary. '''
+
+        return {
+            'subscribers': len(self.subscribers),
+            'published': self.published,
+            'dropped': self.dropped,
+            'history': len(self.history),
+            'buffered': sum(subscriber.buffered for subscriber in self.subscribers)
+        }
@@ -3,6 +3,8 @@ Zest a lightweight template engine designed for `Citra` framework.
 '''
 
 from citra_framework.components.response import Response
+from citra_framework.components.requests import Request
+from citra_framework.components.cache import LRUCache
 import os
 import re
 
@@ -42,17 +44,27 @@ class Zest:
                 <p>You are online.</p>
             $ endif $
             
+    4. Fragment Cache:
+        - pass `cache_key` (and optional `cache_ttl`) to `display()` to reuse
+          the rendered HTML of a page or fragment.
+        
+        Example:
+            core.templates.display('users.html', {'users': users}, cache_key='users', cache_ttl=30)
+            
     Updates:
         - v.0.1.0 -> Add Flash messages.
+        - Flash messages are kept per session when `SessionMiddleware` is installed.
     '''
     
-    def __init__(self, template_dir='src', router=None):
+    def __init__(self, template_dir='src', router=None, cache=None):
         
         '''
         Initialize the `Zest` template engine.
         
         Args:
             template_dir (str): directory containing `.html` files.
+            router (Router, optional): router to resolve urls.
+            cache (object, optional): fragment cache backend (e.g., `SharedMemoryCache`) defaults to `LRUCache`.
         '''
         
         self.template_dir = template_dir
@@ -60,7 +72,10 @@ class Zest:
         # router to resolve urls
         self.router = router 
         
-        # temporary flash mesage
+        # rendered fragment cache
+        self.cache = cache if cache is not None else LRUCache(max_bytes=16 * 1024 * 1024)
+        
+        # flash messages of apps without `SessionMiddleware` (shared by every client)
         self._flashes =[]
         
     def _load_template(self, template_name):
@@ -149,12 +164,21 @@ class Zest:
         '''
         Store a flash message for the next render cycle.
         
+        With `SessionMiddleware` the message is stored in the session of the
+        current request, so it is shown to that client only and survives a
+        redirect served by another worker.
+        
         Args:
             message (str): the messge to display.
             category (str, optional): message category (e.g., info, error, warning, success).
         '''
         
-        self._flashes.append({'message': message, 'category': category})
+        session = self._session()
+        
+        if session is not None:
+            session.flash(message, category)
+        else:
+            self._flashes.append({'message': message, 'category': category})
     
     def get_flashed_message(self, clear=True):
         
@@ -165,12 +189,26 @@ class Zest:
             clear (bool): wether to clear messages after retrieval.
         '''
         
+        session = self._session()
+        
+        if session is not None:
+            return session.flashes(clear)
+        
         messages =self._flashes.copy()
         
         if clear:
             self._flashes.clear()
         
         return messages
+    
+    @staticmethod
+    def _session():
+        
+        '''
+        Return the session of the current request, `None` without `SessionMiddleware`.
+        '''
+        
+        return getattr(Request.current(), 'session', None)
 
 
     '''
@@ -182,7 +220,9 @@ class Zest:
         self,
         template_name,
         context=None,
-        status_code=200
+        status_code=200,
+        cache_key=None,
+        cache_ttl=None
     ):
         '''
         Render or display a template file into a complete `HTML` response.
@@ -191,10 +231,36 @@ class Zest:
             template_name (str): file name of the template (must be inside `template_dir`).
             context (dict, optional): dictionary of variables passed into the template.
             status_code (int, optional): HTTP status code for the response.
+            cache_key (str, optional): key to reuse the rendered output from the fragment cache.
+            cache_ttl (float, optional): seconds the rendered output is kept.
         '''
         
         context = context or {}
         context['_flashes'] = self.get_flashed_message(clear=True)
+        
+        # --- pages carrying flash messages are never cached ---
+        if cache_key is not None and not context['_flashes']:
+            fragment_key = f'zest:{template_name}:{cache_key}'
+            rendered = self.cache.get(fragment_key)
+            
+            if rendered is None:
+                rendered = self.render(template_name, context)
+                self.cache.set(fragment_key, rendered, ttl=cache_ttl)
+            
+            return Response(rendered, status_code, {"Content-Type": "text/html"})
+        
+        return Response(self.render(template_name, context), status_code, {"Content-Type": "text/html"})
+    
+    def render(self, template_name, context):
+        
+        '''
+        Render a template file into an `HTML` string.
+        
+        Args:
+            template_name (str): file name of the template (must be inside `template_dir`).
+            context (dict): dictionary of variables passed into the template.
+        '''
+        
         template = self._load_template(template_name)
         template = self._process_control_structures(template, context)
         
@@ -227,9 +293,7 @@ class Zest:
                     return f'/{route_name}'
             return f'/{route_name}'
         
-        rendered = re.sub(r'@(\w+)', replace_action, rendered)
-        
-        return Response(rendered, status_code, {"Content-Type": "text/html"})
+        return re.sub(r'@(\w+)', replace_action, rendered)
     
     def forward(
         self,
@@ -0,0 +1,595 @@
+'''
+WebSocket support (RFC 6455) for `Citra` framework.
+
+A WebSocket route is registered with `core.websocket(path, handler)`. The
+upgrade request goes through the router and the middleware chain like any
+other request (so authentication and rate limits apply to the handshake),
+then the server answers `101 Switching Protocols` and runs the handler with
+a `WebSocket` for the rest of the connection.
+
+Example:
+    clients = set()
+
+    async def dashboard(ws):
+        clients.add(ws)
+        try:
+            async for message in ws:
+                await ws.send({'echo': message})
+        finally:
+            clients.discard(ws)
+
+    core.websocket('/live', dashboard)
+
+    # --- elsewhere, one encoded frame written to every client ---
+    await broadcast(clients, {'orders': 1250})
+'''
+
+from citra_framework.components.response import Response
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+
+GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+# --- opcodes ---
+CONTINUATION = 0x0
+TEXT = 0x1
+BINARY = 0x2
+CLOSE = 0x8
+PING = 0x9
+PONG = 0xA
+
+# --- close codes ---
+NORMAL_CLOSURE = 1000
+GOING_AWAY = 1001
+PROTOCOL_ERROR = 1002
+INVALID_DATA = 1007
+MESSAGE_TOO_BIG = 1009
+INTERNAL_ERROR = 1011
+
+
+class WebSocketClosed(Exception):
+
+    '''
+    Raised by `receive()` and `send()` once the connection is closed.
+
+    Attributes:
+        code (int): close code.
+        reason (str): close reason.
+    '''
+
+    def __init__(self, code=NORMAL_CLOSURE, reason=''):
+        super().__init__(f'WebSocket closed ({code}) {reason}'.strip())
+        self.code = code
+        self.reason = reason
+
+
+def accept_key(key):
+
+    '''
+    Return the `Sec-WebSocket-Accept` value for a client key.
+
+    Args:
+        key (str): `Sec-WebSocket-Key` request header.
+    '''
+
+    return base64.b64encode(hashlib.sha1((key + GUID).encode()).digest()).decode()
+
+
+def handshake_error(request):
+
+    '''
+    Validate an upgrade request.
+
+    Args:
+        request (Request): upgrade request.
+
+    Returns:
+        str | None: reason the handshake is invalid, `None` when valid.
+    '''
+
+    if request.method != 'GET':
+        return 'WebSocket upgrade requires GET.'
+
+    if 'upgrade' not in request.headers.get('connection', '').lower():
+        return 'Missing Connection: Upgrade.'
+
+    if request.headers.get('sec-websocket-version') != '13':
+        return 'Unsupported WebSocket version.'
+
+    key = request.headers.get('sec-websocket-key', '')
+
+    try:
+        if len(base64.b64decode(key, validate=True)) != 16:
+            return 'Invalid Sec-WebSocket-Key.'
+    except ValueError:
+        return 'Invalid Sec-WebSocket-Key.'
+
+    return None
+
+
+def encode_frame(opcode, payload, fin=True):
+
+    '''
+    Encode a server frame (servers never mask).
+
+    Args:
+        opcode (int): frame opcode.
+        payload (bytes): frame payload.
+        fin (bool, optional): final fragment flag.
+    '''
+
+    first = (0x80 if fin else 0) | opcode
+    length = len(payload)
+
+    if length < 126:
+        head = struct.pack('!BB', first, length)
+    elif length < 65536:
+        head = struct.pack('!BBH', first, 126, length)
+    else:
+        head = struct.pack('!BBQ', first, 127, length)
+
+    return head + payload
+
+
+def encode_message(message):
+
+    '''
+    Encode a message as one frame: `str` and `dict` as text, `bytes` as binary.
+
+    Args:
+        message (str | bytes | dict | list): message to send.
+    '''
+
+    if isinstance(message, (bytes, bytearray, memoryview)):
+        return encode_frame(BINARY, bytes(message))
+
+    if isinstance(message, (dict, list)):
+        message = json.dumps(message)
+
+    return encode_frame(TEXT, message.encode())
+
+
+def unmask(payload, mask):
+
+    '''
+    Apply a client masking key, XOR-ing the whole payload as one integer.
+
+    Args:
+        payload (bytes): masked payload.
+        mask (bytes): 4-byte masking key.
+    '''
+
+    length = len(payload)
+
+    if not length:
+        return payload
+
+    key = (mask * (length // 4 + 1))[:length]
+    return (int.from_bytes(payload, 'big') ^ int.from_bytes(key, 'big')).to_bytes(length, 'big')
+
+
+def parse_close(payload):
+
+    '''
+    Return the `(code, reason)` of a close frame payload.
+
+    Codes that must never be sent on the wire (e.g., `1005`, `1006`, `1015`)
+    or are outside the defined ranges become `PROTOCOL_ERROR`, so the code
+    echoed back is always valid (RFC 6455, section 7.4).
+
+    Args:
+        payload (bytes): unmasked close frame payload.
+    '''
+
+    if not payload:
+        return NORMAL_CLOSURE, ''
+
+    if len(payload) < 2:
+        return PROTOCOL_ERROR, 'invalid close frame'
+
+    code, = struct.unpack('!H', payload[:2])
+
+    if not (1000 <= code <= 1003 or 1007 <= code <= 1014 or 3000 <= code <= 4999):
+        return PROTOCOL_ERROR, f'invalid close code {code}'
+
+    try:
+        return code, payload[2:].decode('utf-8')
+    except UnicodeDecodeError:
+        return INVALID_DATA, 'invalid close reason'
+
+
+class WebSocketUpgrade(Response):
+
+    '''
+    Returned by the route of `core.websocket()`, tells the server to switch protocols.
+
+    Attributes:
+        handler (coroutine): `async def handler(ws, **kwargs)`.
+        kwargs (dict): dynamic URL segments.
+        limits (dict): `WebSocket` limits (`max_message_size`, `ping_interval`, ...).
+    '''
+
+    def __init__(self, request, handler, kwargs, **limits):
+        super().__init__('', 101)
+        self.request = request
+        self.handler = handler
+        self.kwargs = kwargs
+        self.limits = limits
+
+    def build(self):
+
+        ''' Build the `101 Switching Protocols` handshake response. '''
+
+        key = accept_key(self.request.headers.get('sec-websocket-key', ''))
+        headers = {
+            'Upgrade': 'websocket',
+            'Connection': 'Upgrade',
+            'Sec-WebSocket-Accept': key
+        }
+        headers.update((name, value) for name, value in self.headers.items() if name not in ('Connection', 'Content-Length'))
+
+        lines = ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+        lines += ''.join(f'Set-Cookie: {cookie}\r\n' for cookie in self.cookies)
+        return f'HTTP/1.1 101 Switching Protocols\r\n{lines}\r\n'.encode()
+
+
+class WebSocket:
+
+    '''
+    One server-side WebSocket connection.
+
+    A reader task parses incoming frames as they arrive: pings are answered,
+    pongs are recorded, fragmented messages are reassembled (bounded by
+    `max_message_size`) and complete messages are queued for `receive()`.
+    Control frames are therefore handled even when the handler only sends.
+
+    Attributes:
+        request (Request): upgrade request.
+        closed (bool): `True` once a close frame was sent or the peer left.
+        close_code (int | None): close code once closed.
+    '''
+
+    def __init__(
+        self,
+        reader,
+        writer,
+        request,
+        max_message_size=1024 * 1024,
+        max_queue=32,
+        ping_interval=20.0,
+        ping_timeout=20.0,
+        write_limit=1024 * 1024,
+        close_timeout=5.0
+    ):
+
+        '''
+        Initialize the connection.
+
+        Args:
+            reader (StreamReader): client stream reader.
+            writer (StreamWriter): client stream writer.
+            request (Request): upgrade request.
+            max_message_size (int, optional): size limit of one (reassembled) message defaults to `1MB`.
+            max_queue (int, optional): received messages buffered before reading pauses defaults to `32`.
+            ping_interval (float, optional): seconds between keep-alive pings, `None` disables them.
+            ping_timeout (float, optional): seconds to wait for the pong before closing.
+            write_limit (int, optional): unsent bytes after which `broadcast()` drops this client defaults to `1MB`.
+            close_timeout (float, optional): seconds `close()` waits for the close frame to drain before aborting defaults to `5`.
+        '''
+
+        self.reader = reader
+        self.writer = writer
+        self.request = request
+        self.max_message_size = max_message_size
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.write_limit = write_limit
+        self.close_timeout = close_timeout
+
+        self.closed = False
+        self.close_code = None
+        self.close_reason = ''
+
+        self._messages = asyncio.Queue(max_queue)
+        self._pong = asyncio.Event()
+        self._tasks = []
+
+    def start(self):
+
+        ''' Start the frame reader and the keep-alive pinger. '''
+
+        self._tasks.append(asyncio.create_task(self._read_loop()))
+
+        if self.ping_interval:
+            self._tasks.append(asyncio.create_task(self._keepalive()))
+
+    async def receive(self):
+
+        '''
+        Wait for the next message.
+
+        Returns:
+            str | bytes: text messages as `str`, binary messages as `bytes`.
+
+        Raises:
+            WebSocketClosed: the connection is closed.
+        '''
+
+        message = await self._messages.get()
+
+        if isinstance(message, WebSocketClosed):
+            # --- keep the marker for later receive() calls ---
+            self._messages.put_nowait(message)
+            raise message
+
+        return message
+
+    async def receive_json(self):
+        return json.loads(await self.receive())
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self.receive()
+        except WebSocketClosed:
+            raise StopAsyncIteration
+
+    async def send(self, message):
+
+        '''
+        Send a message, `str`/`dict` as text and `bytes` as binary.
+
+        Args:
+            message (str | bytes | dict | list): message to send.
+        '''
+
+        await self.send_frame(encode_message(message))
+
+    async def send_frame(self, frame):
+
+        '''
+        Write an already encoded frame and wait for the socket buffer to drain.
+
+        Args:
+            frame (bytes): frame from `encode_frame()` / `encode_message()`.
+        '''
+
+        if self.closed:
+            raise WebSocketClosed(self.close_code or GOING_AWAY, self.close_reason)
+
+        try:
+            self.writer.write(frame)
+            await self.writer.drain()
+        except ConnectionError:
+            self._finish(GOING_AWAY, 'connection lost')
+            raise WebSocketClosed(GOING_AWAY, 'connection lost')
+
+    async def ping(self, data=b''):
+        await self.send_frame(encode_frame(PING, data))
+
+    async def close(self, code=NORMAL_CLOSURE, reason=''):
+
+        '''
+        Send a close frame and stop reading.
+
+        A peer that does not read the close frame within `close_timeout` has
+        its connection aborted, a stuck client never holds the caller.
+
+        Args:
+            code (int, optional): close code defaults to `1000`.
+            reason (str, optional): close reason.
+        '''
+
+        if self.closed:
+            return
+
+        self._finish(code, reason)
+
+        try:
+            self.writer.write(encode_frame(CLOSE, struct.pack('!H', code) + reason.encode()[:123]))
+            await asyncio.wait_for(self.writer.drain(), self.close_timeout)
+        except ConnectionError:
+            pass
+        except asyncio.TimeoutError:
+            self.writer.transport.abort()
+
+    def abort(self, code=GOING_AWAY, reason=''):
+
+        '''
+        Drop the connection at once without writing or waiting, for slow or stuck peers.
+
+        Args:
+            code (int, optional): close code reported to `receive()` defaults to `1001`.
+            reason (str, optional): close reason.
+        '''
+
+        self._finish(code, reason)
+        self.writer.transport.abort()
+
+    def _finish(self, code, reason):
+        if self.closed:
+            return
+
+        self.closed = True
+        self.close_code = code
+        self.close_reason = reason
+
+        # --- wake up receive(), the queue may be full of unread messages ---
+        if self._messages.full():
+            self._messages.get_nowait()
+        self._messages.put_nowait(WebSocketClosed(code, reason))
+
+    async def shutdown(self, code=GOING_AWAY):
+
+        '''
+        Close the connection if still open and stop the background tasks.
+
+        Args:
+            code (int, optional): close code sent when the connection is still open defaults to `GOING_AWAY`.
+        '''
+
+        await self.close(code)
+
+        for task in self._tasks:
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _read_frame(self):
+
+        ''' Read one frame, returning `(fin, opcode, payload)`. '''
+
+        first, second = await self.reader.readexactly(2)
+        fin = bool(first & 0x80)
+        opcode = first & 0x0F
+        length = second & 0x7F
+
+        if first & 0x70:
+            raise WebSocketClosed(PROTOCOL_ERROR, 'reserved bits set')
+
+        if not second & 0x80:
+            raise WebSocketClosed(PROTOCOL_ERROR, 'client frames must be masked')
+
+        if length == 126:
+            length, = struct.unpack('!H', await self.reader.readexactly(2))
+        elif length == 127:
+            length, = struct.unpack('!Q', await self.reader.readexactly(8))
+
+        if opcode >= CLOSE and (not fin or length > 125):
+            raise WebSocketClosed(PROTOCOL_ERROR, 'invalid control frame')
+
+        if length > self.max_message_size:
+            raise WebSocketClosed(MESSAGE_TOO_BIG, 'message too big')
+
+        mask = await self.reader.readexactly(4)
+        return fin, opcode, unmask(await self.reader.readexactly(length), mask)
+
+    async def _read_loop(self):
+
+        ''' Parse incoming frames until the connection closes. '''
+
+        fragments = None
+        kind = None
+        size = 0
+
+        try:
+            while not self.closed:
+                fin, opcode, payload = await self._read_frame()
+
+                if opcode == PING:
+                    await self.send_frame(encode_frame(PONG, payload))
+                    continue
+
+                if opcode == PONG:
+                    self._pong.set()
+                    continue
+
+                if opcode == CLOSE:
+                    await self.close(*parse_close(payload))
+                    return
+
+                if opcode == CONTINUATION:
+                    if fragments is None:
+                        raise WebSocketClosed(PROTOCOL_ERROR, 'unexpected continuation frame')
+                elif opcode in (TEXT, BINARY):
+                    if fragments is not None:
+                        raise WebSocketClosed(PROTOCOL_ERROR, 'expected continuation frame')
+                    fragments, kind, size = [], opcode, 0
+                else:
+                    raise WebSocketClosed(PROTOCOL_ERROR, f'unknown opcode {opcode}')
+
+                size += len(payload)
+                if size > self.max_message_size:
+                    raise WebSocketClosed(MESSAGE_TOO_BIG, 'message too big')
+
+                fragments.append(payload)
+
+                if not fin:
+                    continue
+
+                message = b''.join(fragments)
+                fragments = None
+
+                if kind == TEXT:
+                    try:
+                        message = message.decode('utf-8')
+                    except UnicodeDecodeError:
+                        raise WebSocketClosed(INVALID_DATA, 'invalid utf-8')
+
+                # --- a full queue pauses reading, TCP pushes back on the client ---
+                await self._messages.put(message)
+
+        except WebSocketClosed as e:
+            await self.close(e.code, e.reason)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            self._finish(GOING_AWAY, 'connection lost')
+
+    async def _keepalive(self):
+
+        ''' Ping every `ping_interval` seconds, abort when no pong comes back. '''
+
+        while not self.closed:
+            await asyncio.sleep(self.ping_interval)
+            self._pong.clear()
+
+            # --- the ping write is bounded too, a peer that stopped reading never drains ---
+            try:
+                await asyncio.wait_for(self._ping_pong(), self.ping_timeout)
+            except WebSocketClosed:
+                return
+            except asyncio.TimeoutError:
+                self.abort(GOING_AWAY, 'keepalive ping timeout')
+                return
+
+    async def _ping_pong(self):
+        await self.ping()
+        await self._pong.wait()
+
+
+async def broadcast(sockets, message, timeout=None):
+
+    '''
+    Send one message to many sockets, encoding the frame once.
+
+    The same bytes are written to every open socket. Clients whose unsent
+    buffer is above their `write_limit` are slow consumers: their connection
+    is aborted instead of letting their backlog grow, nothing waits on them.
+
+    Args:
+        sockets (iterable[WebSocket]): target connections.
+        message (str | bytes | dict | list): message to send.
+        timeout (float, optional): seconds to wait for all buffers to drain, `None` (default) does not wait.
+
+    Returns:
+        int: number of sockets the message was written to.
+    '''
+
+    frame = encode_message(message)
+    sent = []
+
+    for ws in list(sockets):
+        if ws.closed:
+            continue
+
+        transport = ws.writer.transport
+        if transport.get_write_buffer_size() > ws.write_limit:
+            ws.abort(GOING_AWAY, 'slow consumer')
+            continue
+
+        ws.writer.write(frame)
+        sent.append(ws)
+
+    if sent and timeout:
+        drains = asyncio.gather(*(ws.writer.drain() for ws in sent), return_exceptions=True)
+
+        try:
+            await asyncio.wait_for(drains, timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    return len(sent)
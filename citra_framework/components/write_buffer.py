@@ -0,0 +1,241 @@
+from .circuit_breaker import CircuitOpenError
+import mysql.connector as mysql
+import asyncio
+import contextvars
+import threading
+import time
+
+class WriteBehindBuffer:
+
+    '''
+    Write-behind buffer that coalesces inserts into multi-row statements.
+
+    Rows inserted into the same table with the same column set are kept in
+    memory and written as a single `INSERT ... VALUES (...), (...)` with one
+    commit, either when `max_rows` rows are waiting or `flush_interval`
+    seconds after the first buffered row. Thousands of single-row inserts a
+    second become a handful of batched statements.
+
+    The buffer is bounded by `max_buffered` rows: when it is full the caller
+    flushes inline before its row is accepted (backpressure), so memory
+    stays bounded when the database falls behind. While the database circuit
+    breaker is open, rows stay buffered and the flush is retried on the next
+    interval, an inline flush then raises `CircuitOpenError` to the caller.
+    When a batch fails because of its data (a constraint, a bad value) its
+    rows are written again one by one, so only the offending rows are
+    dropped and counted in `failed_rows`.
+
+    Attributes:
+        database (Database): database used to write the batches.
+        max_rows (int): rows per statement, reaching it triggers a flush.
+        flush_interval (float): maximum seconds a row waits in the buffer.
+        max_buffered (int): total buffered rows before inline flushing.
+
+    Example:
+        core.database.enable_write_behind(max_rows=500, flush_interval=0.05)
+        core.database.insert('events', kind='click', user_id=12)
+
+        core.database.flush()
+        core.database.write_buffer.stats()
+        # {'buffered': 0, 'tables': {'events': {'rows': 12000, 'statements': 24, ...}}}
+    '''
+
+    def __init__(
+        self,
+        database,
+        max_rows=500,
+        flush_interval=0.05,
+        max_buffered=10000
+    ):
+        self.database = database
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+
+        # --- (table_name, columns) -> list of value tuples ---
+        self._pending = {}
+        self._buffered = 0
+        self._timer = None
+        self._lock = threading.RLock()
+
+        # --- per-table metrics ---
+        self.metrics = {}
+
+    def add(self, table_name, data):
+
+        '''
+        Buffer one row.
+
+        Args:
+            table_name (str): name of the table.
+            data (dict): column-value pairs.
+        '''
+
+        key = (table_name, tuple(data))
+
+        with self._lock:
+            if self._buffered >= self.max_buffered:
+                self._table_metrics(table_name)['backpressure'] += 1
+                self.flush()
+
+            rows = self._pending.setdefault(key, [])
+            rows.append(tuple(data.values()))
+            self._buffered += 1
+
+            if len(rows) >= self.max_rows:
+                try:
+                    self._flush_key(key)
+                except CircuitOpenError:
+                    if self._timer is None:
+                        self._schedule()
+            elif self._timer is None:
+                self._schedule()
+
+    def flush(self):
+
+        ''' Write every buffered row now. '''
+
+        with self._lock:
+            self._cancel_timer()
+
+            try:
+                for key in list(self._pending):
+                    self._flush_key(key)
+            except CircuitOpenError:
+                # --- the rows are kept, try again after the next interval ---
+                self._schedule()
+                raise
+
+    def _timed_flush(self):
+
+        ''' Timer callback, an open circuit only postpones the flush. '''
+
+        self._timer = None
+
+        try:
+            self.flush()
+        except CircuitOpenError:
+            pass
+
+    def _flush_key(self, key):
+
+        ''' Write the rows of one table/column set as a single statement. '''
+
+        rows = self._pending.pop(key, None)
+
+        if not rows:
+            return
+
+        self._buffered -= len(rows)
+        table_name, columns = key
+        metrics = self._table_metrics(table_name)
+        parameters = tuple(value for row in rows for value in row)
+        started = time.monotonic()
+        rejected = False
+        
+        try:
+            cursor = self._execute(self._statement(table_name, columns, len(rows)), parameters)
+        except CircuitOpenError:
+            self._requeue(key, rows, metrics)
+            raise
+        except mysql.Error:
+            cursor, rejected = None, True
+
+        metrics['flushes'] += 1
+        metrics['flush_time'] += time.monotonic() - started
+        metrics['max_batch'] = max(metrics['max_batch'], len(rows))
+
+        if rejected and len(rows) > 1:
+            # --- one bad row fails the whole statement, the others are written on their own ---
+            self._write_each(key, rows, metrics)
+        elif cursor is None:
+            metrics['failed_rows'] += len(rows)
+        else:
+            metrics['rows'] += len(rows)
+            metrics['statements'] += 1
+
+        if not self._pending:
+            self._cancel_timer()
+
+    def _write_each(self, key, rows, metrics):
+
+        ''' Write the rows of a rejected batch one statement each, dropping only the rows that fail. '''
+
+        table_name, columns = key
+        sql_query = self._statement(table_name, columns, 1)
+
+        for position, row in enumerate(rows):
+            try:
+                cursor = self._execute(sql_query, row)
+            except CircuitOpenError:
+                self._requeue(key, rows[position:], metrics)
+                raise
+            except mysql.Error:
+                cursor = None
+
+            if cursor is None:
+                metrics['failed_rows'] += 1
+            else:
+                metrics['rows'] += 1
+                metrics['statements'] += 1
+
+    def _execute(self, sql_query, parameters):
+
+        ''' Run a statement, batches belong to no single request so they run outside its deadline. '''
+
+        return contextvars.Context().run(self.database.execute, sql_query, parameters, raise_errors=True)
+
+    def _requeue(self, key, rows, metrics):
+
+        ''' Put rows back in front of the buffer while the circuit is open. '''
+
+        self._pending[key] = rows + self._pending.get(key, [])
+        self._buffered += len(rows)
+        metrics['deferred'] += 1
+
+    @staticmethod
+    def _statement(table_name, columns, count):
+
+        ''' Build a multi-row `INSERT` for `count` rows. '''
+
+        row_placeholder = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        return f'INSERT INTO {table_name} ({", ".join(columns)}) VALUES {", ".join([row_placeholder] * count)}'
+
+    def _schedule(self):
+
+        ''' Flush after `flush_interval`, on the event loop when one is running. '''
+
+        try:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.flush_interval, self._timed_flush, context=contextvars.Context())
+        except RuntimeError:
+            self._timer = threading.Timer(self.flush_interval, self._timed_flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _table_metrics(self, table_name):
+        return self.metrics.setdefault(table_name, {
+            'rows': 0,
+            'statements': 0,
+            'flushes': 0,
+            'failed_rows': 0,
+            'max_batch': 0,
+            'backpressure': 0,
+            'deferred': 0,
+            'flush_time': 0.0
+        })
+
+    def stats(self):
+
+        ''' Return per-table flush metrics and the current buffer size. '''
+
+        with self._lock:
+            return {
+                'buffered': self._buffered,
+                'tables': {table: dict(metrics) for table, metrics in self.metrics.items()}
+            }
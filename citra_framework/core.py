@@ -12,6 +12,10 @@ from citra_framework.components.debugger import Debugger
 from citra_framework.components.requests import Request
 from citra_framework.components.response import Response
 from citra_framework.components.template_engine.zest import Zest
+from citra_framework.components.background import BackgroundTasks
+from citra_framework.components.websocket import WebSocketUpgrade
+import functools
+import inspect
 
 
 class Citra:
@@ -25,6 +29,7 @@ class Citra:
         middleware (Middleware): holds middleware functions.
         database (Database | None): optional database integration.
         logger (Logger): application-wide logging system.
+        background (BackgroundTasks): runner for post-response tasks.
     '''
     _DEFAULT_SOURCE_TEMPLATE = 'src'
     _DEFAULT_HOSTNAME = '127.0.0.1'
@@ -35,7 +40,9 @@ class Citra:
         enable_db=False,
         config_db=None,
         debug=False,
-        template_dir=_DEFAULT_SOURCE_TEMPLATE
+        template_dir=_DEFAULT_SOURCE_TEMPLATE,
+        request_timeout=None,
+        max_workers=None
     ):
         
         '''
@@ -43,16 +50,22 @@ class Citra:
         
         Args:
             enable_db (bool | optional): initialize database connection `(MySQL)`.
-            db_config (dict | optional): connection details (`host`, `username`, `password`, `database`).
+            db_config (dict | optional): connection details (`host`, `username`, `password`, `database`),
+                optionally `replicas`, `replica_strategy` and `read_your_writes` for read/write splitting
+                and `circuit_breaker` (dict of `CircuitBreaker` options).
             debug (bool): debugging mode for development.
+            request_timeout (float | optional): global request deadline in seconds, routes override it with `timeout=`.
+            max_workers (int | optional): thread pool size for plain `def` handlers.
         '''
         
-        self.router = Router()
+        self.router = Router(timeout=request_timeout, max_workers=max_workers)
         self.middleware = Middleware()
         self.logger = Logger()
         self.debugger = Debugger(enabled=debug, logger=self.logger)
+        self.background = BackgroundTasks()
         self.debug = debug
         self.database = None 
+        self.server = None
         self._default_page = None
         
         # --- template engine
@@ -72,15 +85,27 @@ class Citra:
                 hostname=configure.get('hostname', 'localhost'),
                 username=configure.get('username', 'root'),
                 password=configure.get('password', ''),
-                database=configure.get('database', '')
+                database=configure.get('database', ''),
+                cache=configure.get('cache'),
+                replicas=configure.get('replicas'),
+                replica_strategy=configure.get('replica_strategy', 'round_robin'),
+                read_your_writes=configure.get('read_your_writes', 1.0)
             )
+            
+            if configure.get('circuit_breaker'):
+                self.database.enable_circuit_breaker(**configure['circuit_breaker'])
+            
+            # --- EXPLAIN every distinct statement once while developing ---
+            if debug:
+                self.database.enable_query_advisor()
     
     def send(
         self,
         path,
         handler,
         method='GET',
-        name=None
+        name=None,
+        **options
     ):
         
         '''
@@ -88,17 +113,63 @@ class Citra:
         
         Args:
             path (str): URL path (e.g., '/').
-            handler (coroutine): function to handle the request.
+            handler (coroutine | callable): function to handle the request, `async def` or plain `def`.
             method (str, optional): HTTP method defaults to 'GET'.
             name (str, optional): name for reverse route lookup.
+            **options: per-route settings (e.g., `cache_ttl=60`), see `Router.send`.
         '''
         
-        self.router.send(path, handler, method, name)
+        self.router.send(path, handler, method, name, **options)
+    
+    def websocket(
+        self,
+        path,
+        handler,
+        name=None,
+        **options
+    ):
+        
+        '''
+        Register a WebSocket route.
+        
+        The upgrade request runs through the middleware chain like a normal
+        request, a middleware answering with its own response (e.g., 401)
+        rejects the handshake.
+        
+        Args:
+            path (str): URL path (e.g., '/live').
+            handler (coroutine): `async def handler(ws, **kwargs)` receiving a `WebSocket`.
+            name (str, optional): name for reverse route lookup.
+            **options: per-route settings, plus `WebSocket` limits (`max_message_size`,
+                `max_queue`, `ping_interval`, `ping_timeout`, `write_limit`, `close_timeout`).
+                
+        Example:
+            async def echo(ws):
+                async for message in ws:
+                    await ws.send(message)
+            
+            core.websocket('/echo', echo, max_message_size=64 * 1024)
+        '''
+        
+        if not inspect.iscoroutinefunction(handler):
+            raise TypeError('WebSocket handlers must be `async def` functions.')
+        
+        limit_names = ('max_message_size', 'max_queue', 'ping_interval', 'ping_timeout', 'write_limit', 'close_timeout')
+        limits = {key: options.pop(key) for key in limit_names if key in options}
+        
+        @functools.wraps(handler)
+        async def upgrade(request, **kwargs):
+            return WebSocketUpgrade(request, handler, kwargs, **limits)
+        
+        self.router.send(path, upgrade, 'WEBSOCKET', name, **options)
         
     def serve(
         self,
         host=_DEFAULT_HOSTNAME,
-        port=_DEFAULT_PORT
+        port=_DEFAULT_PORT,
+        unix_socket=None,
+        fd=None,
+        **limits
     ):
         
         '''
@@ -107,7 +178,14 @@ class Citra:
         Args:
             host (str, optional): host to bind defaults to `'127.0.0.1'`.
             port (int, optional): port to bind defaults to `8000`.
+            unix_socket (str, optional): Unix domain socket path to listen on instead of `host:port`.
+            fd (int, optional): inherited listening socket descriptor to serve instead of `host:port`.
+            **limits: connection limits and timeouts passed to `Server` (e.g., `max_connections=512`, `backlog=1024`).
+            
+        Example:
+            core.serve(unix_socket='/run/citra/app.sock')   # behind nginx `proxy_pass http://unix:/run/citra/app.sock`
+            core.serve(fd=3)                                # systemd socket activation
         '''
         
-        server = Server(self, host, port)
-        server.serve()
\ No newline at end of file
+        self.server = Server(self, host, port, unix_socket=unix_socket, fd=fd, **limits)
+        self.server.serve()
\ No newline at end of file
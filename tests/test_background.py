@@ -0,0 +1,97 @@
+'''
+Test for background task runner of `Citra` framework.
+
+Test Development:
+    PYTHONPATH=$(pwd) pytest -v tests/test_background.py
+'''
+
+from citra_framework.components.background import BackgroundTasks
+from citra_framework.components.requests import Request
+from citra_framework.core import Citra
+import asyncio
+import threading
+import time
+
+def test_retries_with_backoff_then_succeeds():
+    tasks = BackgroundTasks(retries=2, backoff=0.001)
+    attempts = []
+    
+    async def flaky(name):
+        attempts.append(name)
+        if len(attempts) < 3:
+            raise ConnectionError('MySQL went away')
+    
+    async def main():
+        tasks.submit(flaky, args=('audit',))
+        await tasks.drain()
+    
+    asyncio.run(main())
+    
+    assert attempts == ['audit'] * 3
+    assert tasks.stats()['completed'] == 1
+    assert tasks.stats()['retried'] == 2
+
+def test_timeout_and_queue_limit():
+    tasks = BackgroundTasks(workers=1, max_queue=2, timeout=0.01)
+    written = []
+    
+    async def hanging():
+        await asyncio.sleep(1)
+    
+    def blocking_write():
+        written.append(True)
+    
+    async def main():
+        accepted = [tasks.submit(hanging), tasks.submit(blocking_write), tasks.submit(blocking_write)]
+        await tasks.drain()
+        return accepted
+    
+    assert asyncio.run(main()) == [True, True, False]
+    assert written == [True]
+    assert tasks.stats() == {
+        'queued': 0, 'running': 0, 'completed': 1, 'failed': 1, 'retried': 0, 'dropped': 1
+    }
+
+def test_submit_from_thread_pool_handler():
+    app = Citra()
+    done = []
+    
+    def audit(path):
+        done.append((path, threading.current_thread() is threading.main_thread()))
+    
+    def report(request):
+        accepted = app.background.submit(audit, args=(request.path,))
+        return {'accepted': accepted}
+    
+    app.send('/report', report)
+    
+    async def main():
+        app.background.start()
+        response = await app.router.dispatch(Request('GET', '/report', {}, b''), app)
+        await asyncio.sleep(0.05)
+        await app.background.drain()
+        return response
+    
+    asyncio.run(main())
+    
+    assert done == [('/report', False)]
+    assert app.background.stats()['completed'] == 1
+    assert BackgroundTasks().submit(audit) is False
+
+def test_timed_out_sync_task_is_not_retried():
+    tasks = BackgroundTasks(retries=3, backoff=0.001, timeout=0.01)
+    calls = []
+    
+    def stuck():
+        calls.append(True)
+        time.sleep(0.05)
+    
+    async def main():
+        tasks.submit(stuck)
+        await tasks.drain()
+    
+    asyncio.run(main())
+    
+    assert calls == [True]
+    assert tasks.stats()['failed'] == 1 and tasks.stats()['retried'] == 0
+
@@ -0,0 +1,124 @@
+'''
+Test for response caching of `Citra` framework.
+
+Test Development:
+    PYTHONPATH=$(pwd) pytest -v tests/test_cache.py
+'''
+
+from citra_framework.core import Citra
+from citra_framework.components.cache import LRUCache
+from citra_framework.components.requests import Request
+from citra_framework.components.response import Response
+from citra_framework.components.middlewares.cache_middleware import CacheMiddleware
+from citra_framework.components.shared_cache import SharedMemoryCache
+import asyncio
+import multiprocessing
+import pytest
+
+@pytest.fixture
+def app():
+    app = Citra()
+    app.calls = 0
+    
+    async def list_users(request):
+        app.calls += 1
+        return Response(f'users {app.calls}')
+    
+    app.cache = CacheMiddleware(vary=['Accept-Language'])
+    app.middleware.add(app.cache)
+    app.send('/users', list_users, cache_ttl=60)
+    return app
+
+def get(app, path, headers=None):
+    request = Request('GET', path, headers or {}, b'')
+    return asyncio.run(app.router.dispatch(request, app))
+
+def test_lru_evicts_by_size():
+    cache = LRUCache(max_bytes=10)
+    cache.set('a', b'12345')
+    cache.set('b', b'12345')
+    cache.get('a')
+    cache.set('c', b'12345')
+    
+    assert cache.get('b') is None
+    assert cache.get('a') == b'12345'
+    assert cache.size == 10
+
+def test_repeated_hits_skip_handler(app):
+    first = get(app, '/users?b=2&a=1')
+    second = get(app, '/users?a=1&b=2')
+    
+    assert app.calls == 1
+    assert second.body == b'users 1'
+    assert first.headers['ETag'] == second.headers['ETag']
+
+def test_vary_header_selects_variant(app):
+    get(app, '/users', {'accept-language': 'en'})
+    get(app, '/users', {'accept-language': 'fil'})
+    
+    assert app.calls == 2
+
+def test_if_none_match_returns_304(app):
+    etag = get(app, '/users').headers['ETag']
+    response = get(app, '/users', {'if-none-match': etag})
+    
+    assert response.status_code == 304
+    assert response.build().endswith(b'\r\n\r\n')
+
+def test_invalidate_reruns_handler(app):
+    get(app, '/users')
+    app.cache.invalidate('/users')
+    response = get(app, '/users')
+    
+    assert response.body == b'users 2'
+
+@pytest.fixture
+def shared_cache(tmp_path):
+    cache = SharedMemoryCache('citra-test', slots=64, slot_size=256, ways=4, directory=str(tmp_path))
+    yield cache
+    cache.close()
+
+def test_shared_cache_roundtrip(shared_cache):
+    shared_cache.set('users', [{'id': 1, 'name': 'Citra'}])
+    
+    assert shared_cache.get('users') == [{'id': 1, 'name': 'Citra'}]
+    assert shared_cache.keys() == ['users']
+    
+    shared_cache.delete('users')
+    assert shared_cache.get('users') is None
+
+def test_shared_cache_skips_oversized_entries(shared_cache):
+    shared_cache.set('big', b'x' * 1024)
+    
+    assert shared_cache.get('big') is None
+
+def test_shared_cache_is_bounded(shared_cache):
+    for number in range(500):
+        shared_cache.set(f'key-{number}', number)
+    
+    assert len(shared_cache) <= shared_cache.slots
+    assert shared_cache.get('key-499') == 499
+
+def test_shared_cache_visible_across_processes(shared_cache):
+    def worker():
+        shared_cache.set('from-child', 'hello')
+    
+    process = multiprocessing.get_context('fork').Process(target=worker)
+    process.start()
+    process.join()
+    
+    assert shared_cache.get('from-child') == 'hello'
+
+def test_cache_middleware_with_shared_backend(shared_cache):
+    app = Citra()
+    cache = CacheMiddleware(backend=shared_cache)
+    app.middleware.add(cache)
+    
+    async def home(request):
+        return Response('home')
+    
+    app.send('/', home, cache_ttl=60)
+    get(app, '/')
+    cache.invalidate('/')
+    
+    assert shared_cache.keys() == []
@@ -0,0 +1,542 @@
+'''
+Test for database features of `Citra` framework that do not need a MySQL server.
+
+The `database` fixture swaps the MySQL connection for a fake one that records
+every statement and answers queries with canned rows.
+
+Test Development:
+    PYTHONPATH=$(pwd) pytest -v tests/test_database_features.py
+'''
+
+from citra_framework.components.database import Database
+from citra_framework.components.requests import Request, _current_request
+from citra_framework.components.model import Model, Relation
+from citra_framework.core import Citra
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import pytest
+import time
+
+class FakeCursor:
+    def __init__(self, connection, dictionary=False):
+        self.connection = connection
+        self.dictionary = dictionary
+        self.rows = []
+        self.description = None
+    
+    def execute(self, query, parameters=()):
+        self.connection.statements.append((query, tuple(parameters)))
+        self.rows = self.connection.answer(query, tuple(parameters))
+        
+        if self.rows and not self.dictionary:
+            self.description = [(name,) for name in self.rows[0]]
+            self.rows = [tuple(row.values()) for row in self.rows]
+    
+    def fetchall(self):
+        return self.rows
+
+class FakeConnection:
+    def __init__(self, answer=None):
+        self.statements = []
+        self.commits = 0
+        self.answer = answer or (lambda query, parameters: [])
+    
+    def cursor(self, dictionary=False):
+        return FakeCursor(self, dictionary)
+    
+    def commit(self):
+        self.commits += 1
+
+@pytest.fixture
+def database():
+    database = Database(hostname='127.0.0.1', database='fake_db')
+    database.connection = FakeConnection()
+    database.cursor = database.connection.cursor(dictionary=True)
+    return database
+
+def test_write_behind_batches_inserts(database):
+    database.enable_write_behind(max_rows=3, flush_interval=60)
+    
+    for number in range(7):
+        database.insert('events', kind='click', user_id=number)
+    
+    assert len(database.connection.statements) == 2
+    
+    database.flush()
+    statements = database.connection.statements
+    
+    assert len(statements) == 3
+    assert statements[0][0] == 'INSERT INTO events (kind, user_id) VALUES (%s, %s), (%s, %s), (%s, %s)'
+    assert statements[0][1] == ('click', 0, 'click', 1, 'click', 2)
+    assert database.write_buffer.stats()['tables']['events']['rows'] == 7
+
+def test_write_behind_flushes_on_interval(database):
+    database.enable_write_behind(max_rows=100, flush_interval=0.01)
+    
+    async def main():
+        database.insert('events', kind='view')
+        database.insert('events', kind='view')
+        await asyncio.sleep(0.05)
+    
+    asyncio.run(main())
+    
+    assert len(database.connection.statements) == 1
+    assert database.connection.commits == 1
+
+def test_write_behind_backpressure(database):
+    database.enable_write_behind(max_rows=100, flush_interval=60, max_buffered=2)
+    
+    for number in range(3):
+        database.insert('events', user_id=number)
+    
+    metrics = database.write_buffer.stats()
+    
+    assert metrics['buffered'] == 1
+    assert metrics['tables']['events']['backpressure'] == 1
+
+def test_write_behind_drops_only_rejected_rows(database):
+    from citra_framework.components import database as database_module
+    
+    def answer(query, parameters):
+        if None in parameters:
+            raise database_module.mysql.IntegrityError("Column 'user_id' cannot be null")
+        return []
+    
+    database.connection.answer = answer
+    database.enable_write_behind(max_rows=100, flush_interval=60)
+    
+    for number in (1, 2, None, 4):
+        database.insert('events', kind='click', user_id=number)
+    database.flush()
+    
+    written = [parameters for query, parameters in database.connection.statements if None not in parameters]
+    metrics = database.write_buffer.stats()['tables']['events']
+    
+    assert written == [('click', 1), ('click', 2), ('click', 4)]
+    assert metrics['rows'] == 3 and metrics['failed_rows'] == 1
+    assert database.connection.commits == 3
+
+def test_loader_batches_lookups_across_requests(database):
+    database.connection.answer = lambda query, parameters: [
+        {'id': key, 'name': f'user {key}'} for key in parameters if key != 404
+    ]
+    app = Citra()
+    users = database.loader('users')
+    
+    async def show_user(request, user_id):
+        first = await users.load(int(user_id))
+        again = await users.load(int(user_id))
+        return {'user': first, 'same': first is again}
+    
+    app.send('/users/<user_id>', show_user)
+    
+    async def main():
+        paths = ['/users/1', '/users/2', '/users/1', '/users/404']
+        return await asyncio.gather(*(app.router.dispatch(Request('GET', path, {}, b''), app) for path in paths))
+    
+    results = asyncio.run(main())
+    statements = database.connection.statements
+    
+    assert len(statements) == 1
+    assert statements[0] == ('SELECT * FROM users WHERE id IN (%s, %s, %s)', (1, 2, 404))
+    assert [result['user'] and result['user']['name'] for result in results] == ['user 1', 'user 2', 'user 1', None]
+    assert all(result['same'] for result in results)
+    assert users.stats()['memo_hits'] == 4
+    assert users.stats()['round_trips_saved'] == 7
+
+class Post(Model):
+    table = 'posts'
+    fields = ('id', 'user_id', 'title')
+
+class User(Model):
+    table = 'users'
+    fields = ('id', 'name')
+    posts = Relation(Post, foreign_key='user_id')
+
+class Comment(Model):
+    table = 'comments'
+    fields = ('id', 'post_id', 'body')
+    post = Relation(Post, foreign_key='post_id', many=False)
+
+TABLES = {
+    'users': [{'id': 1, 'name': 'Citra'}, {'id': 2, 'name': 'Zest'}],
+    'posts': [{'id': 10, 'user_id': 1, 'title': 'Hello'}, {'id': 11, 'user_id': 1, 'title': 'Again'}],
+    'comments': [{'id': 100, 'post_id': 11, 'body': 'Nice'}]
+}
+
+def answer_tables(query, parameters):
+    table = query.split(' FROM ')[1].split(' ')[0]
+    rows = TABLES[table]
+    if ' IN ' in query:
+        column = query.split(' WHERE ')[1].split(' ')[0]
+        rows = [row for row in rows if row[column] in parameters]
+    return rows
+
+def test_model_loads_relations_in_one_query_each(database):
+    database.connection.answer = answer_tables
+    
+    users = User.select(database, include=('posts',))
+    statements = [query for query, _ in database.connection.statements]
+    
+    assert statements == [
+        'SELECT id, name FROM users',
+        'SELECT id, user_id, title FROM posts WHERE user_id IN (%s, %s)'
+    ]
+    assert [post.title for post in users[0].posts] == ['Hello', 'Again']
+    assert users[1].posts == []
+    assert users[0]['name'] == 'Citra'
+    assert not hasattr(users[0], '__dict__')
+
+def test_model_loads_many_to_one(database):
+    database.connection.answer = answer_tables
+    
+    comment = Comment.select(database, include=('post',))[0]
+    
+    assert comment.post.title == 'Again'
+    assert len(database.connection.statements) == 2
+
+def test_query_result_formats(database):
+    database.connection.answer = lambda query, parameters: [
+        {'day': 1, 'amount': 2.5, 'note': 'a'},
+        {'day': 2, 'amount': 4.0, 'note': None}
+    ]
+    
+    assert database.query('SELECT * FROM sales', format='tuple') == [(1, 2.5, 'a'), (2, 4.0, None)]
+    
+    rows = database.select('sales', format='row')
+    assert rows[1].amount == 4.0 and rows[1][0] == 2
+    assert not hasattr(rows[0], '__dict__')
+    
+    columns = database.select('sales', format='columns')
+    assert columns['day'].typecode == 'q' and list(columns['day']) == [1, 2]
+    assert columns['amount'].typecode == 'd'
+    assert columns['note'] == ['a', None]
+    
+    with pytest.raises(ValueError):
+        database.query('SELECT * FROM sales', format='frame')
+
+def test_query_cache_bounds_rows_and_returns_copies(database):
+    database.connection.answer = lambda query, parameters: [{'id': number, 'name': f'{number:0100d}'} for number in range(50)]
+    
+    rows = database.query('SELECT * FROM users', cache_ttl=60)
+    rows[0]['name'] = 'changed'
+    rows.clear()
+    
+    cached = database.query('SELECT * FROM users', cache_ttl=60)
+    assert len(database.connection.statements) == 1
+    assert len(cached) == 50 and cached[0]['name'] == '0' * 100
+    assert database.query('SELECT * FROM users', cache_ttl=60) is not cached
+    
+    # --- the accounted size covers the row data, not only the list header ---
+    assert database.cache.stats()['bytes'] > 50 * 100
+    
+    assert database.query('SELECT * FROM users', cache_ttl=60, format='row')[1].id == 1
+    assert database.query('SELECT * FROM users', cache_ttl=60, format='row')[1].name == f'{1:0100d}'
+    assert len(database.connection.statements) == 2
+
+def test_statements_from_handler_threads_do_not_interleave(database):
+    active = []
+    overlaps = []
+    
+    def answer(query, parameters):
+        active.append(query)
+        if len(active) > 1:
+            overlaps.append(query)
+        time.sleep(0.001)
+        active.pop()
+        return [{'id': parameters[0]}]
+    
+    database.connection.answer = answer
+    
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        rows = list(pool.map(lambda number: database.query('SELECT * FROM users WHERE id = %s', (number,)), range(40)))
+    
+    assert overlaps == []
+    assert [row[0]['id'] for row in rows] == list(range(40))
+
+def test_query_advisor_explains_do_not_interleave(database):
+    active = []
+    overlaps = []
+    
+    def answer(query, parameters):
+        active.append(query)
+        if len(active) > 1:
+            overlaps.append(query)
+        time.sleep(0.001)
+        active.pop()
+        if query.startswith('EXPLAIN'):
+            return [{'table': 'users', 'type': 'ref', 'rows': 1, 'Extra': None}]
+        return [{'id': parameters[0]}]
+    
+    database.connection.answer = answer
+    database.enable_query_advisor()
+    
+    # --- every statement is new, so each read is followed by an EXPLAIN ---
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda number: database.query(f'SELECT * FROM users_{number} WHERE id = %s', (number,)), range(40)))
+    
+    assert database.advisor.explains == 40
+    assert overlaps == []
+
+def test_reads_go_to_replicas_and_writes_to_primary(monkeypatch):
+    from citra_framework.components import database as database_module
+    
+    connections = {}
+    
+    def connect(host, user, password, database):
+        if host == 'broken-replica':
+            raise database_module.mysql.InterfaceError('replica unreachable')
+        connections[host] = FakeConnection(lambda query, parameters: [{'id': 1, 'host': host}])
+        return connections[host]
+    
+    monkeypatch.setattr(database_module.mysql, 'connect', connect)
+    
+    database = Database(
+        hostname='primary',
+        database='fake_db',
+        replicas=[{'hostname': 'replica-1'}, {'hostname': 'broken-replica'}, {'hostname': 'replica-2'}]
+    )
+    
+    hosts = [database.query('SELECT * FROM users')[0]['host'] for _ in range(4)]
+    assert hosts == ['replica-1', 'replica-2', 'replica-1', 'replica-2']
+    assert database.replicas.stats()['broken-replica:fake_db']['up'] is False
+    
+    database.update('users', where='id=%s', where_values=(1,), name='ana')
+    assert connections['primary'].commits == 1
+    assert database.query('SELECT * FROM users FOR UPDATE')[0]['host'] == 'primary'
+    
+    with database.use_primary():
+        assert database.query('SELECT * FROM users')[0]['host'] == 'primary'
+    
+    # --- a request that wrote reads from the primary inside its window ---
+    token = _current_request.set(Request('GET', '/', {}, b''))
+    try:
+        assert database.query('SELECT * FROM users')[0]['host'].startswith('replica')
+        database.delete('users', where='id=%s', where_values=(2,))
+        assert database.query('SELECT * FROM users')[0]['host'] == 'primary'
+    finally:
+        _current_request.reset(token)
+    
+    assert database.query('SELECT * FROM users')[0]['host'].startswith('replica')
+
+def test_replica_failure_falls_back_to_primary(monkeypatch):
+    from citra_framework.components import database as database_module
+    
+    def connect(host, user, password, database):
+        def answer(query, parameters):
+            if host == 'replica-1':
+                raise database_module.mysql.OperationalError('lost connection')
+            return [{'host': host}]
+        return FakeConnection(answer)
+    
+    monkeypatch.setattr(database_module.mysql, 'connect', connect)
+    
+    database = Database(hostname='primary', replicas=[{'hostname': 'replica-1'}], replica_retry=60)
+    
+    assert database.query('SELECT 1')[0]['host'] == 'primary'
+    assert database.query('SELECT 1')[0]['host'] == 'primary'
+    
+    stats = database.replicas.stats()['replica-1:']
+    assert stats['up'] is False and stats['failures'] == 1
+
+def test_replicas_serve_reads_when_primary_is_down_at_startup(monkeypatch):
+    from citra_framework.components.circuit_breaker import CircuitOpenError
+    from citra_framework.components import database as database_module
+    
+    def connect(host, user, password, database):
+        if host == 'primary':
+            raise database_module.mysql.InterfaceError('primary unreachable')
+        return FakeConnection(lambda query, parameters: [{'host': host}])
+    
+    monkeypatch.setattr(database_module.mysql, 'connect', connect)
+    
+    database = Database(hostname='primary', replicas=[{'hostname': 'replica-1'}])
+    
+    assert database.cursor is None
+    assert database.query('SELECT 1') == [{'host': 'replica-1'}]
+    assert database.select('users') == [{'host': 'replica-1'}]
+    
+    with database.use_primary():
+        assert database.select('users') == []
+    
+    # --- with a breaker the primary reads fail fast instead of returning nothing ---
+    database.enable_circuit_breaker(open_for=60)
+    
+    assert database.select('users') == [{'host': 'replica-1'}]
+    with database.use_primary():
+        with pytest.raises(CircuitOpenError):
+            database.select('users')
+    
+    database.breaker.close()
+
+def test_replica_statement_error_keeps_replica_in_rotation(monkeypatch):
+    from citra_framework.components import database as database_module
+    
+    def connect(host, user, password, database):
+        def answer(query, parameters):
+            if 'missing_table' in query:
+                raise database_module.mysql.ProgrammingError('table does not exist')
+            return [{'host': host}]
+        return FakeConnection(answer)
+    
+    monkeypatch.setattr(database_module.mysql, 'connect', connect)
+    
+    database = Database(hostname='primary', replicas=[{'hostname': 'replica-1'}])
+    
+    assert database.query('SELECT * FROM missing_table') == []
+    assert database.query('SELECT 1')[0]['host'] == 'replica-1'
+    assert database.replicas.stats()['replica-1:']['up'] is True
+
+def test_circuit_breaker_fails_fast_and_recovers(database):
+    from citra_framework.components.circuit_breaker import CircuitOpenError
+    from citra_framework.components import database as database_module
+    
+    down = True
+    
+    def answer(query, parameters):
+        if down:
+            raise database_module.mysql.OperationalError('server has gone away')
+        return [{'id': 1}]
+    
+    database.connection.answer = answer
+    database.connection.ping = lambda **options: None
+    database.enable_circuit_breaker(min_calls=3, failure_rate=0.5, open_for=0.05, half_open_calls=1)
+    
+    for _ in range(3):
+        assert database.query('SELECT * FROM users') == []
+    
+    statements = len(database.connection.statements)
+    with pytest.raises(CircuitOpenError):
+        database.query('SELECT * FROM users')
+    with pytest.raises(CircuitOpenError):
+        database.insert('users', name='ana')
+    assert len(database.connection.statements) == statements
+    
+    # --- the background probe keeps failing while the server is down ---
+    time.sleep(0.12)
+    assert database.breaker.stats()['state'] == 'open'
+    
+    down = False
+    deadline = time.monotonic() + 2
+    while database.breaker.state == 'open' and time.monotonic() < deadline:
+        time.sleep(0.01)
+    
+    assert database.query('SELECT * FROM users') == [{'id': 1}]
+    assert database.breaker.stats()['state'] == 'closed'
+    database.breaker.close()
+
+def test_statement_errors_do_not_open_the_circuit(database):
+    from citra_framework.components import database as database_module
+    
+    def answer(query, parameters):
+        raise database_module.mysql.IntegrityError('duplicate entry')
+    
+    database.connection.answer = answer
+    database.enable_circuit_breaker(min_calls=3, failure_rate=0.5)
+    
+    for _ in range(10):
+        assert database.execute('INSERT INTO users (id) VALUES (%s)', (1,)) is None
+    
+    assert database.breaker.stats()['state'] == 'closed'
+    database.breaker.close()
+
+def test_expired_deadline_does_not_hold_a_half_open_trial(database):
+    from citra_framework.components.circuit_breaker import CircuitOpenError
+    from citra_framework.components import database as database_module
+    from citra_framework.components import deadline
+    
+    down = True
+    
+    def answer(query, parameters):
+        if down:
+            raise database_module.mysql.OperationalError('server has gone away')
+        if 'crash' in query:
+            raise RuntimeError('driver bug')
+        return [{'id': 1}]
+    
+    database.connection.answer = answer
+    database.connection.ping = lambda **options: None
+    database.enable_circuit_breaker(min_calls=1, open_for=0.05, half_open_calls=1)
+    
+    assert database.execute('UPDATE users SET name = %s', ('ana',)) is None
+    
+    down = False
+    limit = time.monotonic() + 2
+    while database.breaker.state == 'open' and time.monotonic() < limit:
+        time.sleep(0.01)
+    assert database.breaker.state == 'half_open'
+    
+    token = deadline.start(0)
+    try:
+        for _ in range(3):
+            with pytest.raises(deadline.DeadlineExceeded):
+                database.execute('UPDATE users SET name = %s', ('ana',))
+    finally:
+        deadline.reset(token)
+    
+    # --- a trial that ends without an answer gives its slot back ---
+    with pytest.raises(RuntimeError):
+        database.query('SELECT * FROM crash')
+    
+    assert database.query('SELECT * FROM users') == [{'id': 1}]
+    assert database.breaker.state == 'closed'
+    database.breaker.close()
+
+def test_unanswered_half_open_trials_expire():
+    from citra_framework.components.circuit_breaker import CircuitBreaker, CircuitOpenError
+    
+    breaker = CircuitBreaker(min_calls=1, open_for=0.05, half_open_calls=1)
+    breaker.failure()
+    time.sleep(0.06)
+    
+    # --- the admitted trial never reports back ---
+    breaker.before()
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+    
+    time.sleep(0.06)
+    breaker.before()
+    breaker.success()
+    assert breaker.state == 'closed'
+
+def test_open_circuit_answers_503():
+    from citra_framework.components.circuit_breaker import CircuitOpenError
+    
+    app = Citra()
+    
+    async def users(request):
+        raise CircuitOpenError('mysql:db', 2.5)
+    
+    app.send('/users', users)
+    response = asyncio.run(app.router.dispatch(Request('GET', '/users', {}, b''), app))
+    
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '3'
+
+def test_query_advisor_explains_each_statement_once(database):
+    from citra_framework.components.query_advisor import normalize
+    
+    def answer(query, parameters):
+        if query.startswith('EXPLAIN'):
+            if 'ORDER BY' in query:
+                return [{'table': 'users', 'type': 'ALL', 'rows': 5000, 'Extra': 'Using where; Using filesort'}]
+            return [{'table': 'users', 'type': 'const', 'rows': 1, 'Extra': None}]
+        return [{'id': 1}]
+    
+    database.connection.answer = answer
+    database.enable_query_advisor()
+    
+    for age in (18, 30, 40):
+        database.query(f'SELECT * FROM users WHERE country = %s AND age > {age} ORDER BY created_at DESC', ('pt',))
+    database.select('users', where='id=%s', where_values=(1,))
+    
+    explains = [query for query, _ in database.connection.statements if query.startswith('EXPLAIN')]
+    assert len(explains) == 2
+    
+    worst = database.advisor.report(limit=1, flagged_only=True)[0]
+    assert worst['statement'] == normalize('SELECT * FROM users WHERE country = %s AND age > 1 ORDER BY created_at DESC')
+    assert worst['count'] == 3
+    assert worst['flags'] == ['full scan on users (5000 rows)', 'filesort on users']
+    assert worst['suggestion'] == 'CREATE INDEX idx_users_country_created_at_age ON users (country, created_at, age)'
+    
+    assert normalize("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'ana'") == 'SELECT * FROM t WHERE id IN (?) AND name = ?'
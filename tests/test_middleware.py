@@ -0,0 +1,315 @@
+'''
+Test for middlewares of `Citra` framework.
+
+Test Development:
+    PYTHONPATH=$(pwd) pytest -v tests/test_middleware.py
+'''
+
+from citra_framework.core import Citra
+from citra_framework.components.requests import Request
+from citra_framework.components.response import Response
+from citra_framework.components.middlewares.single_flight_middleware import SingleFlightMiddleware
+from citra_framework.components.middlewares.rate_limit_middleware import RateLimitMiddleware
+from citra_framework.components.middlewares.session_middleware import SessionMiddleware
+from citra_framework.components.middlewares.auth_middleware import AuthenticationMiddleware, InvalidTokenError, protected_route
+from citra_framework.components.sessions import MemorySessionStore
+import asyncio
+import pytest
+import time
+
+def make_request(method, path, headers=None):
+    return Request(method, path, headers or {}, b'')
+
+def test_single_flight_coalesces_concurrent_requests():
+    app = Citra()
+    flight = SingleFlightMiddleware()
+    app.middleware.add(flight)
+    calls = []
+    
+    async def list_users(request):
+        calls.append(request)
+        await asyncio.sleep(0.05)
+        return Response('users')
+    
+    app.send('/users', list_users, single_flight=True)
+    
+    async def main():
+        requests = [make_request('GET', '/users') for _ in range(20)]
+        return await asyncio.gather(*(app.router.dispatch(request, app) for request in requests))
+    
+    responses = asyncio.run(main())
+    
+    assert len(calls) == 1
+    assert all(response.body == 'users' for response in responses)
+    assert len({id(response) for response in responses}) == 20
+    assert flight.stats()['coalesced'] == 19
+
+def test_single_flight_follower_timeout_runs_handler():
+    app = Citra()
+    flight = SingleFlightMiddleware(timeout=0.01)
+    app.middleware.add(flight)
+    calls = []
+    
+    async def report(request):
+        calls.append(request)
+        await asyncio.sleep(0.05)
+        return Response('report')
+    
+    app.send('/report', report, single_flight=True)
+    
+    async def main():
+        return await asyncio.gather(*(app.router.dispatch(make_request('GET', '/report'), app) for _ in range(2)))
+    
+    asyncio.run(main())
+    
+    assert len(calls) == 2
+    assert flight.timeouts == 1
+
+def test_rate_limit_rejects_with_retry_after():
+    app = Citra()
+    limiter = RateLimitMiddleware(rate=1, burst=2)
+    app.middleware.add(limiter)
+    
+    async def home(request):
+        return Response('home')
+    
+    async def health(request):
+        return Response('ok')
+    
+    app.send('/', home)
+    app.send('/health', health, rate_limit=False)
+    
+    def call(path, client):
+        request = make_request('GET', path)
+        request.client = client
+        return asyncio.run(app.router.dispatch(request, app))
+    
+    statuses = [call('/', '10.0.0.1').status_code for _ in range(3)]
+    rejected = call('/', '10.0.0.1')
+    
+    assert statuses == [200, 200, 429]
+    assert rejected.headers['Retry-After'] == '1'
+    assert call('/', '10.0.0.2').status_code == 200
+    assert call('/health', '10.0.0.1').status_code == 200
+
+def test_route_rejection_does_not_spend_global_tokens():
+    app = Citra()
+    limiter = RateLimitMiddleware(rate=0.001, burst=3)
+    app.middleware.add(limiter)
+    
+    async def home(request):
+        return Response('home')
+    
+    app.send('/login', home, rate_limit=(0.001, 1))
+    app.send('/', home)
+    
+    def call(path):
+        request = make_request('GET', path)
+        request.client = '10.0.0.1'
+        return asyncio.run(app.router.dispatch(request, app)).status_code
+    
+    assert [call('/login') for _ in range(5)] == [200, 429, 429, 429, 429]
+    assert [call('/') for _ in range(3)] == [200, 200, 429]
+
+def test_rate_limit_covers_unknown_paths_and_runs_before_the_bulkhead():
+    app = Citra()
+    limiter = RateLimitMiddleware(rate=0.001, burst=1)
+    app.middleware.add(limiter)
+    
+    async def slow(request):
+        await asyncio.sleep(0.2)
+        return Response('slow')
+    
+    app.send('/slow', slow, max_concurrency=1, queue_timeout=1)
+    
+    def request_from(path, client):
+        request = make_request('GET', path)
+        request.client = client
+        return request
+    
+    # --- unknown paths spend the same global tokens ---
+    statuses = [asyncio.run(app.router.dispatch(request_from('/missing', '10.0.0.1'), app)).status_code for _ in range(3)]
+    assert statuses == [404, 429, 429]
+    
+    # --- a limited client is turned away at once instead of waiting for the bulkhead slot ---
+    async def main():
+        running = asyncio.create_task(app.router.dispatch(request_from('/slow', '10.0.0.2'), app))
+        await asyncio.sleep(0.01)
+        
+        started = time.monotonic()
+        limited = await app.router.dispatch(request_from('/slow', '10.0.0.2'), app)
+        waited = time.monotonic() - started
+        
+        return limited.status_code, waited, (await running).status_code
+    
+    status, waited, first = asyncio.run(main())
+    
+    assert status == 429 and first == 200
+    assert waited < 0.1
+
+def test_rate_limit_memory_is_bounded():
+    app = Citra()
+    limiter = RateLimitMiddleware(rate=5, key_func=lambda request: request.headers['x-key'], max_keys=100)
+    app.middleware.add(limiter)
+    
+    async def home(request):
+        return Response('home')
+    
+    app.send('/', home, rate_limit=(1, 1))
+    
+    async def main():
+        for number in range(1000):
+            await app.router.dispatch(make_request('GET', '/', {'x-key': str(number)}), app)
+    
+    asyncio.run(main())
+    
+    assert limiter.stats()['keys'] == 100
+
+def cookie_of(response):
+    return response.cookies[-1].split(';', 1)[0].split('=', 1)[1]
+
+def test_session_cookie_is_signed_and_only_sent_when_modified():
+    app = Citra()
+    app.middleware.add(SessionMiddleware(secret='test-secret'))
+    
+    async def login(request):
+        request.session['user_id'] = 7
+        return Response('ok')
+    
+    async def profile(request):
+        return Response(str(request.session.get('user_id')))
+    
+    async def ping(request):
+        return Response('pong')
+    
+    app.send('/login', login)
+    app.send('/profile', profile)
+    app.send('/ping', ping)
+    
+    def call(path, cookie=None):
+        headers = {'cookie': f'citra_session={cookie}'} if cookie else {}
+        return asyncio.run(app.router.dispatch(make_request('GET', path, headers), app))
+    
+    cookie = cookie_of(call('/login'))
+    response = call('/profile', cookie)
+    
+    assert response.body == '7'
+    assert response.cookies == []
+    assert call('/ping').cookies == []
+    
+    tampered = cookie[:-2] + ('AA' if not cookie.endswith('AA') else 'BB')
+    assert call('/profile', tampered).body == 'None'
+
+def test_flash_messages_are_kept_per_session():
+    app = Citra()
+    app.middleware.add(SessionMiddleware(secret='test-secret', store=MemorySessionStore(max_sessions=10)))
+    
+    async def save(request):
+        app.templates.message(f'saved by {request.query["user"]}', 'success')
+        return Response('ok')
+    
+    async def flashes(request):
+        return Response([flash['message'] for flash in app.templates.get_flashed_message()])
+    
+    app.send('/save', save)
+    app.send('/flashes', flashes)
+    
+    def call(path, cookie=None):
+        headers = {'cookie': f'citra_session={cookie}'} if cookie else {}
+        return asyncio.run(app.router.dispatch(make_request('GET', path, headers), app))
+    
+    ana = cookie_of(call('/save?user=ana'))
+    ben = cookie_of(call('/save?user=ben'))
+    
+    assert call('/flashes', ana).body == ['saved by ana']
+    assert call('/flashes', ben).body == ['saved by ben']
+    assert call('/flashes', ana).body == []
+    assert app.templates._flashes == []
+
+def test_authentication_protects_routes_and_caches_verified_tokens():
+    app = Citra()
+    auth = AuthenticationMiddleware(secret='test-secret')
+    app.middleware.add(auth)
+    
+    @protected_route
+    async def profile(request):
+        return Response(request.user['sub'])
+    
+    @protected_route
+    def settings(request):
+        return Response('settings')
+    
+    async def home(request):
+        return Response(request.user['sub'] if request.user else 'guest')
+    
+    app.send('/profile', profile)
+    app.send('/settings', settings)
+    app.send('/', home)
+    
+    def call(path, token=None):
+        headers = {'authorization': f'Bearer {token}'} if token else {}
+        return asyncio.run(app.router.dispatch(make_request('GET', path, headers), app))
+    
+    token = auth.issue({'sub': 'ana'}, expires_in=60)
+    forged = AuthenticationMiddleware(secret='other-secret').issue({'sub': 'ana'}, expires_in=60)
+    expired = auth.issue({'sub': 'ana', 'exp': 1})
+    
+    assert call('/profile').status_code == 401
+    assert call('/profile').headers['WWW-Authenticate'] == 'Bearer'
+    assert call('/profile', forged).status_code == 401
+    assert call('/profile', expired).headers['WWW-Authenticate'] == 'Bearer error="invalid_token"'
+    assert call('/settings').status_code == 401
+    assert call('/').body == 'guest'
+    
+    assert [call('/profile', token).body for _ in range(3)] == ['ana'] * 3
+    assert call('/settings', token).status_code == 200
+    assert call('/', token).body == 'ana'
+    assert auth.stats()['hits'] == 4
+    assert auth.stats()['cached'] == 1
+
+def test_authentication_cache_is_bounded_and_rejects_none_algorithm():
+    auth = AuthenticationMiddleware(secret='test-secret', cache_size=10)
+    
+    for number in range(50):
+        auth.verify(auth.issue({'sub': number}, expires_in=60))
+    
+    assert auth.stats()['cached'] == 10
+    
+    _, payload, _ = auth.issue({'sub': 'ana'}).split('.')
+    unsigned = 'eyJhbGciOiJub25lIn0.' + payload + '.'
+    
+    with pytest.raises(InvalidTokenError):
+        auth.verify(unsigned)
+
+def test_session_cookie_is_sent_next_to_handler_cookies():
+    app = Citra()
+    store = MemorySessionStore()
+    app.middleware.add(SessionMiddleware(secret='test-secret', store=store))
+    
+    async def login(request):
+        request.session['user_id'] = 7
+        response = Response('ok')
+        response.set_cookie('theme', 'dark')
+        response.set_cookie('lang', 'pt', max_age=3600)
+        return response
+    
+    async def flash(request):
+        request.session.flash('saved')
+        return Response('ok')
+    
+    app.send('/login', login)
+    app.send('/flash', flash)
+    
+    response = asyncio.run(app.router.dispatch(make_request('GET', '/login'), app))
+    head = response.build().split(b'\r\n\r\n', 1)[0]
+    
+    assert head.count(b'Set-Cookie: ') == 3
+    assert b'Set-Cookie: theme=dark; Path=/; HttpOnly; SameSite=Lax' in head
+    assert b'Set-Cookie: citra_session=' in head
+    
+    # --- a request changing its session does not touch the stored copy before it is saved ---
+    cookie = cookie_of(response)
+    loaded = store.load(cookie)
+    loaded.setdefault('_flashes', []).append({'message': 'unsaved'})
+    assert '_flashes' not in store.load(cookie)
+
@@ -0,0 +1,113 @@
+'''
+Test for router component of `Citra` framework.
+
+Test Development:
+    PYTHONPATH=$(pwd) pytest -v tests/test_router.py
+'''
+
+from citra_framework.core import Citra
+from citra_framework.components.requests import Request
+from citra_framework.components.response import Response
+from citra_framework.components import deadline
+import asyncio
+import os
+import threading
+
+def make_request(method, path):
+    return Request(method, path, {}, b'')
+
+async def slow(request):
+    await asyncio.sleep(0.05)
+    return Response('slow')
+
+def render_report(request):
+    return Response(str(os.getpid()))
+
+def dispatch_many(app, path, count):
+    async def main():
+        return await asyncio.gather(*(app.router.dispatch(make_request('GET', path), app) for _ in range(count)))
+    
+    return [response.status_code for response in asyncio.run(main())]
+
+def test_route_match_ignores_query_string():
+    app = Citra()
+    app.send('/slow', slow)
+    
+    assert dispatch_many(app, '/slow?page=2', 1) == [200]
+
+def test_bulkhead_queues_within_timeout():
+    app = Citra()
+    app.send('/slow', slow, max_concurrency=1, queue_timeout=1)
+    
+    assert dispatch_many(app, '/slow', 3) == [200, 200, 200]
+    
+    stats = app.router.bulkhead_stats()['slow']
+    assert stats['max_queue_depth'] == 2
+    assert stats['max_wait'] > 0
+
+def test_bulkhead_rejects_after_queue_timeout():
+    app = Citra()
+    app.send('/slow', slow, max_concurrency=1, queue_timeout=0.01)
+    
+    statuses = dispatch_many(app, '/slow', 3)
+    
+    assert sorted(statuses) == [200, 503, 503]
+    assert app.router.bulkhead_stats()['slow']['timed_out'] == 2
+
+def test_bulkhead_rejects_when_queue_is_full():
+    app = Citra()
+    app.send('/slow', slow, max_concurrency=1, max_queue=1)
+    
+    assert sorted(dispatch_many(app, '/slow', 3)) == [200, 200, 503]
+
+def test_deadline_cancels_handler_with_504():
+    app = Citra(request_timeout=5)
+    finished = []
+    budgets = []
+    
+    async def hanging(request):
+        budgets.append(deadline.remaining())
+        await asyncio.sleep(1)
+        finished.append(True)
+        return Response('done')
+    
+    app.send('/hanging', hanging, timeout=0.02)
+    
+    assert dispatch_many(app, '/hanging', 1) == [504]
+    assert finished == []
+    assert 0 < budgets[0] <= 0.02
+    assert deadline.remaining() is None
+
+def test_global_deadline_applies_to_routes():
+    app = Citra(request_timeout=0.01)
+    app.send('/slow', slow)
+    
+    assert dispatch_many(app, '/slow', 1) == [504]
+
+def test_sync_handler_runs_on_thread_pool():
+    app = Citra()
+    seen = {}
+    
+    def blocking(request, user_id):
+        seen['thread'] = threading.current_thread().name
+        seen['budget'] = deadline.remaining()
+        return Response(f'user {user_id}')
+    
+    app.send('/users/<user_id>', blocking, timeout=1)
+    
+    response = asyncio.run(app.router.dispatch(make_request('GET', '/users/7'), app))
+    app.router.close()
+    
+    assert response.body == 'user 7'
+    assert seen['thread'].startswith('citra-handler')
+    assert seen['budget'] > 0
+    assert app.router.url_route('blocking', user_id=7) == '/users/7'
+
+def test_sync_handler_runs_on_process_pool():
+    app = Citra()
+    app.send('/report', render_report, executor='process')
+    
+    response = asyncio.run(app.router.dispatch(make_request('GET', '/report'), app))
+    app.router.close()
+    
+    assert response.body != str(os.getpid())
@@ -0,0 +1,666 @@
+'''
+Test for server component of `Citra` framework.
+
+Test Development:
+    PYTHONPATH=$(pwd) pytest -v tests/test_server.py
+'''
+
+from citra_framework.core import Citra
+from citra_framework.components.server import Server
+from citra_framework.components.response import Response, StreamingResponse
+from citra_framework.components.limiter import AdaptiveLimiter
+from citra_framework.components.multipart import MultipartParser
+from citra_framework.components.sse import EventChannel
+from citra_framework.components import websocket
+import asyncio
+import base64
+import json
+import os
+import pytest
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import time
+
+async def home(request):
+    return Response('home')
+
+async def slow(request):
+    await asyncio.sleep(0.1)
+    return Response('slow')
+
+def run_server(test, **limits):
+    
+    '''
+    Run `test(port, server)` against a server bound to an ephemeral port.
+    '''
+    
+    app = Citra()
+    app.send('/', home)
+    app.send('/slow', slow)
+    app.audit = []
+    
+    async def audited(request):
+        app.background.after(request, app.audit.append, args=(request.path,))
+        return Response('audited')
+    
+    app.send('/audited', audited)
+    server = Server(app, **limits)
+    
+    async def main():
+        listener = socket.create_server(('127.0.0.1', 0))
+        listener.setblocking(False)
+        task = asyncio.create_task(server.accept(listener))
+        
+        try:
+            return await test(listener.getsockname()[1], server)
+        finally:
+            task.cancel()
+            listener.close()
+    
+    return asyncio.run(main())
+
+async def fetch(reader, writer, request=b'GET / HTTP/1.1\r\nHost: test\r\n\r\n'):
+    writer.write(request)
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    length = int(head.split(b'Content-Length: ')[1].split(b'\r\n')[0])
+    return head + await reader.readexactly(length)
+
+def test_keep_alive_serves_multiple_requests():
+    async def test(port, server):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        first = await fetch(reader, writer)
+        second = await fetch(reader, writer)
+        writer.close()
+        return first, second
+    
+    first, second = run_server(test)
+    
+    assert first.startswith(b'HTTP/1.1 200 OK') and first.endswith(b'home')
+    assert b'Connection: keep-alive' in second
+
+def test_max_requests_per_connection_closes():
+    async def test(port, server):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        await fetch(reader, writer)
+        response = await fetch(reader, writer)
+        return response, await reader.read()
+    
+    response, rest = run_server(test, max_requests_per_connection=2)
+    
+    assert b'Connection: close' in response
+    assert rest == b''
+
+def test_idle_keep_alive_connection_is_closed():
+    async def test(port, server):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        await fetch(reader, writer)
+        return await asyncio.wait_for(reader.read(), 1)
+    
+    assert run_server(test, keep_alive_timeout=0.05) == b''
+
+def test_slow_header_gets_408():
+    async def test(port, server):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'GET / HTTP/1.1\r\n')
+        await writer.drain()
+        return await asyncio.wait_for(reader.read(), 1), server.timeouts
+    
+    response, timeouts = run_server(test, header_timeout=0.05)
+    
+    assert response.startswith(b'HTTP/1.1 408')
+    assert timeouts == 1
+
+def test_max_connections_applies_backpressure():
+    async def test(port, server):
+        first = await asyncio.open_connection('127.0.0.1', port)
+        await fetch(*first)
+        
+        second = await asyncio.open_connection('127.0.0.1', port)
+        second[1].write(b'GET / HTTP/1.1\r\n\r\n')
+        
+        try:
+            await asyncio.wait_for(second[0].read(1), 0.1)
+            waited = False
+        except asyncio.TimeoutError:
+            waited = True
+        
+        open_connections = server.stats()['open_connections']
+        first[1].close()
+        response = await asyncio.wait_for(second[0].readuntil(b'\r\n\r\n'), 1)
+        return waited, open_connections, response
+    
+    waited, open_connections, response = run_server(test, max_connections=1)
+    
+    assert waited
+    assert open_connections == 1
+    assert response.startswith(b'HTTP/1.1 200')
+
+def test_limiter_adapts_limit():
+    limiter = AdaptiveLimiter(initial_limit=10, min_limit=2, target_latency=0.01)
+    
+    assert limiter.try_acquire()
+    limiter.release(1.0)
+    assert limiter.limit == 9
+    
+    for _ in range(9):
+        limiter.try_acquire()
+    for _ in range(9):
+        limiter.release(0.001)
+    
+    assert limiter.limit > 9
+
+def test_limiter_sheds_excess_requests():
+    limiter = AdaptiveLimiter(initial_limit=1, min_limit=1)
+    
+    async def test(port, server):
+        clients = [await asyncio.open_connection('127.0.0.1', port) for _ in range(2)]
+        responses = await asyncio.gather(*(
+            fetch(reader, writer, b'GET /slow HTTP/1.1\r\n\r\n') for reader, writer in clients
+        ))
+        shed = next(response for response in responses if response.startswith(b'HTTP/1.1 503'))
+        assert b'Connection: close' in shed
+        assert server.stats()['shed'] == 1
+        return sorted(response.split(b'\r\n')[0] for response in responses)
+    
+    statuses = run_server(test, limiter=limiter)
+    
+    assert statuses == [b'HTTP/1.1 200 OK', b'HTTP/1.1 503 Service Unavailable']
+    assert limiter.stats()['rejected'] == 1
+
+def test_limiter_sheds_before_reading_the_body():
+    limiter = AdaptiveLimiter(initial_limit=1, min_limit=1)
+    
+    async def test(port, server):
+        busy = await asyncio.open_connection('127.0.0.1', port)
+        busy[1].write(b'GET /slow HTTP/1.1\r\n\r\n')
+        await busy[1].drain()
+        await asyncio.sleep(0.02)
+        
+        # --- only the head is sent, the 503 comes back without the body ever being read ---
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'POST /upload HTTP/1.1\r\nContent-Type: multipart/form-data; boundary=x\r\nContent-Length: 1000000\r\n\r\n')
+        await writer.drain()
+        shed = await asyncio.wait_for(reader.read(), 1)
+        assert shed.startswith(b'HTTP/1.1 503')
+        
+        assert (await asyncio.wait_for(busy[0].readuntil(b'slow'), 1)).startswith(b'HTTP/1.1 200')
+        busy[1].close()
+        
+        # --- a client leaving in the middle of its body gives the slot back ---
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'POST / HTTP/1.1\r\nContent-Length: 100\r\n\r\npartial')
+        await writer.drain()
+        await asyncio.sleep(0.02)
+        writer.close()
+        await asyncio.sleep(0.02)
+        
+        return limiter.stats()['in_flight'], server.stats()['shed']
+    
+    assert run_server(test, limiter=limiter) == (0, 1)
+
+def test_background_task_runs_after_response():
+    async def test(port, server):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        response = await fetch(reader, writer, b'GET /audited HTTP/1.1\r\n\r\n')
+        await server.app.background.drain()
+        return response, server.app.audit
+    
+    response, audit = run_server(test)
+    
+    assert response.endswith(b'audited')
+    assert audit == ['/audited']
+
+def test_invalid_content_length_is_rejected():
+    async def test(port, server):
+        for value in (b'abc', b'-5', b'+5', b'1 2'):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            response = await fetch(reader, writer, b'POST / HTTP/1.1\r\nHost: test\r\nContent-Length: ' + value + b'\r\n\r\n')
+            assert response.startswith(b'HTTP/1.1 400'), value
+            writer.close()
+        
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        response = await fetch(reader, writer, b'POST / HTTP/1.1\r\nHost: test\r\nContent-Length: 2\r\nContent-Length: 5\r\n\r\nab')
+        assert response.startswith(b'HTTP/1.1 400')
+        writer.close()
+    
+    run_server(test)
+
+def test_listen_on_ipv6_host():
+    if not socket.has_ipv6:
+        pytest.skip('no IPv6 support')
+    
+    server = Server(Citra(), host='::1', port=0)
+    
+    try:
+        listener = server.listen()
+    except OSError:
+        pytest.skip('no IPv6 loopback')
+    
+    with listener:
+        assert listener.family == socket.AF_INET6
+        assert server.address(listener).startswith('http://[::1]:')
+
+def test_streaming_response_is_sent_chunked():
+    async def body():
+        for number in range(3):
+            await asyncio.sleep(0)
+            yield f'line {number}\n'
+    
+    async def test(port, server):
+        server.app.send('/stream', lambda request: StreamingResponse(body()))
+        server.app.send('/sized', lambda request: StreamingResponse([b'ab', b'cd'], content_length=4))
+        server.app.send('/json', lambda request: StreamingResponse.Json(list(range(5000)), chunk_size=1024))
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        
+        writer.write(b'GET /stream HTTP/1.1\r\nHost: test\r\n\r\n')
+        head = await reader.readuntil(b'\r\n\r\n')
+        assert b'Transfer-Encoding: chunked' in head
+        assert await reader.readuntil(b'0\r\n\r\n') == b'7\r\nline 0\n\r\n7\r\nline 1\n\r\n7\r\nline 2\n\r\n0\r\n\r\n'
+        
+        # --- same keep-alive connection, known length ---
+        assert (await fetch(reader, writer, b'GET /sized HTTP/1.1\r\nHost: test\r\n\r\n')).endswith(b'\r\n\r\nabcd')
+        
+        writer.write(b'GET /json HTTP/1.1\r\nHost: test\r\n\r\n')
+        await reader.readuntil(b'\r\n\r\n')
+        chunks = []
+        while True:
+            size = int(await reader.readuntil(b'\r\n'), 16)
+            chunk = await reader.readexactly(size + 2)
+            if not size:
+                break
+            chunks.append(chunk[:-2])
+        
+        writer.close()
+        assert len(chunks) > 1
+        assert json.loads(b''.join(chunks)) == list(range(5000))
+    
+    run_server(test)
+
+def test_multipart_upload_is_streamed_to_spooled_files():
+    boundary = 'citra-boundary'
+    payload = bytes(range(256)) * 400
+    body = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="title"\r\n\r\nholiday\r\n'
+        f'--{boundary}\r\nContent-Disposition: form-data; name="photo"; filename="beach.bin"\r\n'
+        'Content-Type: application/octet-stream\r\n\r\n'
+    ).encode() + payload + f'\r\n--{boundary}--\r\n'.encode()
+    
+    # --- any chunking of the body gives the same parts ---
+    for size in (1, 7, 4096):
+        parser = MultipartParser(boundary, spool_size=1024)
+        for start in range(0, len(body), size):
+            parser.feed(body[start:start + size])
+        parser.finish()
+        
+        assert parser.form == {'title': 'holiday'}
+        photo = parser.files['photo']
+        assert photo.size == len(payload) and not photo.in_memory
+        assert photo.file.read() == payload
+        parser.close()
+    
+    def upload_head(path, length):
+        return (
+            f'POST {path} HTTP/1.1\r\nHost: test\r\n'
+            f'Content-Type: multipart/form-data; boundary={boundary}\r\n'
+            f'Content-Length: {length}\r\n\r\n'
+        ).encode()
+    
+    async def upload(request):
+        photo = request.files['photo']
+        data = await photo.read()
+        return Response(f'{request.form["title"]} {photo.filename} {len(data)} {data == payload}')
+    
+    async def test(port, server):
+        server.app.send('/upload', upload, method='POST')
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        
+        response = await fetch(reader, writer, upload_head('/upload', len(body)) + body)
+        assert response.endswith(f'holiday beach.bin {len(payload)} True'.encode())
+        
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        response = await fetch(reader, writer, upload_head('/upload', len(body) + 10) + body.replace(b'--\r\n', b'\r\nbroken!!!!\r\n'))
+        assert response.startswith(b'HTTP/1.1 400')
+        writer.close()
+        
+        # --- a failing handler still releases the spooled files ---
+        server.app.send('/upload-fails', failing_upload, method='POST')
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        response = await fetch(reader, writer, upload_head('/upload-fails', len(body)) + body)
+        assert response.startswith(b'HTTP/1.1 500')
+        assert kept and kept[0].file.closed
+    
+    kept = []
+    
+    async def failing_upload(request):
+        kept.append(request.files['photo'])
+        raise RuntimeError('storage offline')
+    
+    run_server(test, upload_spool_size=1024, max_body_size=1024)
+    
+    async def too_large_part(port, server):
+        server.app.send('/upload', upload, method='POST')
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        assert (await fetch(reader, writer, upload_head('/upload', len(body)) + body)).startswith(b'HTTP/1.1 413')
+    
+    run_server(too_large_part, max_part_size=1024)
+
+def test_websocket_broadcast_aborts_slow_consumers_without_waiting():
+    class Transport:
+        def __init__(self, buffered):
+            self.buffered = buffered
+            self.aborted = False
+        
+        def get_write_buffer_size(self):
+            return self.buffered
+        
+        def abort(self):
+            self.aborted = True
+    
+    class StuckWriter:
+        def __init__(self, buffered):
+            self.transport = Transport(buffered)
+            self.written = []
+        
+        def write(self, data):
+            self.written.append(data)
+        
+        async def drain(self):
+            await asyncio.sleep(3600)
+    
+    async def main():
+        slow = websocket.WebSocket(None, StuckWriter(10 * 1024 * 1024), None, close_timeout=0.05)
+        fast = websocket.WebSocket(None, StuckWriter(0), None, close_timeout=0.05)
+        
+        started = time.monotonic()
+        assert await websocket.broadcast([slow, fast], 'tick') == 1
+        assert await websocket.broadcast([fast], 'tock', timeout=0.05) == 1
+        
+        # --- a close frame that never drains aborts the peer instead of hanging ---
+        await fast.close()
+        assert time.monotonic() - started < 1
+        
+        assert slow.closed and slow.writer.transport.aborted and slow.writer.written == []
+        assert fast.writer.transport.aborted and len(fast.writer.written) == 3
+    
+    asyncio.run(main())
+
+def test_websocket_echo_fragments_ping_and_broadcast():
+    clients = set()
+    
+    async def echo(ws):
+        clients.add(ws)
+        try:
+            async for message in ws:
+                await ws.send(message)
+        finally:
+            clients.discard(ws)
+    
+    async def once(ws):
+        await ws.send('bye')
+    
+    def frame(opcode, payload, fin=True):
+        mask = os.urandom(4)
+        head = bytes([(0x80 if fin else 0) | opcode])
+        head += bytes([0x80 | len(payload)]) if len(payload) < 126 else bytes([0x80 | 126]) + struct.pack('!H', len(payload))
+        return head + mask + websocket.unmask(payload, mask)
+    
+    async def read_frame(reader):
+        first, second = await reader.readexactly(2)
+        length = second & 0x7F
+        if length == 126:
+            length, = struct.unpack('!H', await reader.readexactly(2))
+        return first & 0x0F, await reader.readexactly(length)
+    
+    async def connect(port, path='/echo'):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        key = base64.b64encode(os.urandom(16)).decode()
+        writer.write((
+            f'GET {path} HTTP/1.1\r\nHost: test\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+            f'Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n'
+        ).encode())
+        head = await reader.readuntil(b'\r\n\r\n')
+        return reader, writer, key, head
+    
+    async def test(port, server):
+        server.app.websocket('/echo', echo, max_message_size=1024)
+        reader, writer, key, head = await connect(port)
+        assert head.startswith(b'HTTP/1.1 101')
+        assert f'Sec-WebSocket-Accept: {websocket.accept_key(key)}'.encode() in head
+        
+        writer.write(frame(websocket.TEXT, 'hello'.encode()))
+        assert await read_frame(reader) == (websocket.TEXT, b'hello')
+        
+        # --- a ping between two fragments is answered, the message is reassembled ---
+        writer.write(frame(websocket.BINARY, b'ab', fin=False) + frame(websocket.PING, b'hb') + frame(websocket.CONTINUATION, b'cd'))
+        assert await read_frame(reader) == (websocket.PONG, b'hb')
+        assert await read_frame(reader) == (websocket.BINARY, b'abcd')
+        
+        second = await connect(port)
+        await asyncio.sleep(0.05)
+        assert await websocket.broadcast(clients, {'orders': 3}) == 2
+        assert await read_frame(reader) == (websocket.TEXT, b'{"orders": 3}')
+        assert await read_frame(second[0]) == (websocket.TEXT, b'{"orders": 3}')
+        
+        writer.write(frame(websocket.TEXT, b'x' * 2000))
+        opcode, payload = await read_frame(reader)
+        assert opcode == websocket.CLOSE and struct.unpack('!H', payload[:2])[0] == websocket.MESSAGE_TOO_BIG
+        
+        second[1].write(frame(websocket.CLOSE, struct.pack('!H', 1000)))
+        assert (await read_frame(second[0]))[0] == websocket.CLOSE
+        
+        # --- reserved codes are never echoed back ---
+        third = await connect(port)
+        third[1].write(frame(websocket.CLOSE, struct.pack('!H', 1005)))
+        opcode, payload = await read_frame(third[0])
+        assert opcode == websocket.CLOSE and struct.unpack('!H', payload[:2])[0] == websocket.PROTOCOL_ERROR
+        
+        # --- a handler that returns closes with 1000, not 1001 ---
+        server.app.websocket('/once', once)
+        reader, writer, key, head = await connect(port, '/once')
+        assert await read_frame(reader) == (websocket.TEXT, b'bye')
+        opcode, payload = await read_frame(reader)
+        assert opcode == websocket.CLOSE and struct.unpack('!H', payload[:2])[0] == websocket.NORMAL_CLOSURE
+        
+        # --- plain GET on a websocket route does not match ---
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        assert (await fetch(reader, writer, b'GET /echo HTTP/1.1\r\nHost: test\r\n\r\n')).startswith(b'HTTP/1.1 404')
+        writer.close()
+    
+    run_server(test)
+
+def test_event_channel_streams_resumes_and_drops_slow_subscribers():
+    channel = EventChannel(history=3, keep_alive=0.05)
+    
+    async def test(port, server):
+        server.app.send('/events', lambda request: channel.subscribe(request))
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'GET /events HTTP/1.1\r\nHost: test\r\n\r\n')
+        head = await reader.readuntil(b'\r\n\r\n')
+        assert b'Content-Type: text/event-stream' in head and b'Connection: close' in head
+        assert await reader.readuntil(b'\n\n') == b': connected\n\n'
+        
+        for number in range(5):
+            channel.publish({'n': number}, event='tick')
+        
+        for number in range(5):
+            assert await reader.readuntil(b'\n\n') == f'id: {number + 1}\nevent: tick\ndata: {{"n": {number}}}\n\n'.encode()
+        
+        assert await reader.readuntil(b'\n\n') == b': keep-alive\n\n'
+        writer.close()
+        
+        # --- resume after id 3, only ids still in the ring buffer are replayed ---
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'GET /events HTTP/1.1\r\nHost: test\r\nLast-Event-ID: 3\r\n\r\n')
+        await reader.readuntil(b'\r\n\r\n')
+        await reader.readuntil(b'\n\n')
+        assert (await reader.readuntil(b'\n\n')).startswith(b'id: 4\n')
+        assert (await reader.readuntil(b'\n\n')).startswith(b'id: 5\n')
+        writer.close()
+        
+        # --- a subscriber that does not read is dropped once its backlog passes max_buffer ---
+        class Transport:
+            aborted = False
+            
+            def abort(self):
+                self.aborted = True
+        
+        slow = EventChannel(max_buffer=100)
+        response = slow.subscribe()
+        response.subscriber.transport = Transport()
+        stream = response.chunks()
+        await stream.__anext__()
+        for number in range(10):
+            slow.publish('x' * 20)
+        assert slow.stats()['dropped'] == 1 and slow.stats()['subscribers'] == 0
+        assert response.subscriber.transport.aborted and not response.subscriber.pending
+        await stream.aclose()
+        
+        # --- an event published during the replay is not queued twice ---
+        resumed = channel.subscribe()
+        resumed.subscriber.push(5, b'replayed')
+        channel.subscribers.add(resumed.subscriber)
+        channel._deliver(5, b'replayed')
+        channel._deliver(6, b'live')
+        assert list(resumed.subscriber.pending) == [b'replayed', b'live']
+        channel.subscribers.discard(resumed.subscriber)
+    
+    run_server(test)
+
+def test_serves_unix_socket_and_inherited_fd(tmp_path):
+    app = Citra()
+    app.send('/', home)
+    inherited = socket.create_server(('127.0.0.1', 0))
+    
+    async def main():
+        servers = [Server(app, unix_socket=str(tmp_path / 'citra.sock')), Server(app, fd=inherited.detach())]
+        listeners = [server.listen() for server in servers]
+        tasks = [asyncio.create_task(server.accept(listener)) for server, listener in zip(servers, listeners)]
+        
+        try:
+            assert servers[0].address(listeners[0]) == f'http+unix://{tmp_path / "citra.sock"}'
+            reader, writer = await asyncio.open_unix_connection(str(tmp_path / 'citra.sock'))
+            assert (await fetch(reader, writer)).endswith(b'home')
+            writer.close()
+            
+            reader, writer = await asyncio.open_connection(*listeners[1].getsockname())
+            assert (await fetch(reader, writer)).endswith(b'home')
+            writer.close()
+        finally:
+            for task in tasks:
+                task.cancel()
+            for listener in listeners:
+                listener.close()
+    
+    asyncio.run(main())
+
+def test_shutdown_drains_in_flight_and_closes_idle_connections():
+    async def test(port, server):
+        idle = await asyncio.open_connection('127.0.0.1', port)
+        assert (await fetch(*idle)).endswith(b'home')
+        
+        busy = await asyncio.open_connection('127.0.0.1', port)
+        busy[1].write(b'GET /slow HTTP/1.1\r\nHost: test\r\n\r\n')
+        await asyncio.sleep(0.02)
+        
+        server.shutdown()
+        await server.drain()
+        
+        # --- the in-flight request finished and was told to close ---
+        head = await busy[0].readuntil(b'\r\n\r\n')
+        assert b'Connection: close' in head
+        assert await busy[0].read() == b'slow'
+        
+        # --- the idle keep-alive connection was closed without a response ---
+        assert await idle[0].read() == b''
+        assert server.connections == 0
+    
+    run_server(test, drain_timeout=1)
+
+def test_restart_hands_listening_socket_to_new_process(tmp_path):
+    report = tmp_path / 'child.txt'
+    child = (
+        'import os, socket\n'
+        'listener = socket.socket(fileno=int(os.environ["CITRA_LISTEN_FD"]))\n'
+        f'open({str(report)!r}, "w").write(str(listener.getsockname()[1]))\n'
+        'os.write(int(os.environ["CITRA_READY_FD"]), b"1")\n'
+    )
+    
+    app = Citra()
+    server = Server(app, restart_command=[sys.executable, '-c', child])
+    server._listener = socket.create_server(('127.0.0.1', 0))
+    
+    try:
+        assert asyncio.run(server.handoff())
+        assert server.draining and server._handed_off
+        assert report.read_text() == str(server._listener.getsockname()[1])
+    finally:
+        server._listener.close()
+
+def test_restart_keeps_serving_when_new_process_fails():
+    app = Citra()
+    server = Server(app, restart_command=[sys.executable, '-c', 'import missing_module_of_new_release'])
+    server._listener = socket.create_server(('127.0.0.1', 0))
+    
+    try:
+        assert not asyncio.run(server.handoff())
+        assert not server.draining and not server._handed_off
+    finally:
+        server._listener.close()
+
+def test_sigterm_drains_a_running_server_process():
+    app_script = (
+        'import asyncio\n'
+        'from citra_framework.core import Citra\n'
+        'from citra_framework.components.response import Response\n'
+        'app = Citra()\n'
+        'async def slow(request):\n'
+        '    await asyncio.sleep(0.3)\n'
+        '    return Response("finished")\n'
+        'app.send("/slow", slow)\n'
+        'app.serve(drain_timeout=5)\n'
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    listener = socket.create_server(('127.0.0.1', 0))
+    ready_read, ready_write = os.pipe()
+    env = {
+        **os.environ,
+        'PYTHONPATH': os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])),
+        'CITRA_LISTEN_FD': str(listener.fileno()),
+        'CITRA_READY_FD': str(ready_write)
+    }
+    process = subprocess.Popen(
+        [sys.executable, '-c', app_script],
+        env=env,
+        pass_fds=(listener.fileno(), ready_write),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    os.close(ready_write)
+    
+    try:
+        # --- the child reports ready from serve(), after its signal handlers are installed ---
+        assert os.read(ready_read, 1) == b'1'
+        
+        client = socket.create_connection(listener.getsockname(), timeout=5)
+        client.sendall(b'GET /slow HTTP/1.1\r\nHost: test\r\n\r\n')
+        time.sleep(0.1)
+        process.send_signal(signal.SIGTERM)
+        
+        response = b''
+        while chunk := client.recv(4096):
+            response += chunk
+        client.close()
+        
+        assert response.startswith(b'HTTP/1.1 200')
+        assert b'Connection: close' in response
+        assert response.endswith(b'finished')
+        assert process.wait(timeout=5) == 0
+    finally:
+        if process.poll() is None:
+            process.kill()
+        os.close(ready_read)
+        listener.close()